@@ -0,0 +1,282 @@
+import sys
+import csv
+import json
+import time
+import random
+import argparse
+import statistics
+import tempfile
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(BASE_DIR))
+
+import pandas as pd
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.routes import calendario, estado_diario
+from app.services import calculos
+
+RESULTADOS_DIR = BASE_DIR / "data" / "benchmarks"
+
+# Tamaño 1× ≈ histórico actual del tribunal
+CAUSAS_BASE = 1200
+AUDIENCIAS_BASE = 3500
+CAUSAS_DIA_BASE = 40
+DIAS_ESTADO_DIARIO = 30
+
+PROCEDIMIENTOS = ["Contencioso", "No Contencioso"]
+TIPOS_AUDIENCIA = ["Vista de la causa", "Audiencia pública", "Audiencia de conciliación", "Audiencia testimonial"]
+ESTADOS_AUDIENCIA = ["Realizada", "Realizada", "Suspendida", "Programada"]
+ESTADOS_RECLAMACION = ["Revoca", "Revoca parcial", "Confirma", "No se interpusieron recursos",
+                       "Conciliación", "Avenimiento", "Desistimiento", "Pendiente en Corte Suprema"]
+
+# Una consulta típica de cada pantalla del front
+FILTROS = {"fecha_inicio": "01-01-2015", "fecha_fin": "31-12-2024", "tipo": "contencioso"}
+
+
+# ============== Datasets sintéticos ==============
+def _fecha(d: date) -> str:
+    return d.strftime("%d-%m-%Y")
+
+
+def _escribir(path: Path, columnas: list, filas: list):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        escritor = csv.DictWriter(f, fieldnames=columnas)
+        escritor.writeheader()
+        escritor.writerows(filas)
+
+
+def generar_datasets(directorio: Path, escala: int) -> dict:
+    """
+    Escribe calendario_audiencias, rol_idcausa y rol_idcausa_detalle_actualizado
+    (más un estado diario de DIAS_ESTADO_DIARIO días) con `escala` veces el
+    tamaño base. La semilla fija hace que cada escala sea siempre la misma.
+    """
+    rnd = random.Random(escala)
+    hoy = date.today()
+    inicio_historico = date(2004, 1, 1)
+    rango_dias = (hoy - inicio_historico).days
+
+    info, detalle, ingresos = [], [], []
+    for i in range(CAUSAS_BASE * escala):
+        procedimiento = rnd.choice(PROCEDIMIENTOS)
+        ingreso = inicio_historico + timedelta(days=rnd.randrange(rango_dias))
+        rol = f"{'C' if procedimiento == 'Contencioso' else 'NC'}-{i + 1}-{ingreso.year}"
+        idcausa = str(10000 + i)
+        fallo = ingreso + timedelta(days=rnd.randint(90, 1800))
+        con_fallo = fallo < hoy and rnd.random() < 0.75
+        reclamo = con_fallo and rnd.random() < 0.4
+        ingresos.append(ingreso)
+        info.append({
+            "rol": rol, "idcausa": idcausa, "procedimiento": procedimiento,
+            "descripcion": f"Demanda de Empresa {i} contra Empresa {i + 1}",
+            "fecha_ingreso": _fecha(ingreso),
+            "link": f"https://consultas.tdlc.cl/estadoDiario?idCausa={idcausa}",
+        })
+        detalle.append({
+            "idCausa": idcausa, "rol": rol,
+            "fecha_primer_tramite": _fecha(ingreso),
+            "fecha_fallo": _fecha(fallo) if con_fallo else "",
+            "fallo_detectado": con_fallo, "causa_terminada": con_fallo,
+            "reclamo_detectado": reclamo,
+            "Estado reclamación": rnd.choice(ESTADOS_RECLAMACION) if reclamo else "",
+            "tipo_causa_especifica": procedimiento,
+        })
+
+    audiencias = []
+    for _ in range(AUDIENCIAS_BASE * escala):
+        i = rnd.randrange(len(info))
+        causa = info[i]
+        # Algunas quedan en el futuro para que /calendario tenga audiencias próximas
+        dia = ingresos[i] + timedelta(days=rnd.randint(30, 1500))
+        audiencias.append({
+            "fecha": _fecha(dia), "hora": f"{rnd.randint(9, 16):02d}:{rnd.choice(['00', '30'])}",
+            "rol": causa["rol"], "caratula": causa["descripcion"],
+            "tipo_audiencia": rnd.choice(TIPOS_AUDIENCIA),
+            "estado": "Programada" if dia >= hoy else rnd.choice(ESTADOS_AUDIENCIA),
+            "doc_resolucion": "",
+        })
+
+    paths = {
+        "audiencias": directorio / "calendario_audiencias.csv",
+        "info": directorio / "historic_data" / "rol_idcausa.csv",
+        "detalle": directorio / "historic_data" / "rol_idcausa_detalle_actualizado.csv",
+        "estado_diario": directorio / "estado_diario",
+    }
+    _escribir(paths["audiencias"], list(audiencias[0]), audiencias)
+    _escribir(paths["info"], list(info[0]), info)
+    _escribir(paths["detalle"], list(detalle[0]), detalle)
+    _generar_estado_diario(paths["estado_diario"], info, escala, rnd)
+    return paths
+
+
+def _generar_estado_diario(directorio: Path, info: list, escala: int, rnd: random.Random):
+    causas_dia = CAUSAS_DIA_BASE * escala
+    for d in range(DIAS_ESTADO_DIARIO):
+        dia = date.today() - timedelta(days=d)
+        causas = rnd.sample(info, min(causas_dia, len(info)))
+        filas_causas = [{
+            "fecha_estado_diario": _fecha(dia), "rol": c["rol"], "descripcion": c["descripcion"],
+            "tramites": 1, "link": c["link"],
+        } for c in causas]
+        filas_tramites = [{
+            "idCausa": c["idcausa"], "rol": c["rol"], "TipoTramite": "Resolución", "Fecha": _fecha(dia),
+            "Referencia": "Provee escrito", "Foja": str(rnd.randint(1, 3000)), "Link_Descarga": "",
+            "Tiene_Detalles": "False", "Tiene_Firmantes": "True",
+        } for c in causas]
+        particion = directorio / f"fecha={dia.isoformat()}"
+        particion.mkdir(parents=True, exist_ok=True)
+        for nombre, filas in (("causas", filas_causas), ("tramites", filas_tramites)):
+            with open(particion / f"{nombre}.jsonl", "w", encoding="utf-8") as f:
+                f.writelines(json.dumps(fila, ensure_ascii=False) + "\n" for fila in filas)
+        if d == 0:
+            _escribir(directorio / "estado_diario_tmp.csv", list(filas_causas[0]), filas_causas)
+            _escribir(directorio / "estado_diario_detalle_tmp.csv", list(filas_tramites[0]), filas_tramites)
+
+
+def apuntar_a(paths: dict):
+    """Hace que calculos y las rutas lean los datasets sintéticos."""
+    calculos.AUDIENCIAS_FILE = calendario.AUDIENCIAS_FILE = paths["audiencias"]
+    calculos.ROL_INFO_FILE = calendario.ROL_INFO_FILE = paths["info"]
+    calculos.DETALLE_FILE = calendario.DETALLE_FILE = paths["detalle"]
+    estado_diario.ESTADO_DIARIO_DIR = paths["estado_diario"]
+    estado_diario.CAUSAS_DEL_DIA_FILE = paths["estado_diario"] / "estado_diario_tmp.csv"
+    estado_diario.TRAMITES_DETALLE_FILE = paths["estado_diario"] / "estado_diario_detalle_tmp.csv"
+    estado_diario.TRAMITES_SNAPSHOT_FILE = estado_diario.TRAMITES_DETALLE_FILE.with_suffix(".jsonl")
+
+
+# ============== Casos ==============
+def casos_calculos() -> dict:
+    desde, hasta = pd.Timestamp(2015, 1, 1), pd.Timestamp(2024, 12, 31)
+    return {
+        "calcular_promedio_dias_fallo_general": lambda: calculos.calcular_promedio_dias_fallo_general(),
+        "calcular_promedio_dias_primer_tramite_general": lambda: calculos.calcular_promedio_dias_primer_tramite_general(),
+        "calcular_promedio_dias_fallo": lambda: calculos.calcular_promedio_dias_fallo(**FILTROS),
+        "calcular_promedio_dias_primer_tramite": lambda: calculos.calcular_promedio_dias_primer_tramite(**FILTROS),
+        "obtener_causas_esperando_fallo": lambda: calculos.obtener_causas_esperando_fallo(),
+        "dias_fallo_desde_audiencia": lambda: calculos.dias_fallo_desde_audiencia(**FILTROS),
+        "dias_fallo_desde_inicio": lambda: calculos.dias_fallo_desde_inicio(**FILTROS),
+        "promedio_trimestral_desde_audiencia": lambda: calculos.promedio_trimestral_desde_audiencia(**FILTROS),
+        "promedio_trimestral_desde_inicio": lambda: calculos.promedio_trimestral_desde_inicio(**FILTROS),
+        "contar_total_causas": lambda: calculos.contar_total_causas(),
+        "calcular_estadisticas_reclamaciones": lambda: calculos.calcular_estadisticas_reclamaciones(desde, hasta, "contencioso"),
+        "obtener_estadisticas_trimestrales": lambda: calculos.obtener_estadisticas_trimestrales(desde, hasta, "contencioso"),
+    }
+
+
+def casos_rutas() -> list:
+    hoy = date.today()
+    consulta = "fecha_inicio=01-01-2015&fecha_fin=31-12-2024&tipo=contencioso"
+    return [
+        "/causas/promedio-dias-audiencia-general",
+        "/causas/promedio-dias-inicio-general",
+        f"/causas/promedio-dias-fallo?{consulta}",
+        f"/causas/promedio-dias-desde-primer-tramite?{consulta}",
+        "/causas/causas-esperando-fallo",
+        f"/causas/evolucion-diaria-audiencia?{consulta}",
+        f"/causas/evolucion-diaria-inicio?{consulta}",
+        f"/causas/promedio-trimestral-audiencia?{consulta}",
+        f"/causas/promedio-trimestral-inicio?{consulta}",
+        "/causas/total-causas",
+        f"/causas/reclamaciones/porcentaje-revocadas?{consulta}",
+        f"/causas/reclamaciones/revocaciones-trimestrales?{consulta}",
+        "/estado-diario/causas-del-dia",
+        "/estado-diario/tramites-del-dia",
+        f"/estado-diario/historico?desde={hoy - timedelta(days=DIAS_ESTADO_DIARIO - 1)}&hasta={hoy}&incluir_detalle=true",
+        f"/estado-diario/{hoy.isoformat()}",
+        "/calendario/calendario?solo_futuras=false",
+    ]
+
+
+def medir(funcion, repeticiones: int) -> dict:
+    """Primera ejecución (cachés frías) y mediana/mejor de las siguientes, en ms."""
+    tiempos = []
+    for _ in range(repeticiones + 1):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    primera, resto = tiempos[0], tiempos[1:] or tiempos
+    return {"primera_ms": round(primera, 2), "mediana_ms": round(statistics.median(resto), 2), "mejor_ms": round(min(resto), 2)}
+
+
+def pedir(cliente: TestClient, url: str):
+    respuesta = cliente.get(url)
+    if respuesta.status_code != 200:
+        raise RuntimeError(f"{url} respondió {respuesta.status_code}: {respuesta.text[:200]}")
+    return respuesta
+
+
+def correr(escalas: list, repeticiones: int, datos_dir: Path) -> list:
+    resultados = []
+    cliente = TestClient(app)
+    for escala in escalas:
+        inicio = time.perf_counter()
+        paths = generar_datasets(datos_dir / f"x{escala}", escala)
+        apuntar_a(paths)
+        print(f"\n📦 Escala {escala}×: {CAUSAS_BASE * escala} causas, {AUDIENCIAS_BASE * escala} audiencias "
+              f"(generado en {time.perf_counter() - inicio:.1f}s)")
+        print(f"   {'caso':<62} {'1ª (ms)':>9} {'mediana':>9} {'mejor':>9}")
+
+        casos = [("calculos", nombre, funcion) for nombre, funcion in casos_calculos().items()]
+        casos += [("ruta", url, lambda url=url: pedir(cliente, url)) for url in casos_rutas()]
+        for tipo, nombre, funcion in casos:
+            r = medir(funcion, repeticiones)
+            resultados.append({"tipo": tipo, "caso": nombre, "escala": escala, **r})
+            print(f"   {nombre[:62]:<62} {r['primera_ms']:>9.1f} {r['mediana_ms']:>9.1f} {r['mejor_ms']:>9.1f}")
+    return resultados
+
+
+def guardar(resultados: list, args) -> Path:
+    RESULTADOS_DIR.mkdir(parents=True, exist_ok=True)
+    path = RESULTADOS_DIR / f"bench_calculos_{datetime.now():%Y%m%d_%H%M%S}.json"
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({
+            "fecha": datetime.now().isoformat(timespec="seconds"),
+            "python": sys.version.split()[0],
+            "pandas": pd.__version__,
+            "escalas": args.escalas,
+            "repeticiones": args.repeticiones,
+            "resultados": resultados,
+        }, f, ensure_ascii=False, indent=2)
+    return path
+
+
+def comparar(resultados: list, path_base: Path, tolerancia: float) -> int:
+    """Compara medianas contra un resultado anterior; devuelve cuántos casos empeoraron."""
+    with open(path_base, encoding="utf-8") as f:
+        base = {(r["caso"], r["escala"]): r for r in json.load(f)["resultados"]}
+    regresiones = 0
+    print(f"\n📊 Comparación contra {path_base.name} (mediana actual / anterior)")
+    for r in resultados:
+        anterior = base.get((r["caso"], r["escala"]))
+        if not anterior or not anterior["mediana_ms"]:
+            continue
+        razon = r["mediana_ms"] / anterior["mediana_ms"]
+        marca = "⚠️" if razon > 1 + tolerancia else "  "
+        regresiones += razon > 1 + tolerancia
+        print(f"{marca} {r['caso'][:62]:<62} {r['escala']:>4}× {razon:>6.2f}x")
+    return regresiones
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tiempos de calculos.py y de las rutas de la API con datasets sintéticos")
+    parser.add_argument("--escalas", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--datos", type=Path, default=None, help="Carpeta donde dejar los datasets (por defecto, una temporal)")
+    parser.add_argument("--comparar", type=Path, default=None, help="JSON de una corrida anterior contra el que comparar")
+    parser.add_argument("--tolerancia", type=float, default=0.2, help="Empeoramiento aceptado antes de marcar regresión")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench_calculos_") as tmp:
+        resultados = correr(args.escalas, args.repeticiones, args.datos or Path(tmp))
+
+    path = guardar(resultados, args)
+    print(f"\n💾 Resultados en {path}")
+    if args.comparar:
+        regresiones = comparar(resultados, args.comparar, args.tolerancia)
+        print(f"{'❌' if regresiones else '✅'} {regresiones} casos más lentos que la base (>{args.tolerancia:.0%})")
+        sys.exit(1 if regresiones else 0)
@@ -1,5 +1,8 @@
-from fastapi import FastAPI
+import time
+from fastapi import FastAPI, Request, Response
 from app.routes import causas, estado_diario, calendario
+from app.services import metricas
+from app.services.perfilado import perfilar_solicitudes
 from fastapi.middleware.cors import CORSMiddleware
 
 
@@ -21,3 +24,36 @@ app.add_middleware(
 app.include_router(causas.router, prefix="/causas", tags=["Causas"])
 app.include_router(estado_diario.router, prefix="/estado-diario", tags=["Estado Diario"])
 app.include_router(calendario.router, prefix="/calendario", tags=["Calendario"])
+
+# Perfilado a pedido (admin) o de las solicitudes lentas; ver services/perfilado.py
+app.middleware("http")(perfilar_solicitudes)
+
+
+def _plantilla_ruta(request: Request) -> str:
+    """Ruta declarada (p. ej. /causas/total-causas), para no abrir una serie por cada URL distinta."""
+    # El router deja la ruta que atendió la solicitud en el scope; no todas tienen `path` (mounts, routers)
+    return getattr(request.scope.get("route"), "path", None) or "sin_ruta"
+
+
+@app.middleware("http")
+async def medir_solicitudes(request: Request, call_next):
+    if request.url.path == "/metrics":
+        return await call_next(request)
+
+    metricas.en_curso.inc()
+    inicio = time.perf_counter()
+    codigo = 500
+    try:
+        respuesta = await call_next(request)
+        codigo = respuesta.status_code
+        return respuesta
+    finally:
+        ruta = _plantilla_ruta(request)
+        metricas.latencia.observar(time.perf_counter() - inicio, ruta=ruta, metodo=request.method)
+        metricas.solicitudes.inc(ruta=ruta, metodo=request.method, codigo=codigo)
+        metricas.en_curso.dec()
+
+
+@app.get("/metrics", include_in_schema=False)
+def exponer_metricas():
+    return Response(content=metricas.exponer(), media_type=metricas.TIPO_CONTENIDO)
@@ -5,6 +5,8 @@ from typing import List, Optional
 from pathlib import Path
 import pandas as pd
 from datetime import datetime
+from app.services.metricas import leer_csv
+from app.services.perfilado import RutaPerfilable
 
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
 DATA_DIR = BASE_DIR / "data"
@@ -14,7 +16,7 @@ AUDIENCIAS_FILE = DATA_DIR / "calendario_audiencias.csv"
 DETALLE_FILE = HISTORIC_DIR / "rol_idcausa_detalle_actualizado.csv"
 ROL_INFO_FILE = HISTORIC_DIR / "rol_idcausa.csv"
 
-router = APIRouter()
+router = APIRouter(route_class=RutaPerfilable)
 
 def parse_fecha_ddmmaaaa(fecha_str: str) -> Optional[datetime]:
     try:
@@ -32,7 +34,7 @@ async def get_calendario(
 ):
     try:
         # Cargar calendario de audiencias
-        df = pd.read_csv(AUDIENCIAS_FILE, dtype=str).fillna("")
+        df = leer_csv(AUDIENCIAS_FILE, dtype=str).fillna("")
         df["fecha_audiencia_dt"] = pd.to_datetime(df["fecha"], format="%d-%m-%Y", errors="coerce")
         df = df[~df["fecha_audiencia_dt"].isna()]
         hoy = pd.Timestamp.now().normalize()
@@ -60,7 +62,7 @@ async def get_calendario(
         df = df.sort_values("fecha_audiencia_dt")
 
         # Cargar datos de idCausa y link desde CSV histórico
-        df_id = pd.read_csv(ROL_INFO_FILE, dtype=str).fillna("")
+        df_id = leer_csv(ROL_INFO_FILE, dtype=str).fillna("")
         df_id["rol"] = df_id["rol"].str.strip().str.upper()
         df["rol"] = df["rol"].str.strip().str.upper()
 
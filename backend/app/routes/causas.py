@@ -16,8 +16,9 @@ from app.services.calculos import (
     calcular_estadisticas_reclamaciones,
     obtener_estadisticas_trimestrales
 )
+from app.services.perfilado import RutaPerfilable
 
-router = APIRouter()
+router = APIRouter(route_class=RutaPerfilable)
 
 @router.get("/promedio-dias-audiencia-general")
 def promedio_dias_audiencia_general():
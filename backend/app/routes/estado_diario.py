@@ -1,18 +1,32 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
 import pandas as pd
+import json
 import os
+from datetime import date, datetime
 from pathlib import Path
+from typing import Optional
+from app.services.cache_archivos import CacheArchivo
+from app.services.metricas import leer_csv
+from app.services.perfilado import RutaPerfilable
 
 # Define la ruta base para los archivos temporales del estado diario
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
 DATA_DIR = BASE_DIR / "data"
 
+ESTADO_DIARIO_DIR = DATA_DIR / "estado_diario"
 CAUSAS_DEL_DIA_FILE = DATA_DIR / "estado_diario" / "estado_diario_tmp.csv"
 TRAMITES_DETALLE_FILE = DATA_DIR / "estado_diario" / "estado_diario_detalle_tmp.csv"
+# Snapshot JSON Lines ya normalizado que escriben los scrapers junto al CSV
+TRAMITES_SNAPSHOT_FILE = TRAMITES_DETALLE_FILE.with_suffix(".jsonl")
+
+# Máximo de días por consulta a /historico
+MAX_DIAS_HISTORICO = 400
+
+COLUMNAS_TRAMITES = ["idCausa", "rol", "TipoTramite", "Fecha", "Referencia", "Foja", "Link_Descarga", "Tiene_Detalles", "Tiene_Firmantes"]
 
 # Crea un enrutador de FastAPI.
 # Esto permite que los endpoints sean modulares y se puedan incluir en la aplicación principal (por ejemplo, en main.py)
-router = APIRouter()
+router = APIRouter(route_class=RutaPerfilable)
 
 @router.get("/causas-del-dia")
 def get_causas_del_dia():
@@ -24,7 +38,7 @@ def get_causas_del_dia():
         raise HTTPException(status_code=404, detail="Archivo de causas del día no encontrado.")
     
     try:
-        df = pd.read_csv(CAUSAS_DEL_DIA_FILE, dtype=str)
+        df = leer_csv(CAUSAS_DEL_DIA_FILE, dtype=str)
         # Selecciona las columnas solicitadas y las convierte en una lista de diccionarios
         df_selected = df[["fecha_estado_diario", "rol", "descripcion", "tramites", "link"]]
         causas_del_dia = df_selected.to_dict(orient="records")
@@ -32,22 +46,126 @@ def get_causas_del_dia():
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error al leer el archivo: {e}")
 
+def _cargar_jsonl(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(linea) for linea in f if linea.strip()]
+
+
+def _cargar_tramites_csv(path):
+    df = pd.read_csv(path, dtype=str, keep_default_na=False)
+    if df.empty or not all(col in df.columns for col in COLUMNAS_TRAMITES):
+        return []
+    df = df[COLUMNAS_TRAMITES].replace({'nan': '', 'inf': '', '-inf': ''})
+    return df.to_dict(orient="records")
+
+
+_cache_snapshot = CacheArchivo(_cargar_jsonl, nombre="tramites_snapshot")
+_cache_csv = CacheArchivo(_cargar_tramites_csv, nombre="tramites_csv")
+
+
+def _snapshot_vigente() -> bool:
+    """El snapshot sirve si existe y no es más antiguo que el CSV."""
+    if not os.path.exists(TRAMITES_SNAPSHOT_FILE):
+        return False
+    return CacheArchivo.version(TRAMITES_SNAPSHOT_FILE)[0] >= CacheArchivo.version(TRAMITES_DETALLE_FILE)[0]
+
+
 @router.get("/tramites-del-dia")
 def get_tramites_del_dia():
     if not os.path.exists(TRAMITES_DETALLE_FILE):
         raise HTTPException(status_code=404, detail="Archivo de trámites del día no encontrado.")
     
     try:
-        df = pd.read_csv(TRAMITES_DETALLE_FILE, dtype=str, on_bad_lines='skip', engine='python').fillna('')
-        
-        columnas_esperadas = ["idCausa", "rol", "TipoTramite", "Fecha", "Referencia", "Foja", "Link_Descarga", "Tiene_Detalles", "Tiene_Firmantes"]
-        
-        if df.empty or not all(col in df.columns for col in columnas_esperadas):
-            return []
+        # Se parsea una vez por versión del archivo; las siguientes llamadas salen de memoria
+        if _snapshot_vigente():
+            return _cache_snapshot.obtener(TRAMITES_SNAPSHOT_FILE)
+        return _cache_csv.obtener(TRAMITES_DETALLE_FILE)
 
-        df = df[columnas_esperadas].replace({'nan': '', 'inf': '', '-inf': ''})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al leer el archivo: {e}")
 
-        return df.to_dict(orient="records")
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error al leer el archivo: {e}")
\ No newline at end of file
+# ============== Historial particionado por día ==============
+# Cada día vive en estado_diario/fecha=YYYY-MM-DD/{causas,tramites}.jsonl
+_cache_particiones = CacheArchivo(_cargar_jsonl, max_entradas=400, nombre="particiones")
+
+
+def _parse_fecha_param(valor: str) -> date:
+    for fmt in ("%Y-%m-%d", "%d-%m-%Y"):
+        try:
+            return datetime.strptime(valor, fmt).date()
+        except ValueError:
+            continue
+    raise HTTPException(status_code=400, detail=f"Fecha inválida: {valor}. Usa YYYY-MM-DD o DD-MM-YYYY.")
+
+
+def _leer_particion(dia: date, nombre: str) -> Optional[list]:
+    """Filas de una partición, o None si ese día no tiene archivo."""
+    path = ESTADO_DIARIO_DIR / f"fecha={dia.isoformat()}" / f"{nombre}.jsonl"
+    if not path.exists():
+        return None
+    return _cache_particiones.obtener(path)
+
+
+def _dias_con_particion(inicio: date, fin: date) -> list:
+    """Días del rango que tienen carpeta `fecha=YYYY-MM-DD`, en orden."""
+    if not ESTADO_DIARIO_DIR.exists():
+        return []
+    dias = set()
+    for entrada in os.scandir(ESTADO_DIARIO_DIR):
+        if not entrada.is_dir() or not entrada.name.startswith("fecha="):
+            continue
+        try:
+            dia = date.fromisoformat(entrada.name[len("fecha="):])
+        except ValueError:
+            continue
+        if inicio <= dia <= fin:
+            dias.add(dia)
+    return sorted(dias)
+
+
+@router.get("/historico")
+def get_estado_diario_historico(
+    desde: str = Query(..., description="Fecha inicial (YYYY-MM-DD o DD-MM-YYYY)"),
+    hasta: Optional[str] = Query(None, description="Fecha final, inclusive. Por defecto igual a 'desde'"),
+    incluir_detalle: bool = Query(False, description="Incluir causas y trámites de cada día, no sólo los totales"),
+):
+    """
+    Estado diario de un rango de fechas (hasta MAX_DIAS_HISTORICO días). Sólo
+    se leen las particiones que existen dentro del rango, así el costo depende
+    de los días guardados y no de los días del calendario.
+    """
+    inicio = _parse_fecha_param(desde)
+    fin = _parse_fecha_param(hasta) if hasta else inicio
+    if fin < inicio:
+        raise HTTPException(status_code=400, detail="'hasta' debe ser posterior o igual a 'desde'.")
+    if (fin - inicio).days + 1 > MAX_DIAS_HISTORICO:
+        raise HTTPException(status_code=400, detail=f"El rango no puede superar {MAX_DIAS_HISTORICO} días.")
+
+    dias = []
+    for dia in _dias_con_particion(inicio, fin):
+        causas = _leer_particion(dia, "causas")
+        tramites = _leer_particion(dia, "tramites")
+        if causas is not None or tramites is not None:
+            registro = {
+                "fecha": dia.isoformat(),
+                "total_causas": len(causas or []),
+                "total_tramites": len(tramites or []),
+            }
+            if incluir_detalle:
+                registro["causas"] = causas or []
+                registro["tramites"] = tramites or []
+            dias.append(registro)
+
+    return {"desde": inicio.isoformat(), "hasta": fin.isoformat(), "dias": dias}
+
+
+@router.get("/{fecha}")
+def get_estado_diario_por_fecha(fecha: str):
+    """Causas y trámites publicados en el estado diario de una fecha."""
+    dia = _parse_fecha_param(fecha)
+    causas = _leer_particion(dia, "causas")
+    tramites = _leer_particion(dia, "tramites")
+    if causas is None and tramites is None:
+        raise HTTPException(status_code=404, detail=f"No hay estado diario guardado para {dia.isoformat()}.")
+    return {"fecha": dia.isoformat(), "causas": causas or [], "tramites": tramites or []}
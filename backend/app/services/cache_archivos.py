@@ -0,0 +1,52 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from app.services import metricas
+
+
+class CacheArchivo:
+    """
+    Guarda en memoria el resultado de `cargar(path)` y lo reutiliza mientras el
+    archivo no cambie (mismo mtime y tamaño). Los scrapers reemplazan los
+    archivos de forma atómica, así que cada versión se parsea una sola vez.
+
+    Con `max_entradas` se descartan primero los archivos cargados hace más tiempo.
+    Aciertos, fallos y tiempos de carga se exportan en /metrics bajo `nombre`.
+    """
+
+    def __init__(self, cargar, max_entradas=None, nombre=None):
+        self.cargar = cargar
+        self.max_entradas = max_entradas
+        self.nombre = nombre or getattr(cargar, "__name__", "cache").lstrip("_")
+        self._lock = threading.Lock()
+        self._entradas = OrderedDict()
+
+    @staticmethod
+    def version(path):
+        st = os.stat(path)
+        return st.st_mtime_ns, st.st_size
+
+    def obtener(self, path):
+        path = str(path)
+        version = self.version(path)
+        entrada = self._entradas.get(path)
+        if entrada and entrada[0] == version:
+            metricas.cache_aciertos.inc(cache=self.nombre)
+            return entrada[1]
+        with self._lock:
+            entrada = self._entradas.get(path)
+            if entrada and entrada[0] == version:
+                metricas.cache_aciertos.inc(cache=self.nombre)
+                return entrada[1]
+            metricas.cache_fallos.inc(cache=self.nombre)
+            inicio = time.perf_counter()
+            datos = self.cargar(path)
+            metricas.registrar_carga(self.nombre, time.perf_counter() - inicio, len(datos) if hasattr(datos, "__len__") else None)
+            self._entradas[path] = (version, datos)
+            self._entradas.move_to_end(path)
+            if self.max_entradas and len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+            metricas.cache_entradas.fijar(len(self._entradas), cache=self.nombre)
+            return datos
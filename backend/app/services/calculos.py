@@ -6,6 +6,7 @@ import numpy as np
 import re
 import unicodedata
 from pandas.tseries.offsets import MonthEnd
+from app.services.metricas import leer_csv
 
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
 DATA_DIR = BASE_DIR / "data"
@@ -21,9 +22,9 @@ def calcular_promedio_dias_fallo_general():
     todas las causas, sin filtros de fecha o tipo.
     """
     # Cargar CSVs
-    df_audiencias = pd.read_csv(AUDIENCIAS_FILE)
-    df_detalle = pd.read_csv(DETALLE_FILE)
-    df_info = pd.read_csv(ROL_INFO_FILE)
+    df_audiencias = leer_csv(AUDIENCIAS_FILE)
+    df_detalle = leer_csv(DETALLE_FILE)
+    df_info = leer_csv(ROL_INFO_FILE)
 
     # Normalizar columnas
     df_audiencias.columns = df_audiencias.columns.str.strip()
@@ -72,7 +73,7 @@ def calcular_promedio_dias_primer_tramite_general():
     todas las causas, sin filtros de fecha o tipo.
     """
     # Cargar datos
-    df = pd.read_csv(DETALLE_FILE)
+    df = leer_csv(DETALLE_FILE)
 
     # Normalizar columnas
     df.columns = df.columns.str.strip()
@@ -102,9 +103,9 @@ def calcular_promedio_dias_primer_tramite_general():
 
 def calcular_promedio_dias_fallo(fecha_inicio=None, fecha_fin=None, tipo="todos"):
     # Cargar CSVs
-    df_audiencias = pd.read_csv(AUDIENCIAS_FILE)
-    df_detalle = pd.read_csv(DETALLE_FILE)
-    df_info = pd.read_csv(ROL_INFO_FILE)
+    df_audiencias = leer_csv(AUDIENCIAS_FILE)
+    df_detalle = leer_csv(DETALLE_FILE)
+    df_info = leer_csv(ROL_INFO_FILE)
 
     # Normalizar columnas y formatos
     df_audiencias.columns = df_audiencias.columns.str.strip()
@@ -168,8 +169,8 @@ def calcular_promedio_dias_fallo(fecha_inicio=None, fecha_fin=None, tipo="todos"
     
 def calcular_promedio_dias_primer_tramite(fecha_inicio=None, fecha_fin=None, tipo="todos"):
     # Cargar datos
-    df = pd.read_csv(DETALLE_FILE)
-    df_info = pd.read_csv(ROL_INFO_FILE)
+    df = leer_csv(DETALLE_FILE)
+    df_info = leer_csv(ROL_INFO_FILE)
 
     # Normalizar columnas
     df.columns = df.columns.str.strip()
@@ -215,9 +216,9 @@ def calcular_promedio_dias_primer_tramite(fecha_inicio=None, fecha_fin=None, tip
     
 def obtener_causas_esperando_fallo():
     # Cargar archivos
-    df_aud = pd.read_csv(AUDIENCIAS_FILE)
-    df_detalle = pd.read_csv(DETALLE_FILE)
-    df_info = pd.read_csv(ROL_INFO_FILE)
+    df_aud = leer_csv(AUDIENCIAS_FILE)
+    df_detalle = leer_csv(DETALLE_FILE)
+    df_info = leer_csv(ROL_INFO_FILE)
 
     # Parsear fechas
     df_aud["fecha"] = pd.to_datetime(df_aud["fecha"], format="%d-%m-%Y", errors="coerce")
@@ -280,9 +281,9 @@ def obtener_causas_esperando_fallo():
     return resultado.to_dict(orient="records")
 
 def dias_fallo_desde_audiencia(fecha_inicio=None, fecha_fin=None, tipo="todos"):
-    df_audiencias = pd.read_csv(AUDIENCIAS_FILE)
-    df_detalle = pd.read_csv(DETALLE_FILE)
-    df_info = pd.read_csv(ROL_INFO_FILE)
+    df_audiencias = leer_csv(AUDIENCIAS_FILE)
+    df_detalle = leer_csv(DETALLE_FILE)
+    df_info = leer_csv(ROL_INFO_FILE)
 
     df_audiencias.columns = df_audiencias.columns.str.strip()
     df_info.columns = df_info.columns.str.strip().str.lower()
@@ -326,8 +327,8 @@ def dias_fallo_desde_audiencia(fecha_inicio=None, fecha_fin=None, tipo="todos"):
     return df[["rol", "idcausa", "fecha_fallo", "dias", "procedimiento", "fecha_primer_tramite"]].dropna().to_dict(orient="records")
 
 def dias_fallo_desde_inicio(fecha_inicio=None, fecha_fin=None, tipo="todos"):
-    df = pd.read_csv(DETALLE_FILE)
-    df_info = pd.read_csv(ROL_INFO_FILE)
+    df = leer_csv(DETALLE_FILE)
+    df_info = leer_csv(ROL_INFO_FILE)
 
     df.columns = df.columns.str.strip()
     df_info.columns = df_info.columns.str.strip().str.lower()
@@ -364,9 +365,9 @@ def promedio_trimestral_desde_audiencia(fecha_inicio=None, fecha_fin=None, tipo=
     """
     Calcula el promedio trimestral de días desde la audiencia hasta el fallo.
     """
-    df_audiencias = pd.read_csv(AUDIENCIAS_FILE)
-    df_detalle = pd.read_csv(DETALLE_FILE)
-    df_info = pd.read_csv(ROL_INFO_FILE)
+    df_audiencias = leer_csv(AUDIENCIAS_FILE)
+    df_detalle = leer_csv(DETALLE_FILE)
+    df_info = leer_csv(ROL_INFO_FILE)
 
     df_audiencias.columns = df_audiencias.columns.str.strip()
     df_info.columns = df_info.columns.str.strip().str.lower()
@@ -418,8 +419,8 @@ def promedio_trimestral_desde_inicio(fecha_inicio=None, fecha_fin=None, tipo="to
     """
     Calcula el promedio trimestral de días desde el inicio del expediente hasta el fallo.
     """
-    df = pd.read_csv(DETALLE_FILE)
-    df_info = pd.read_csv(ROL_INFO_FILE)
+    df = leer_csv(DETALLE_FILE)
+    df_info = leer_csv(ROL_INFO_FILE)
 
     df.columns = df.columns.str.strip()
     df_info.columns = df_info.columns.str.strip().str.lower()
@@ -459,7 +460,7 @@ def promedio_trimestral_desde_inicio(fecha_inicio=None, fecha_fin=None, tipo="to
 
 def contar_total_causas():
     try:
-        df = pd.read_csv(DETALLE_FILE)
+        df = leer_csv(DETALLE_FILE)
         df.columns = df.columns.str.strip().str.lower()
 
         if 'rol' not in df.columns or 'fecha_fallo' not in df.columns:
@@ -480,7 +481,7 @@ def contar_total_causas():
  
 def calcular_estadisticas_reclamaciones(fecha_inicio, fecha_fin, tipo="todos"):
     # Cargar y preparar DataFrame
-    df = pd.read_csv(DETALLE_FILE)
+    df = leer_csv(DETALLE_FILE)
     df["fecha_primer_tramite"] = pd.to_datetime(df["fecha_primer_tramite"], dayfirst=True, errors="coerce")
     df = df[(df["fecha_primer_tramite"] >= fecha_inicio) & (df["fecha_primer_tramite"] <= fecha_fin)]
 
@@ -529,7 +530,7 @@ def calcular_estadisticas_reclamaciones(fecha_inicio, fecha_fin, tipo="todos"):
       
 def obtener_estadisticas_trimestrales(fecha_inicio, fecha_fin, tipo="todos"):
     try:
-        df = pd.read_csv(DETALLE_FILE)
+        df = leer_csv(DETALLE_FILE)
         df["fecha_primer_tramite"] = pd.to_datetime(df["fecha_primer_tramite"], errors="coerce")
 
         # Filtrar fechas
@@ -0,0 +1,186 @@
+import math
+import threading
+import time
+from pathlib import Path
+
+import pandas as pd
+
+# Tiempos de respuesta de la API: de lookups en memoria (ms) a cálculos sobre el histórico completo (s)
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_CARGA = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+TIPO_CONTENIDO = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escapar(valor) -> str:
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _formatear(valor: float) -> str:
+    if valor == math.inf:
+        return "+Inf"
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+class _Metrica:
+    """Base: una serie por combinación de valores de las etiquetas."""
+
+    tipo = ""
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: tuple = ()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def _clave(self, valores: dict) -> tuple:
+        return tuple(str(valores.get(e, "")) for e in self.etiquetas)
+
+    def _etiquetas(self, clave: tuple, extra: str = "") -> str:
+        partes = [f'{e}="{_escapar(v)}"' for e, v in zip(self.etiquetas, clave)]
+        if extra:
+            partes.append(extra)
+        return "{" + ",".join(partes) + "}" if partes else ""
+
+    def muestras(self) -> list:
+        raise NotImplementedError
+
+    def exponer(self) -> list:
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} {self.tipo}"]
+        lineas.extend(self.muestras())
+        return lineas
+
+
+class Contador(_Metrica):
+    tipo = "counter"
+
+    def inc(self, n: float = 1, **etiquetas):
+        clave = self._clave(etiquetas)
+        with self._lock:
+            self._series[clave] = self._series.get(clave, 0) + n
+
+    def muestras(self) -> list:
+        with self._lock:
+            return [f"{self.nombre}{self._etiquetas(c)} {_formatear(v)}" for c, v in sorted(self._series.items())]
+
+
+class Medidor(Contador):
+    """Valor que sube y baja (solicitudes en curso, filas del último DataFrame cargado)."""
+
+    tipo = "gauge"
+
+    def dec(self, n: float = 1, **etiquetas):
+        self.inc(-n, **etiquetas)
+
+    def fijar(self, valor: float, **etiquetas):
+        with self._lock:
+            self._series[self._clave(etiquetas)] = valor
+
+
+class Histograma(_Metrica):
+    tipo = "histogram"
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: tuple = (), buckets: tuple = BUCKETS_LATENCIA):
+        super().__init__(nombre, ayuda, etiquetas)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observar(self, valor: float, **etiquetas):
+        clave = self._clave(etiquetas)
+        with self._lock:
+            serie = self._series.get(clave)
+            if serie is None:
+                # [conteo por bucket (no acumulado), suma]
+                serie = self._series[clave] = [[0] * len(self.buckets), 0.0]
+            for i, limite in enumerate(self.buckets):
+                if valor <= limite:
+                    serie[0][i] += 1
+                    break
+            serie[1] += valor
+
+    def muestras(self) -> list:
+        lineas = []
+        with self._lock:
+            for clave, (conteos, suma) in sorted(self._series.items()):
+                acumulado = 0
+                for limite, n in zip(self.buckets, conteos):
+                    acumulado += n
+                    le = f'le="{_formatear(limite)}"'
+                    lineas.append(f"{self.nombre}_bucket{self._etiquetas(clave, le)} {acumulado}")
+                lineas.append(f"{self.nombre}_sum{self._etiquetas(clave)} {_formatear(suma)}")
+                lineas.append(f"{self.nombre}_count{self._etiquetas(clave)} {acumulado}")
+        return lineas
+
+
+class Registro:
+    """
+    Métricas del proceso en formato de texto de Prometheus. Con varios workers
+    de uvicorn cada uno expone las suyas; Prometheus las agrega por instancia.
+    """
+
+    def __init__(self):
+        self._metricas = []
+
+    def registrar(self, metrica):
+        self._metricas.append(metrica)
+        return metrica
+
+    def exponer(self) -> str:
+        lineas = []
+        for metrica in self._metricas:
+            lineas.extend(metrica.exponer())
+        return "\n".join(lineas) + "\n"
+
+
+REGISTRO = Registro()
+
+# ============== HTTP ==============
+solicitudes = REGISTRO.registrar(Contador(
+    "api_solicitudes_total", "Solicitudes atendidas por ruta, método y código de estado.",
+    ("ruta", "metodo", "codigo")))
+latencia = REGISTRO.registrar(Histograma(
+    "api_solicitud_duracion_segundos", "Latencia de las solicitudes por ruta (plantilla de la ruta, no la URL).",
+    ("ruta", "metodo")))
+# Sin etiqueta de ruta: la ruta recién se conoce cuando el router ya atendió la solicitud
+en_curso = REGISTRO.registrar(Medidor(
+    "api_solicitudes_en_curso", "Solicitudes que se están atendiendo ahora mismo."))
+
+# ============== Cachés en memoria ==============
+# Tasa de aciertos: aciertos / (aciertos + fallos) por cache
+cache_aciertos = REGISTRO.registrar(Contador(
+    "api_cache_aciertos_total", "Lecturas servidas desde la caché en memoria.", ("cache",)))
+cache_fallos = REGISTRO.registrar(Contador(
+    "api_cache_fallos_total", "Lecturas que tuvieron que cargar el archivo (nuevo o modificado).", ("cache",)))
+cache_entradas = REGISTRO.registrar(Medidor(
+    "api_cache_entradas", "Archivos guardados en cada caché.", ("cache",)))
+
+# ============== Datasets ==============
+dataset_cargas = REGISTRO.registrar(Contador(
+    "api_dataset_cargas_total", "Veces que se leyó cada dataset desde disco.", ("dataset",)))
+dataset_duracion = REGISTRO.registrar(Histograma(
+    "api_dataset_carga_segundos", "Tiempo de lectura y parseo de cada dataset.", ("dataset",), BUCKETS_CARGA))
+dataset_filas = REGISTRO.registrar(Medidor(
+    "api_dataset_filas", "Filas del último DataFrame cargado de cada dataset.", ("dataset",)))
+dataset_bytes = REGISTRO.registrar(Medidor(
+    "api_dataset_bytes", "Memoria (sin contar objetos Python) del último DataFrame cargado de cada dataset.", ("dataset",)))
+
+
+def registrar_carga(dataset: str, duracion: float, filas: int = None, bytes_: int = None):
+    dataset_cargas.inc(dataset=dataset)
+    dataset_duracion.observar(duracion, dataset=dataset)
+    if filas is not None:
+        dataset_filas.fijar(filas, dataset=dataset)
+    if bytes_ is not None:
+        dataset_bytes.fijar(bytes_, dataset=dataset)
+
+
+def leer_csv(path, **kwargs) -> pd.DataFrame:
+    """`pd.read_csv` que registra la carga bajo el nombre del archivo (sin extensión)."""
+    inicio = time.perf_counter()
+    df = pd.read_csv(path, **kwargs)
+    registrar_carga(Path(path).stem, time.perf_counter() - inicio, len(df), int(df.memory_usage(index=True).sum()))
+    return df
+
+
+def exponer() -> str:
+    return REGISTRO.exponer()
@@ -0,0 +1,161 @@
+import cProfile
+import functools
+import hmac
+import inspect
+import io
+import os
+import pstats
+import re
+import time
+from contextvars import ContextVar
+from datetime import datetime
+from pathlib import Path
+
+from fastapi import Request
+from fastapi.responses import PlainTextResponse
+from fastapi.routing import APIRoute
+
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+PERFILES_DIR = BASE_DIR / "data" / "perfiles"
+
+# Sin token configurado nadie puede pedir perfiles a mano
+ADMIN_TOKEN = os.getenv("API_ADMIN_TOKEN", "")
+# Captura automática de las solicitudes más lentas que esto (ms); 0 = apagada
+UMBRAL_AUTOMATICO_MS = float(os.getenv("API_PERFIL_UMBRAL_MS", "0"))
+LINEAS_REPORTE = 40
+
+
+class Captura:
+    """Perfil de una solicitud y el tiempo que pasó dentro del endpoint."""
+
+    def __init__(self):
+        self.perfil = cProfile.Profile()
+        self.segundos_endpoint = 0.0
+
+    def __enter__(self):
+        self._t0 = time.perf_counter()
+        try:
+            self.perfil.enable()
+            self._activo = True
+        except ValueError:
+            # Desde 3.12 cProfile es global al intérprete: si otra solicitud
+            # ya se está perfilando, esta se deja pasar sin perfil
+            self._activo = False
+        return self
+
+    def __exit__(self, *exc):
+        if self._activo:
+            self.perfil.disable()
+        self.segundos_endpoint += time.perf_counter() - self._t0
+        return False
+
+
+# Captura de la solicitud en curso. Los contextvars viajan al threadpool donde
+# FastAPI corre los endpoints síncronos, así el endpoint la encuentra sin
+# recibirla y el perfil se toma en el hilo donde realmente se trabaja
+_captura: ContextVar = ContextVar("captura_perfil", default=None)
+
+
+def _perfilar_llamada(funcion):
+    """Corre el endpoint bajo la captura de la solicitud, si hay una activa."""
+    if inspect.iscoroutinefunction(funcion):
+        @functools.wraps(funcion)
+        async def envuelta(*args, **kwargs):
+            captura = _captura.get()
+            if captura is None:
+                return await funcion(*args, **kwargs)
+            with captura:
+                return await funcion(*args, **kwargs)
+    else:
+        @functools.wraps(funcion)
+        def envuelta(*args, **kwargs):
+            captura = _captura.get()
+            if captura is None:
+                return funcion(*args, **kwargs)
+            with captura:
+                return funcion(*args, **kwargs)
+    return envuelta
+
+
+class RutaPerfilable(APIRoute):
+    """APIRoute cuyo endpoint se puede perfilar en el hilo donde realmente corre."""
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        super().__init__(path, _perfilar_llamada(endpoint), **kwargs)
+
+
+def _es_admin(request: Request) -> bool:
+    token = request.headers.get("x-admin-token", "")
+    return bool(ADMIN_TOKEN) and hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode())
+
+
+def _modo_pedido(request: Request) -> str:
+    """'', '1' (guardar el perfil) o 'texto' (devolver el reporte en vez de la respuesta)."""
+    modo = request.headers.get("x-perfilar") or request.query_params.get("perfilar") or ""
+    if modo not in ("1", "texto") or not _es_admin(request):
+        return ""
+    return modo
+
+
+def reporte(perfil: cProfile.Profile, lineas: int = LINEAS_REPORTE) -> str:
+    salida = io.StringIO()
+    pstats.Stats(perfil, stream=salida).sort_stats("cumulative").print_stats(lineas)
+    return salida.getvalue()
+
+
+def guardar(request: Request, duracion: float, perfil: cProfile.Profile, motivo: str) -> Path:
+    """Deja el perfil en formato pstats (se abre con `python -m pstats` o snakeviz)."""
+    PERFILES_DIR.mkdir(parents=True, exist_ok=True)
+    ruta = re.sub(r"[^\w-]+", "_", request.url.path).strip("_") or "raiz"
+    path = PERFILES_DIR / f"{datetime.now():%Y%m%d_%H%M%S_%f}_{motivo}_{ruta}_{duracion * 1000:.0f}ms.prof"
+    perfil.dump_stats(path)
+    return path
+
+
+async def perfilar_solicitudes(request: Request, call_next):
+    """
+    Middleware de perfilado bajo demanda. Se perfila el endpoint (lecturas de
+    CSV, to_datetime, merges, armado del resultado); lo que queda entre el
+    endpoint y el total es validación y serialización de FastAPI, y se informa
+    aparte como "fuera del endpoint".
+
+    - A pedido: con `X-Admin-Token` igual a API_ADMIN_TOKEN y `X-Perfilar: 1`
+      (o `?perfilar=1`) el perfil queda en data/perfiles y su nombre en el
+      header `X-Perfil`. Con `texto` se devuelve el reporte ordenado por tiempo
+      acumulado en lugar de la respuesta.
+    - Automático: con API_PERFIL_UMBRAL_MS > 0 se perfila cada solicitud y se
+      guarda sólo si tarda más que el umbral. El overhead es en código Python;
+      lo pesado de pandas corre en C y casi no se nota.
+    """
+    modo = _modo_pedido(request)
+    if not modo and UMBRAL_AUTOMATICO_MS <= 0:
+        return await call_next(request)
+
+    captura = Captura()
+    token = _captura.set(captura)
+    inicio = time.perf_counter()
+    try:
+        respuesta = await call_next(request)
+    finally:
+        _captura.reset(token)
+    duracion = time.perf_counter() - inicio
+
+    if not captura.perfil.getstats():
+        return respuesta
+    fuera = max(duracion - captura.segundos_endpoint, 0.0)
+
+    if modo == "texto":
+        encabezado = (
+            f"{request.method} {request.url.path} — {duracion * 1000:.1f} ms (código {respuesta.status_code}), "
+            f"endpoint {captura.segundos_endpoint * 1000:.1f} ms, fuera del endpoint {fuera * 1000:.1f} ms\n\n"
+        )
+        return PlainTextResponse(encabezado + reporte(captura.perfil))
+    if modo == "1":
+        path = guardar(request, duracion, captura.perfil, motivo="pedido")
+        respuesta.headers["X-Perfil"] = path.name
+        respuesta.headers["X-Perfil-Fuera-Endpoint-Ms"] = f"{fuera * 1000:.1f}"
+    elif duracion * 1000 >= UMBRAL_AUTOMATICO_MS:
+        path = guardar(request, duracion, captura.perfil, motivo="lento")
+        print(f"🐢 {request.method} {request.url.path} tardó {duracion * 1000:.0f} ms "
+              f"({fuera * 1000:.0f} ms fuera del endpoint) — perfil en {path}")
+    return respuesta
@@ -1,12 +1,28 @@
 from playwright.sync_api import sync_playwright, TimeoutError as PWTimeout
+import argparse
 import csv, os, time, json
+import queue, threading
 from datetime import datetime
 from dateutil.relativedelta import relativedelta
+import sys
+sys.path.append(os.path.abspath("backend"))
+from src.scraping_module.audiencias_api import AudienciasAPI
+from src.scraping_module.instrumentacion import contar, iniciar_corrida, metricas, tramo
+from src.scraping_module.sitios import CONSULTAS_URL
+from src.storage_module.calendario_meta import CalendarioMeta
+from src.storage_module.calendario_keys import CalendarioKeyStore, hash_fila
+from src.storage_module.atomic_io import archivo_atomico, CsvAppendJournal
+
+# Mes 0 del bitmap de meses completados (el TDLC inicia funciones en 2004)
+ANIO_BASE_BITMAP = 2004
+# Filas que se acumulan en el journal antes de incorporarlas al CSV (unos meses de audiencias)
+FILAS_POR_COMPACTACION = 2000
+
 
 class CalendarioHistoricScraper:
     def __init__(
         self,
-        url="https://consultas.tdlc.cl/audiencia",
+        url=f"{CONSULTAS_URL}/audiencia",
         output_path="backend/data/calendar/calendario_audiencias.csv",
         checkpoint_path="backend/data/calendar/calendario_audiencias.checkpoint",
         limite_meses_sin_datos=3,
@@ -17,12 +33,18 @@ class CalendarioHistoricScraper:
         self.checkpoint_path = checkpoint_path
         self.limite_meses_sin_datos = limite_meses_sin_datos
         self.meses_sin_resultados = 0
-        self.keys_existentes = set()  # para deduplicar (fecha,hora,rol)
+        self.keys_existentes = None  # índice persistente para deduplicar (fecha,hora,rol)
+        self.meses_path = f"{checkpoint_path}.meses.json"  # bitmap de meses completados
+        self._meta = None  # metadatos del CSV (min/max fecha, filas, digest)
+        self._journal = None  # appends del backfill; ver _journal_csv
+        self._filas_sin_compactar = []  # filas en el journal que aún no están en keys/metadatos
+        self._lock = threading.Lock()
         self.header = ["fecha","hora","rol","caratula","tipo_audiencia","estado","doc_resolucion"]
         self.MESES = ["enero","febrero","marzo","abril","mayo","junio","julio","agosto","septiembre","octubre","noviembre","diciembre"]
         self.playwright = None
         self.browser = None
         self.page = None
+        self.api = None
         self.headless = headless
 
     # ============== Navegador ==============
@@ -31,8 +53,11 @@ class CalendarioHistoricScraper:
         self.browser = self.playwright.chromium.launch(headless=self.headless)
         self.page = self.browser.new_page()
         self.page.set_default_timeout(20_000)
-        self.page.goto(self.url, wait_until="domcontentloaded")
-        self.page.wait_for_selector("div.controls", timeout=20_000)
+        metricas().instrumentar(self.page)
+        # Carga el calendario y detecta el endpoint REST para saltar directo a cada mes
+        self.api = AudienciasAPI(self.page, self.url)
+        with tramo("navegacion"):
+            self.api.descubrir(timeout=20_000)
         print("🌐 Navegador iniciado y calendario visible")
 
     def cerrar_navegador(self):
@@ -44,6 +69,10 @@ class CalendarioHistoricScraper:
 
     # ============== Esperas/UI ==============
     def _wait_calendar_settled(self, screenshot_name=None):
+        with tramo("espera"):
+            self._esperar_tabla(screenshot_name)
+
+    def _esperar_tabla(self, screenshot_name=None):
         self.page.wait_for_load_state("networkidle", timeout=15_000)
         self.page.wait_for_selector("table#selectable tbody", timeout=15_000)
         try:
@@ -194,8 +223,20 @@ class CalendarioHistoricScraper:
         return False
 
     def scrape_mes(self, mes: int, anio: int):
+        """Filas del mes, o None si ni la API ni la UI lo pudieron leer (no es un mes vacío)."""
         print(f"\n📅 Iniciando extracción de audiencias para {mes:02d}-{anio}")
-        self.ir_a_mes(mes, anio)
+        contar("meses")
+        if self.api is not None:
+            with tramo("audiencias_api"):
+                filas = self.api.audiencias_mes(mes, anio)
+            if filas is not None:
+                print(f"📦 {len(filas)} filas en {mes:02d}-{anio} (consulta directa)")
+                contar("audiencias", len(filas))
+                return filas
+            contar("audiencias_fallback_ui")
+
+        with tramo("navegacion"):
+            self.ir_a_mes(mes, anio)
 
         audiencias_totales = []
         while True:
@@ -203,11 +244,13 @@ class CalendarioHistoricScraper:
                 self.page.wait_for_selector("table#selectable tbody", timeout=10_000)
             except PWTimeout:
                 self.page.screenshot(path=f"error_audiencia_{mes:02d}-{anio}.png")
-                print(f"⚠️ Tabla de audiencias no encontrada en {mes:02d}-{anio}.")
-                break
+                print(f"⚠️ Tabla de audiencias no encontrada en {mes:02d}-{anio}; el mes queda sin leer.")
+                contar("errores")
+                return None
 
             time.sleep(0.5)
-            audiencias = self.extraer_audiencias_mes()
+            with tramo("extraccion"):
+                audiencias = self.extraer_audiencias_mes()
             if not audiencias and len(audiencias_totales) == 0:
                 print(f"⚠️ Mes {mes:02d}-{anio} sin audiencias.")
                 break
@@ -218,43 +261,71 @@ class CalendarioHistoricScraper:
                 break
 
         print(f"📦 {len(audiencias_totales)} filas en {mes:02d}-{anio}")
+        contar("audiencias", len(audiencias_totales))
         return audiencias_totales
 
     # ============== Persistencia/Deduplicación ==============
     def _cargar_keys_existentes(self):
-        if not os.path.exists(self.output_path):
+        if self.keys_existentes is None:
+            self._journal_csv()
+            self.keys_existentes = CalendarioKeyStore(self.output_path)
+
+    def _journal_csv(self) -> CsvAppendJournal:
+        """
+        Los meses se agregan a `<csv>.journal` en vez de reescribir el CSV
+        completo por cada mes. Se abre antes que las keys y los metadatos: si
+        quedó un journal de un corte previo, se compacta primero y ambos se
+        reconstruyen contra el CSV ya completo.
+        """
+        if self._journal is None:
+            self._journal = CsvAppendJournal(self.output_path, self.header, compactar_cada=FILAS_POR_COMPACTACION)
+        return self._journal
+
+    def _confirmar_compactacion(self):
+        """Keys y metadatos registran el tamaño del CSV: se confirman con las filas ya incorporadas."""
+        self.keys_existentes.confirmar()
+        self.meta.actualizar(self._filas_sin_compactar)
+        self._filas_sin_compactar = []
+
+    def compactar(self):
+        """Incorpora al CSV lo que quede en el journal (al terminar cada corrida)."""
+        if self._journal is None:
             return
-        with open(self.output_path, "r", encoding="utf-8") as f:
-            reader = csv.DictReader(f)
-            for r in reader:
-                key = (r.get("fecha",""), r.get("hora",""), r.get("rol",""))
-                self.keys_existentes.add(key)
+        with tramo("escritura_csv"):
+            self._journal.compactar()
+            self._confirmar_compactacion()
 
     def _append_mes_csv(self, filas_mes):
         """Guarda (append) un mes ya scrapeado con deduplicación. Crea encabezado si no existe."""
         if not filas_mes:
             return 0
+        self._cargar_keys_existentes()
         nuevos = []
         for r in filas_mes:
             key = (r.get("fecha",""), r.get("hora",""), r.get("rol",""))
             if key not in self.keys_existentes:
                 nuevos.append(r)
-                self.keys_existentes.add(key)
+                self.keys_existentes.add(key, hash_fila(r))
 
         if not nuevos:
             print("🟰 Nada nuevo para agregar (todo duplicado).")
             return 0
 
-        first_write = not os.path.exists(self.output_path)
-        os.makedirs(os.path.dirname(self.output_path), exist_ok=True)
-        with open(self.output_path, "a", newline="", encoding="utf-8") as f:
-            writer = csv.DictWriter(f, fieldnames=self.header)
-            if first_write:
-                writer.writeheader()
-            writer.writerows(nuevos)
-        print(f"💾 {len(nuevos)} filas (mes) agregadas a {self.output_path}")
+        self.meta  # se carga antes de escribir para no contar dos veces las filas nuevas
+        with tramo("escritura_csv"):
+            self._filas_sin_compactar.extend(nuevos)
+            if self._journal_csv().append(nuevos):
+                self._confirmar_compactacion()
+        contar("filas_nuevas", len(nuevos))
+        print(f"💾 {len(nuevos)} filas (mes) agregadas al journal de {self.output_path}")
         return len(nuevos)
 
+    @property
+    def meta(self) -> CalendarioMeta:
+        if self._meta is None:
+            self._meta = CalendarioMeta.cargar(self.output_path)
+        return self._meta
+
     # ============== Reanudación ==============
     def _leer_checkpoint(self):
         if os.path.exists(self.checkpoint_path):
@@ -270,10 +341,42 @@ class CalendarioHistoricScraper:
         return None
 
     def _escribir_checkpoint(self, anio, mes):
-        os.makedirs(os.path.dirname(self.checkpoint_path), exist_ok=True)
-        with open(self.checkpoint_path, "w", encoding="utf-8") as f:
+        with archivo_atomico(self.checkpoint_path) as f:
             json.dump({"ultimo_anio": anio, "ultimo_mes": mes}, f)
 
+    @staticmethod
+    def _bit_mes(anio, mes):
+        return (anio - ANIO_BASE_BITMAP) * 12 + (mes - 1)
+
+    def _leer_meses_completados(self) -> bytearray:
+        """Bitmap (un carácter '0'/'1' por mes desde enero de ANIO_BASE_BITMAP)."""
+        if os.path.exists(self.meses_path):
+            try:
+                with open(self.meses_path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if data.get("anio_base") == ANIO_BASE_BITMAP:
+                    return bytearray(data.get("completados", ""), "ascii")
+            except Exception:
+                pass
+        return bytearray()
+
+    def _marcar_mes_completado(self, bitmap: bytearray, anio, mes):
+        bit = self._bit_mes(anio, mes)
+        if bit < 0:
+            return
+        # El mes en curso (y los futuros) siguen sumando audiencias y cambiando de estado
+        if (anio, mes) >= (datetime.today().year, datetime.today().month):
+            return
+        if len(bitmap) <= bit:
+            bitmap.extend(b"0" * (bit + 1 - len(bitmap)))
+        bitmap[bit] = ord("1")
+        with archivo_atomico(self.meses_path) as f:
+            json.dump({"anio_base": ANIO_BASE_BITMAP, "completados": bitmap.decode("ascii")}, f)
+
+    def _mes_completado(self, bitmap: bytearray, anio, mes) -> bool:
+        bit = self._bit_mes(anio, mes)
+        return 0 <= bit < len(bitmap) and bitmap[bit] == ord("1")
+
     def _leer_mes_inicio(self):
         """
         Si hay checkpoint -> partir desde el mes anterior al último guardado (continuar hacia atrás).
@@ -288,21 +391,10 @@ class CalendarioHistoricScraper:
             inicio = datetime(y, m, 1) - relativedelta(months=1)
             return inicio.month, inicio.year
 
-        # 2) CSV existente
-        if os.path.exists(self.output_path):
-            fechas = []
-            with open(self.output_path, "r", encoding="utf-8") as f:
-                reader = csv.DictReader(f)
-                for r in reader:
-                    if r.get("fecha"):
-                        try:
-                            fechas.append(datetime.strptime(r["fecha"], "%d-%m-%Y"))
-                        except Exception:
-                            continue
-            if fechas:
-                mas_antigua = min(fechas)
-                inicio = (mas_antigua.replace(day=1) - relativedelta(months=1))
-                return inicio.month, inicio.year
+        # 2) CSV existente (fecha mínima desde el sidecar de metadatos)
+        if os.path.exists(self.output_path) and self.meta.min_fecha:
+            inicio = (self.meta.min_fecha.replace(day=1) - relativedelta(months=1))
+            return inicio.month, inicio.year
 
         # 3) por defecto: mes anterior al actual
         hoy = datetime.today()
@@ -332,7 +424,8 @@ class CalendarioHistoricScraper:
                     break
 
             # Scrape del mes
-            filas_mes = self.scrape_mes(mes_actual, anio_actual)
+            with tramo("mes"):
+                filas_mes = self.scrape_mes(mes_actual, anio_actual)
 
             # Filtro opcional
             if solo_vista_causa and filas_mes:
@@ -352,19 +445,114 @@ class CalendarioHistoricScraper:
             dt = datetime(anio_actual, mes_actual, 1) - relativedelta(months=1)
             mes_actual, anio_actual = dt.month, dt.year
 
+        self.compactar()
         self.cerrar_navegador()
 
 
+    # ============== Modo paralelo ==============
+    def _worker_meses(self, tareas: "queue.Queue", al_terminar_mes, solo_vista_causa):
+        """Consume meses de la cola con un navegador propio (Playwright sync es por hilo)."""
+        worker = CalendarioHistoricScraper(url=self.url, headless=self.headless)
+        try:
+            worker.iniciar_navegador()
+            while True:
+                try:
+                    anio, mes = tareas.get_nowait()
+                except queue.Empty:
+                    break
+                try:
+                    with tramo("mes"):
+                        filas = worker.scrape_mes(mes, anio)
+                except Exception as e:
+                    print(f"❌ Error en {mes:02d}-{anio}: {e} (queda pendiente)")
+                    contar("errores")
+                    continue
+                if solo_vista_causa and filas:
+                    filas = [r for r in filas if r.get("tipo_audiencia","").strip().lower() == "vista de la causa"]
+                al_terminar_mes(anio, mes, filas)
+        finally:
+            worker.cerrar_navegador()
+
+    def correr_paralelo(self, desde: datetime, hasta: datetime = None, workers=4, solo_vista_causa=False):
+        """
+        Divide el rango [desde, hasta] en meses y los reparte entre `workers`
+        navegadores. Cada mes se persiste apenas termina y se marca en el bitmap
+        de meses completados, así una corrida interrumpida retoma sólo los
+        meses que faltan (incluidos huecos intermedios). El mes en curso y los
+        que no se pudieron leer nunca se marcan: se vuelven a pedir siempre.
+        """
+        hasta = hasta or datetime.today()
+        self._cargar_keys_existentes()
+        bitmap = self._leer_meses_completados()
+
+        meses = []
+        dt = datetime(desde.year, desde.month, 1)
+        while dt <= hasta:
+            if not self._mes_completado(bitmap, dt.year, dt.month):
+                meses.append((dt.year, dt.month))
+            dt += relativedelta(months=1)
+
+        if not meses:
+            print("✅ Todos los meses del rango ya están completos.")
+            return
+        print(f"🚦 {len(meses)} mes(es) pendientes entre {desde:%m-%Y} y {hasta:%m-%Y} con {workers} worker(s)")
+
+        tareas = queue.Queue()
+        for m in meses:
+            tareas.put(m)
+
+        def al_terminar_mes(anio, mes, filas):
+            if filas is None:
+                print(f"⚠️ {mes:02d}-{anio} no se pudo leer; queda pendiente")
+                return
+            with self._lock:
+                self._append_mes_csv(filas)
+                self._marcar_mes_completado(bitmap, anio, mes)
+
+        hilos = [
+            threading.Thread(target=self._worker_meses, args=(tareas, al_terminar_mes, solo_vista_causa))
+            for _ in range(max(1, min(workers, len(meses))))
+        ]
+        for h in hilos:
+            h.start()
+        for h in hilos:
+            h.join()
+        self.compactar()
+
+        faltantes = [m for m in meses if not self._mes_completado(bitmap, *m)]
+        print(f"🏁 Backfill paralelo terminado. Meses sin completar: {len(faltantes)}")
+
+
 # ============== Ejecutable ==============
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill histórico del calendario de audiencias del TDLC")
+    parser.add_argument("--paralelo", action="store_true",
+                        help="Reparte los meses de --desde a --hasta entre varios navegadores (reanudable por mes)")
+    parser.add_argument("--desde", default="01-2005", help="Primer mes del modo paralelo (mm-yyyy)")
+    parser.add_argument("--hasta", help="Último mes del modo paralelo (mm-yyyy, por defecto el actual)")
+    parser.add_argument("--workers", type=int, default=4, help="Navegadores en paralelo")
+    parser.add_argument("--fecha-corte", help="Modo hacia atrás: se detiene antes de este mes (mm-yyyy)")
+    parser.add_argument("--solo-vista-causa", action="store_true", help="Guarda sólo 'Vista de la causa'")
+    parser.add_argument("--headful", action="store_true", help="Muestra la UI del navegador")
+    args = parser.parse_args()
+
+    def _mes(texto):
+        return datetime.strptime(texto, "%m-%Y") if texto else None
+
     scraper = CalendarioHistoricScraper(
         output_path="backend/data/notifications/calendario_audiencias.csv",
         checkpoint_path="backend/data/notifications/calendario_audiencias.checkpoint",
         limite_meses_sin_datos=6,
-        headless=True,  # pon False si quieres ver la UI
-    )
-    # corta en enero 2018 si quieres: fecha_corte=datetime(2018,1,1)
-    scraper.correr_hacia_atras(
-        fecha_corte=None,
-        solo_vista_causa=False  # True si quieres sólo “Vista de la causa”
+        headless=not args.headful,
     )
+    corrida = iniciar_corrida("calendario_historico")
+    try:
+        if args.paralelo:
+            corrida.anotar("rango", [args.desde, args.hasta])
+            corrida.anotar("workers", args.workers)
+            scraper.correr_paralelo(desde=_mes(args.desde), hasta=_mes(args.hasta),
+                                    workers=args.workers, solo_vista_causa=args.solo_vista_causa)
+        else:
+            scraper.correr_hacia_atras(fecha_corte=_mes(args.fecha_corte), solo_vista_causa=args.solo_vista_causa)
+    finally:
+        corrida.guardar()
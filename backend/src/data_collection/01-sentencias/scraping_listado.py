@@ -1,10 +1,19 @@
 # src/data_collection/scraping_listado.py
 
+import sys
+import os
+
+# Raíz del proyecto en el sys.path para importar backend.src...
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../.."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
 import asyncio
 from playwright.async_api import async_playwright
 import csv
 from datetime import datetime
 import re
+from backend.src.storage_module.atomic_io import archivo_atomico
 
 BASE_URL = "https://www.tdlc.cl/sentencia/"
 N_PAGINAS = 21  # puedes ajustar según necesites
@@ -101,7 +110,7 @@ async def get_listado_sentencias():
 
         await browser.close()
 
-        with open("data/sentencias_listado.csv", "w", newline="", encoding="utf-8") as f:
+        with archivo_atomico("data/sentencias_listado.csv") as f:
             writer = csv.DictWriter(f, fieldnames=["fecha", "numero_sentencia", "codigo", "descripcion", "url_ficha"])
             writer.writeheader()
             writer.writerows(todas_las_sentencias)
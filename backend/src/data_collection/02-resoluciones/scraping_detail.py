@@ -1,8 +1,17 @@
+import sys
+import os
+
+# Raíz del proyecto en el sys.path para importar backend.src...
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../.."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
 import csv
 from playwright.sync_api import sync_playwright
 from bs4 import BeautifulSoup
 import time
 from tqdm import tqdm
+from backend.src.storage_module.atomic_io import archivo_atomico
 
 def normalizar_fecha(fecha_raw):
     if not fecha_raw:
@@ -144,7 +153,7 @@ for url in tqdm(urls, desc="Procesando resoluciones"):
 
 # Guardar en CSV
 output_file = "backend/data/resoluciones_detalle.csv"
-with open(output_file, "w", newline="", encoding="utf-8") as f:
+with archivo_atomico(output_file) as f:
     fieldnames = [
         "fecha_dictacion",
         "caratula",
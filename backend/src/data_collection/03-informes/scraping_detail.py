@@ -1,8 +1,17 @@
+import sys
+import os
+
+# Raíz del proyecto en el sys.path para importar backend.src...
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../.."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
 import asyncio
 from playwright.async_api import async_playwright
 import csv
 from datetime import datetime
 import re
+from backend.src.storage_module.atomic_io import archivo_atomico
 
 # URL base corregida
 BASE_URL = "https://www.tdlc.cl/informes-leyes-especiales/3/?sort_order=_sfm_orden%20desc%20num"
@@ -90,7 +99,7 @@ async def get_listado_resoluciones():
         await browser.close()
 
         output_file = "backend/data/resoluciones_listado.csv"
-        with open(output_file, "w", newline="", encoding="utf-8") as f:
+        with archivo_atomico(output_file) as f:
             writer = csv.DictWriter(f, fieldnames=["fecha", "numero_resolucion", "codigo", "descripcion", "url_ficha"])
             writer.writeheader()
             writer.writerows(todas)
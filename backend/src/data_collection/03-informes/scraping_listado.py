@@ -1,11 +1,20 @@
 # src/data_collection/03-informes/scraping_listado.py
 
+import sys
+import os
+
+# Raíz del proyecto en el sys.path para importar backend.src...
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../.."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
 import asyncio
 from playwright.async_api import async_playwright
 import csv
 from datetime import datetime
+from backend.src.storage_module.atomic_io import archivo_atomico
 
-BASE_URL = "https://www.tdlc.cl/informes-leyes-especiales/"
+BASE_URL = os.getenv("TDLC_WEB_URL", "https://www.tdlc.cl").rstrip("/") + "/informes-leyes-especiales/"
 N_PAGINAS = 4
 
 
@@ -76,7 +85,7 @@ async def get_listado_informes():
 
         await browser.close()
 
-        with open("data/informes_listado.csv", "w", newline="", encoding="utf-8") as f:
+        with archivo_atomico("data/informes_listado.csv") as f:
             writer = csv.DictWriter(f, fieldnames=["fecha", "numero_sentencia", "codigo", "descripcion", "url_ficha"])
             writer.writeheader()
             writer.writerows(todos)
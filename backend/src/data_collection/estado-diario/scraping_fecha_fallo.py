@@ -1,13 +1,29 @@
+import sys
+import os
+
+# Ruta absoluta al directorio raíz del proyecto
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../.."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
 from playwright.sync_api import sync_playwright
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+import argparse
 import csv
-import os
+import glob
+import json
 import time
+from backend.src.scraping_module.http_cache import HttpCache
+from backend.src.scraping_module.instrumentacion import contar, iniciar_corrida, metricas, tramo
+from backend.src.storage_module.detalle_index import DetalleIndex
+from backend.src.storage_module.atomic_io import CsvAppendJournal, append_csv_atomico
 
 WAIT = 50_000
 BASE = "https://consultas.tdlc.cl"
 CSV_RESULTADOS = "backend/data/historic_data/rol_idcausa_detalle.csv"
 CSV_INPUT = "backend/data/historic_data/rol_idcausa.csv"
+JOURNAL_DIR = "backend/data/historic_data/fecha_fallo_journal"
 
 FIELDNAMES = [
     "rol", "idCausa",
@@ -17,16 +33,25 @@ FIELDNAMES = [
 ]
 
 
-def append_detalle_csv(path, nuevos: list[dict]):
+def append_detalle_csv(path, nuevos: list[dict], indice: DetalleIndex = None, journal: CsvAppendJournal = None):
+    """
+    Agrega filas al CSV de resultados. Con `journal` las filas van primero al
+    journal y llegan al CSV en la compactación; sin él, se agregan de inmediato
+    con un reemplazo atómico. El índice persistido sólo se guarda cuando el CSV
+    cambió, para que siga calzando con su tamaño/mtime.
+    """
     if not nuevos:
         return 0
-    first = not os.path.exists(path)
-    os.makedirs(os.path.dirname(path), exist_ok=True)
-    with open(path, "a", newline="", encoding="utf-8") as f:
-        w = csv.DictWriter(f, fieldnames=FIELDNAMES)
-        if first:
-            w.writeheader()
-        w.writerows(nuevos)
+    if journal is not None:
+        compactado = journal.append(nuevos)
+    else:
+        append_csv_atomico(path, FIELDNAMES, nuevos)
+        compactado = True
+    if indice is not None:
+        for row in nuevos:
+            indice.agregar(row)
+        if compactado:
+            indice.guardar()
     return len(nuevos)
 
 
@@ -36,24 +61,23 @@ def leer_csv_rol_idcausa(path):
         return [(row["rol"], row["idcausa"]) for row in reader]
 
 
-def leer_roles_pendientes():
+def leer_roles_pendientes(indice: DetalleIndex = None):
     todos = leer_csv_rol_idcausa(CSV_INPUT)
     if not os.path.exists(CSV_RESULTADOS):
         return todos
 
-    with open(CSV_RESULTADOS, "r", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        ya_procesados = set((row["rol"], row["idCausa"]) for row in reader)
-
-    pendientes = [r for r in todos if r not in ya_procesados]
+    if indice is None:
+        indice = DetalleIndex.cargar(CSV_RESULTADOS)
+    pendientes = [r for r in todos if not indice.contiene(*r)]
     print(f"🔄 Total pendientes por procesar: {len(pendientes)} de {len(todos)}")
     return pendientes
 
 
 def analizar_expediente(page, idCausa: str):
     url = f"{BASE}/estadoDiario?idCausa={idCausa}"
-    page.goto(url, wait_until="load")
-    page.wait_for_load_state("networkidle", timeout=WAIT)
+    with tramo("navegacion"):
+        page.goto(url, wait_until="load")
+        page.wait_for_load_state("networkidle", timeout=WAIT)
 
     try:
         rows = page.query_selector_all("table tbody tr")
@@ -110,7 +134,7 @@ def analizar_expediente(page, idCausa: str):
                     span = row.query_selector("span[title='Descargar Documento']")
                     if span:
                         page.evaluate("span => span.click()", span)
-                        with page.expect_download(timeout=5000) as download_info:
+                        with tramo("descarga"), page.expect_download(timeout=5000) as download_info:
                             download = download_info.value
                             fallo_link = download.url
                 except:
@@ -124,7 +148,7 @@ def analizar_expediente(page, idCausa: str):
                     span = row.query_selector("span[title='Descargar Documento']")
                     if span:
                         page.evaluate("span => span.click()", span)
-                        with page.expect_download(timeout=5000) as download_info:
+                        with tramo("descarga"), page.expect_download(timeout=5000) as download_info:
                             download = download_info.value
                             reclamo_link = download.url
                 except:
@@ -143,18 +167,26 @@ def analizar_expediente(page, idCausa: str):
 
 
 def run(headless=True):
-    roles = leer_roles_pendientes()
+    # El journal se abre antes que el índice: si quedó uno de un corte previo, se compacta primero
+    journal = CsvAppendJournal(CSV_RESULTADOS, FIELDNAMES)
+    indice = DetalleIndex.cargar(CSV_RESULTADOS)
+    roles = leer_roles_pendientes(indice)
     nuevos = []
 
     with sync_playwright() as p:
         browser = p.chromium.launch(headless=headless)
         page = browser.new_page()
+        HttpCache.compartida().instalar(page)
+        metricas().instrumentar(page)
 
         for i, (rol, idc) in enumerate(roles):
             print(f"\n🔎 {i+1}/{len(roles)} Rol: {rol} - idCausa: {idc}")
+            contar("causas")
             try:
-                detalles = analizar_expediente(page, idc)
+                with tramo("expediente"):
+                    detalles = analizar_expediente(page, idc)
                 if detalles is None:
+                    contar("expedientes_vacios")
                     continue
 
                 row = {
@@ -170,21 +202,170 @@ def run(headless=True):
                     print(f"  📨 Reclamo detectado: {detalles['fecha_reclamo']}")
 
                 nuevos.append(row)
-                time.sleep(0.5)
+                with tramo("pausa"):
+                    time.sleep(0.5)
 
                 if (i + 1) % 10 == 0:
-                    total = append_detalle_csv(CSV_RESULTADOS, nuevos)
+                    with tramo("escritura_csv"):
+                        total = append_detalle_csv(CSV_RESULTADOS, nuevos, indice, journal)
                     print(f"  💾 Guardado parcial de {total} registros...")
                     nuevos.clear()
 
             except Exception as e:
                 print(f"❌ Error con causa {rol}: {e}")
+                contar("errores")
                 continue
 
-        total = append_detalle_csv(CSV_RESULTADOS, nuevos)
+        with tramo("escritura_csv"):
+            append_detalle_csv(CSV_RESULTADOS, nuevos, indice, journal)
+            total = journal.compactar()
+            indice.guardar()
         print(f"\n✅ Se guardaron {total} registros en: {CSV_RESULTADOS}")
         browser.close()
 
 
+# ============== Backfill paralelo y reanudable ==============
+def ruta_journal(shard_id: int) -> str:
+    return os.path.join(JOURNAL_DIR, f"shard_{shard_id:02d}.jsonl")
+
+
+def leer_journals() -> dict[tuple[str, str], dict]:
+    """Último registro 'ok' de cada (rol, idCausa) en todos los journals."""
+    registros = {}
+    for path in sorted(glob.glob(os.path.join(JOURNAL_DIR, "shard_*.jsonl"))):
+        with open(path, "r", encoding="utf-8") as f:
+            for linea in f:
+                try:
+                    entrada = json.loads(linea)
+                except json.JSONDecodeError:
+                    continue  # línea truncada por un corte a mitad de escritura
+                if entrada.get("status") == "ok":
+                    row = entrada["row"]
+                    registros[(row["rol"], row["idCausa"])] = row
+    return registros
+
+
+def registrar_en_journal(f, status: str, rol: str, idc: str, row: dict = None, error: str = ""):
+    entrada = {"status": status, "rol": rol, "idCausa": idc, "ts": datetime.now().isoformat(timespec="seconds")}
+    if row is not None:
+        entrada["row"] = row
+    if error:
+        entrada["error"] = error
+    f.write(json.dumps(entrada, ensure_ascii=False) + "\n")
+    f.flush()
+    os.fsync(f.fileno())
+
+
+def procesar_shard(shard_id: int, causas: list[tuple[str, str]], headless=True, max_reintentos=2, pausa=0.5):
+    """
+    Procesa un subconjunto de causas en un navegador propio, dejando cada
+    resultado en su journal apenas se obtiene. Las causas que fallan se
+    reintentan al final de la pasada, hasta `max_reintentos` veces.
+    Devuelve también las métricas del shard para juntarlas en el proceso padre.
+    """
+    corrida = iniciar_corrida(f"fecha_fallo_shard_{shard_id}")
+    os.makedirs(JOURNAL_DIR, exist_ok=True)
+    pendientes = list(causas)
+    ok = 0
+
+    with open(ruta_journal(shard_id), "a", encoding="utf-8") as journal, sync_playwright() as p:
+        browser = p.chromium.launch(headless=headless)
+        page = browser.new_page()
+        HttpCache.compartida().instalar(page)
+        corrida.instrumentar(page)
+
+        for intento in range(max_reintentos + 1):
+            if not pendientes:
+                break
+            if intento:
+                print(f"🔁 [shard {shard_id}] Reintento {intento}: {len(pendientes)} causa(s)")
+                contar("reintentos", len(pendientes))
+
+            fallidas = []
+            for rol, idc in pendientes:
+                contar("causas")
+                try:
+                    with tramo("expediente"):
+                        detalles = analizar_expediente(page, idc)
+                    if detalles is None:
+                        raise RuntimeError("tabla de trámites vacía")
+                    with tramo("escritura_journal"):
+                        registrar_en_journal(journal, "ok", rol, idc, row={"rol": rol, "idCausa": idc, **detalles})
+                    ok += 1
+                except Exception as e:
+                    fallidas.append((rol, idc))
+                    contar("errores")
+                    registrar_en_journal(journal, "error", rol, idc, error=str(e))
+                with tramo("pausa"):
+                    time.sleep(pausa)
+            pendientes = fallidas
+
+        browser.close()
+
+    print(f"✅ [shard {shard_id}] {ok} causa(s) procesadas, {len(pendientes)} fallida(s)")
+    return ok, pendientes, corrida.exportar()
+
+
+def merge_journals() -> int:
+    """Agrega al CSV de resultados los registros de los journals que aún no estén en él."""
+    registros = leer_journals()
+    CsvAppendJournal(CSV_RESULTADOS, FIELDNAMES)  # compacta un journal pendiente de `run`
+    indice = DetalleIndex.cargar(CSV_RESULTADOS)
+
+    nuevos = [row for key, row in registros.items() if not indice.contiene(*key)]
+    total = append_detalle_csv(CSV_RESULTADOS, nuevos, indice)
+    print(f"🧩 Merge de journals: {total} registros nuevos en {CSV_RESULTADOS}")
+    return total
+
+
+def run_paralelo(workers=4, headless=True, max_reintentos=2, pausa=0.5):
+    """
+    Reparte las causas pendientes en `workers` procesos, cada uno con su
+    navegador y su journal. Es reanudable: lo que ya está en los journals no
+    se vuelve a pedir aunque el proceso anterior haya muerto antes del merge.
+    """
+    en_journal = set(leer_journals())
+    pendientes = [r for r in leer_roles_pendientes() if r not in en_journal]
+    print(f"🧮 {len(pendientes)} causa(s) pendientes tras descontar journals ({len(en_journal)} ya registradas)")
+
+    if pendientes:
+        workers = max(1, min(workers, len(pendientes)))
+        shards = [pendientes[i::workers] for i in range(workers)]
+        fallidas = []
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futuros = [
+                executor.submit(procesar_shard, i, shard, headless, max_reintentos, pausa)
+                for i, shard in enumerate(shards)
+            ]
+            for futuro in futuros:
+                try:
+                    _, fallidas_shard, metricas_shard = futuro.result()
+                    fallidas.extend(fallidas_shard)
+                    metricas().combinar(metricas_shard)
+                except Exception as e:
+                    print(f"❌ Un shard terminó con error: {e}")
+
+        if fallidas:
+            print(f"⚠️ {len(fallidas)} causa(s) sin procesar tras los reintentos: {fallidas[:10]}")
+
+    with tramo("escritura_csv"):
+        merge_journals()
+
+
 if __name__ == "__main__":
-    run(headless=False)
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=1, help="Procesos en paralelo (1 = modo secuencial)")
+    parser.add_argument("--reintentos", type=int, default=2, help="Reintentos por causa fallida")
+    parser.add_argument("--headless", action="store_true", help="Ejecutar sin ventana")
+    args = parser.parse_args()
+
+    corrida = iniciar_corrida("fecha_fallo")
+    corrida.anotar("workers", args.workers)
+    try:
+        if args.workers > 1:
+            run_paralelo(workers=args.workers, headless=args.headless, max_reintentos=args.reintentos)
+        else:
+            run(headless=args.headless)
+    finally:
+        corrida.anotar("cache_http", HttpCache.compartida().resumen())
+        corrida.guardar()
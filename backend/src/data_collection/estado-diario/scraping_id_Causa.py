@@ -1,8 +1,26 @@
+import sys
+import os
+
+# Ruta absoluta al directorio raíz del proyecto
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../.."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
 from playwright.sync_api import sync_playwright
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
 import csv
-import time
-import re
+import json
 import argparse
+from backend.src.storage_module.atomic_io import archivo_atomico, escribir_csv_atomico
+
+BASE = "https://consultas.tdlc.cl"
+SEARCH_URL = f"{BASE}/search?proc=3"
+
+FIELDNAMES = ["tipo", "rol", "fecha_ingreso", "descripcion", "procedimiento", "idcausa", "link"]
+
+# Enlace a la página siguiente del listado de resultados (no está si hay una sola página)
+SELECTOR_SIGUIENTE = "ul.pagination li:not(.disabled) a:text-matches('^(»|›|Siguiente)$')"
 
 # Lista fija de tipos de causa
 TIPOS_CAUSA = [
@@ -18,85 +36,240 @@ TIPOS_CAUSA = [
     "Acuerdo Extrajudicial"
 ]
 
-def run_scraper(output_file, headless=True):
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=headless)
-        context = browser.new_context()
-        page = context.new_page()
+# Lee las filas directamente desde el binding de Knockout de cada <tr>, así el
+# idCausa sale del modelo de la fila sin tener que abrir el popup del expediente.
+JS_FILAS_RESULTADO = """
+() => Array.from(document.querySelectorAll("table tbody tr")).map(tr => {
+    const txt = campo => {
+        const td = tr.querySelector(`td[data-bind='text: ${campo}']`);
+        return td ? td.innerText.trim() : "";
+    };
+    let d = {};
+    try {
+        if (window.ko && ko.dataFor(tr)) d = ko.toJS(ko.dataFor(tr)) || {};
+    } catch (e) {}
+    const id = d.idCausa ?? d.id ?? null;
+    return {
+        rol: (d.rolCausa ?? txt("rolCausa")).toString().trim(),
+        fecha_ingreso: txt("fechaIngreso"),
+        descripcion: (d.descripcion ?? txt("descripcion")).toString().trim(),
+        procedimiento: (d.procedimiento ?? txt("procedimiento")).toString().trim(),
+        idcausa: id === null ? null : String(id),
+    };
+})
+"""
+
+
+def parse_fecha(fecha_txt):
+    try:
+        return datetime.strptime((fecha_txt or "").strip(), "%d-%m-%Y")
+    except ValueError:
+        return None
+
 
-        print("🌐 Cargando página principal...")
-        page.goto("https://www.tdlc.cl")
-        page.click("a[href='https://consultas.tdlc.cl/search?proc=3']")
-        page.wait_for_url("https://consultas.tdlc.cl/search?proc=3")
+def _pagina_siguiente(page, primer_rol: str) -> bool:
+    """Avanza el listado una página; False si no hay más."""
+    siguiente = page.query_selector(SELECTOR_SIGUIENTE)
+    if not siguiente:
+        return False
+    siguiente.click()
+    page.wait_for_function(
+        "rol => { const td = document.querySelector(\"td[data-bind='text: rolCausa']\"); "
+        "return td && td.innerText.trim() !== rol; }",
+        arg=primer_rol, timeout=8000,
+    )
+    return True
 
-        resultados = []
 
-        for tipo in TIPOS_CAUSA:
-            print(f"\n🔍 Tipo: {tipo}")
+def buscar_tipo(page, tipo: str, desde: datetime = None) -> list[dict]:
+    """
+    Ejecuta la búsqueda de un tipo de causa y devuelve sus filas con idCausa.
+    Con `desde` sólo se devuelven las causas ingresadas en esa fecha o después;
+    como el listado viene ordenado por fecha de ingreso descendente, se deja
+    de paginar en la primera página que ya trae causas anteriores al corte.
+    """
+    page.goto(SEARCH_URL, wait_until="domcontentloaded")
+    page.select_option("select#tipo", label=tipo)
+    page.click("button[type='submit']")
+    page.wait_for_selector("td[data-bind='text: rolCausa']", timeout=8000)
+    page.wait_for_load_state("networkidle")
 
+    resultados, vistos = [], set()
+    while True:
+        filas = [f for f in page.evaluate(JS_FILAS_RESULTADO) if f["rol"]]
+        corte = False
+        for fila in filas:
+            if desde:
+                fecha = parse_fecha(fila["fecha_ingreso"])
+                if fecha and fecha < desde:
+                    corte = True
+                    continue
+            if fila["rol"] in vistos:
+                continue
+            vistos.add(fila["rol"])
+            id_causa = fila["idcausa"]
+            resultados.append({
+                "tipo": tipo,
+                **fila,
+                "link": f"{BASE}/estadoDiario?idCausa={id_causa}" if id_causa else None,
+            })
+        if corte or not filas or not _pagina_siguiente(page, filas[0]["rol"]):
+            return resultados
+
+
+def scrapear_lote(tipos: list[str], headless=True, desde_por_tipo=None) -> dict[str, list[dict]]:
+    """
+    Procesa un lote de tipos en un navegador propio (un contexto por tipo).
+    Playwright sync no es thread-safe, por eso cada worker levanta su instancia.
+    """
+    por_tipo = {}
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=headless)
+        for tipo in tipos:
+            context = browser.new_context()
+            page = context.new_page()
             try:
-                page.select_option("select#tipo", label=tipo)
-                page.click("button[type='submit']")
-                page.wait_for_selector("td[data-bind='text: rolCausa']", timeout=8000)
-                time.sleep(1.5)
+                filas = buscar_tipo(page, tipo, (desde_por_tipo or {}).get(tipo))
+                sin_id = sum(1 for f in filas if not f["idcausa"])
+                print(f"✅ {tipo}: {len(filas)} filas ({sin_id} sin idCausa)")
+                por_tipo[tipo] = filas
             except Exception as e:
                 print(f"⚠️ No se encontraron resultados para {tipo}: {e}")
-                continue
+            finally:
+                context.close()
+        browser.close()
+    return por_tipo
 
-            filas = page.query_selector_all("table tbody tr")
-            print(f"   → {len(filas)} filas encontradas")
-
-            for idx, fila in enumerate(filas):
-                try:
-                    rol = fila.query_selector("td[data-bind='text: rolCausa']").inner_text().strip()
-                    fecha = fila.query_selector("td[data-bind='text: fechaIngreso']").inner_text().strip()
-                    descripcion = fila.query_selector("td[data-bind='text: descripcion']").inner_text().strip()
-                    procedimiento = fila.query_selector("td[data-bind='text: procedimiento']").inner_text().strip()
-
-                    # Simula click para capturar popup con URL
-                    with page.expect_popup() as popup_info:
-                        btn = fila.query_selector("span.glyphicon-new-window")
-                        btn.click()
-                    popup = popup_info.value
-                    popup_url = popup.url
-                    popup.close()
-
-                    match = re.search(r"idCausa=(\d+)", popup_url)
-                    id_causa = match.group(1) if match else None
-                    link = popup_url if id_causa else None
-
-                    resultados.append({
-                        "tipo": tipo,
-                        "rol": rol,
-                        "fecha_ingreso": fecha,
-                        "descripcion": descripcion,
-                        "procedimiento": procedimiento,
-                        "idcausa": id_causa,
-                        "link": link,
-                    })
-
-                    print(f"✅ {idx+1}/{len(filas)} {rol} - {id_causa}")
-
-                except Exception as e:
-                    print(f"⚠️ Error en fila {idx+1}: {e}")
-                    continue
 
-        if resultados:
-            with open(output_file, "w", newline="", encoding="utf-8") as f:
-                writer = csv.DictWriter(f, fieldnames=resultados[0].keys())
-                writer.writeheader()
-                writer.writerows(resultados)
-            print(f"\n💾 CSV guardado como: {output_file}")
+def leer_catalogo(path) -> list[dict]:
+    if not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+def guardar_catalogo(path, filas: list[dict]):
+    escribir_csv_atomico(path, FIELDNAMES, filas)
+
+
+def upsert_catalogo(catalogo: list[dict], filas: list[dict]):
+    """Inserta o actualiza filas por rol, manteniendo el orden del catálogo."""
+    posicion = {r["rol"].strip().upper(): i for i, r in enumerate(catalogo)}
+    nuevas = actualizadas = 0
+    for fila in filas:
+        clave = fila["rol"].strip().upper()
+        if clave in posicion:
+            previa = catalogo[posicion[clave]]
+            # No pisar un idCausa conocido con uno vacío
+            combinada = {**previa, **{k: v for k, v in fila.items() if v}}
+            if combinada != previa:
+                catalogo[posicion[clave]] = combinada
+                actualizadas += 1
         else:
-            print("⚠️ No se encontraron resultados en ningún tipo de causa")
+            posicion[clave] = len(catalogo)
+            catalogo.append(fila)
+            nuevas += 1
+    return nuevas, actualizadas
 
-        browser.close()
+
+def ruta_high_water_mark(output_file):
+    return f"{output_file}.hwm.json"
+
+
+def calcular_high_water_mark(catalogo: list[dict]) -> dict[str, str]:
+    """Fecha de ingreso más reciente por tipo (dd-mm-yyyy)."""
+    maximos = {}
+    for r in catalogo:
+        fecha = parse_fecha(r.get("fecha_ingreso"))
+        tipo = r.get("tipo")
+        if fecha and (tipo not in maximos or fecha > maximos[tipo]):
+            maximos[tipo] = fecha
+    return {tipo: fecha.strftime("%d-%m-%Y") for tipo, fecha in maximos.items()}
+
+
+def leer_high_water_mark(output_file, catalogo: list[dict]) -> dict[str, datetime]:
+    path = ruta_high_water_mark(output_file)
+    marcas = None
+    if os.path.exists(path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                marcas = json.load(f).get("fecha_ingreso_max")
+        except Exception as e:
+            print(f"⚠️ No se pudo leer {path}: {e}")
+    if marcas is None:
+        marcas = calcular_high_water_mark(catalogo)
+    return {tipo: parse_fecha(fecha) for tipo, fecha in marcas.items() if parse_fecha(fecha)}
+
+
+def escribir_high_water_mark(output_file, catalogo: list[dict]):
+    with archivo_atomico(ruta_high_water_mark(output_file)) as f:
+        json.dump({
+            "fecha_ingreso_max": calcular_high_water_mark(catalogo),
+            "actualizado": datetime.now().isoformat(timespec="seconds"),
+        }, f, ensure_ascii=False, indent=2)
+
+
+def run_scraper(output_file, headless=True, tipos=None, workers=4, incremental=False):
+    """
+    Busca los tipos de causa en paralelo (repartidos en `workers` navegadores).
+    Si se pasan `tipos`, sólo se refrescan esos tipos y el resto del catálogo
+    existente se conserva tal cual.
+
+    Con `incremental=True` sólo se consideran las causas ingresadas desde la
+    última fecha registrada para cada tipo (high-water mark), y se hace upsert
+    por rol en lugar de reescribir los tipos completos.
+    """
+    tipos = tipos or TIPOS_CAUSA
+    workers = max(1, min(workers, len(tipos)))
+    lotes = [tipos[i::workers] for i in range(workers)]
+
+    catalogo = leer_catalogo(output_file)
+    desde_por_tipo = leer_high_water_mark(output_file, catalogo) if incremental and catalogo else {}
+    if desde_por_tipo:
+        print(f"⏩ Modo incremental: {len(desde_por_tipo)} tipo(s) con fecha de corte")
+
+    print(f"🌐 Buscando {len(tipos)} tipo(s) de causa con {workers} worker(s)...")
+    por_tipo = {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futuros = [executor.submit(scrapear_lote, lote, headless, desde_por_tipo) for lote in lotes]
+        for futuro in as_completed(futuros):
+            por_tipo.update(futuro.result())
+
+    if not por_tipo:
+        print("⚠️ No se encontraron resultados en ningún tipo de causa")
+        return
+
+    orden_tipos = TIPOS_CAUSA + [t for t in tipos if t not in TIPOS_CAUSA]
+    if incremental:
+        resultados = catalogo
+        nuevas, actualizadas = upsert_catalogo(
+            resultados, [f for tipo in orden_tipos for f in por_tipo.get(tipo, [])]
+        )
+        print(f"🔁 {nuevas} causa(s) nueva(s), {actualizadas} actualizada(s)")
+    else:
+        # Conserva las filas de los tipos que no se refrescaron (o que fallaron)
+        resultados = [r for r in catalogo if r.get("tipo") not in por_tipo]
+        for tipo in orden_tipos:
+            resultados.extend(por_tipo.get(tipo, []))
+
+    guardar_catalogo(output_file, resultados)
+    escribir_high_water_mark(output_file, resultados)
+    print(f"\n💾 CSV guardado como: {output_file} ({len(resultados)} filas)")
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--out", default="rol_idcausa.csv", help="Archivo de salida")
     parser.add_argument("--headful", action="store_true", help="Ejecutar en modo visible")
+    parser.add_argument("--tipo", action="append", choices=TIPOS_CAUSA, help="Refrescar sólo este tipo (repetible)")
+    parser.add_argument("--workers", type=int, default=4, help="Navegadores en paralelo")
+    parser.add_argument("--incremental", action="store_true", help="Sólo causas nuevas desde la última fecha de ingreso")
     args = parser.parse_args()
 
-    run_scraper(output_file=args.out, headless=not args.headful)
+    run_scraper(
+        output_file=args.out,
+        headless=not args.headful,
+        tipos=args.tipo,
+        workers=args.workers,
+        incremental=args.incremental,
+    )
@@ -0,0 +1,59 @@
+import sys
+import time
+import random
+import argparse
+from pathlib import Path
+
+MODULE_DIR = Path(__file__).resolve().parent
+sys.path.append(str(MODULE_DIR))
+
+from html_template import construir_html_resumen_diario, construir_html_email
+
+
+def tramites_sinteticos(n: int) -> list:
+    random.seed(n)
+    tipos = ["Resolución", "Escrito", "Certificado", "Acta", "Oficio"]
+    return [
+        {
+            "Fecha": f"{random.randint(1, 28):02d}-10-2025",
+            "Rol": f"C-{random.randint(1, 600)}-{random.choice([2023, 2024, 2025])}",
+            "Referencia": f"Trámite de prueba número {i} con una referencia de largo típico & <símbolos>",
+            "Tipo": random.choice(tipos),
+            "Firmantes": "Ministro Uno, Ministra Dos",
+            "Fojas": str(random.randint(1, 3000)),
+        }
+        for i in range(n)
+    ]
+
+
+def medir(funcion, repeticiones: int) -> float:
+    """Mejor tiempo (segundos) de `repeticiones` ejecuciones."""
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tiempo de render del correo resumen diario según cantidad de trámites")
+    parser.add_argument("--tamanos", type=int, nargs="+", default=[250, 500, 1000, 2000, 4000])
+    parser.add_argument("--repeticiones", type=int, default=20)
+    args = parser.parse_args()
+
+    t_email = medir(lambda: construir_html_email("fallo", "Título", "https://consultas.tdlc.cl", "01-10-2025", "C-1-2025", "1"), 1000)
+    print(f"📧 Correo de evento: {t_email * 1e6:.1f} µs")
+
+    print(f"{'trámites':>9} {'total (ms)':>11} {'µs/trámite':>11} {'KB':>8}")
+    base = None
+    for n in args.tamanos:
+        tramites = tramites_sinteticos(n)
+        t = medir(lambda: construir_html_resumen_diario("01-10-2025", n, tramites), args.repeticiones)
+        kb = len(construir_html_resumen_diario("01-10-2025", n, tramites)) / 1024
+        por_tramite = t / n * 1e6
+        base = base or por_tramite
+        print(f"{n:>9} {t * 1e3:>11.2f} {por_tramite:>11.2f} {kb:>8.0f}")
+
+    # Con render lineal el costo por trámite se mantiene constante al crecer el día
+    print(f"📈 µs/trámite en {args.tamanos[-1]} vs {args.tamanos[0]}: {por_tramite / base:.2f}x")
@@ -1,6 +1,8 @@
 import os
 import csv
+import atexit
 import smtplib
+import threading
 from email.message import EmailMessage
 from email.utils import formataddr 
 from pathlib import Path
@@ -13,17 +15,25 @@ sys.path.append(str(MODULE_DIR))
 
 # Importar template de forma segura
 try:
-    from html_template import construir_html_email, construir_html_resumen_diario, PLANTILLAS_HTML
+    from html_template import construir_html_email, construir_html_resumen_diario, construir_html_digest, PLANTILLAS_HTML
 except ImportError as e:
     print(f"❌ Error importando el template HTML: {e}. Asegúrate de que html_template.py existe y tiene 'construir_html_email' y 'PLANTILLAS_HTML'.")
     construir_html_email = None
     construir_html_resumen_diario = None
+    construir_html_digest = None
     PLANTILLAS_HTML = None
 
+from suscripciones import suscripciones_compartidas
+
 EMAIL_REMITENTE = os.getenv("EMAIL_REMITENTE")
 EMAIL_CLAVE_APP = os.getenv("EMAIL_CLAVE_APP")
 RUTA_CSV = Path("backend/data/notifications/notifications_emails.csv")
 
+# Servidor SMTP; con SMTP_SSL=0 se usa SMTP plano (p. ej. el servidor local de probar_smtp_local.py)
+SMTP_HOST = os.getenv("SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "465"))
+SMTP_SSL = os.getenv("SMTP_SSL", "1") != "0"
+
 def cargar_emails():
     """Carga los correos de los destinatarios desde un archivo CSV."""
     emails = []
@@ -38,21 +48,136 @@ def cargar_emails():
                 emails.append(email)
     return emails
 
-def enviar_notificacion_evento(evento: dict):
+
+class _MarcaData:
+    """Recuerda si el envío en curso llegó a DATA: desde ahí el servidor pudo haber aceptado el mensaje."""
+
+    en_data = False
+
+    def data(self, msg):
+        self.en_data = True
+        return super().data(msg)
+
+
+class _SMTP(_MarcaData, smtplib.SMTP):
+    pass
+
+
+class _SMTP_SSL(_MarcaData, smtplib.SMTP_SSL):
+    pass
+
+
+class SesionSMTP:
     """
-    Envía un único correo para un evento específico usando el template correcto.
-    Esta es una versión refactorizada de 'enviar_aviso_nuevo_documento'.
+    Una conexión SMTP autenticada que se reutiliza para todos los correos de
+    una corrida, en vez de abrir conexión, TLS y login por cada mensaje.
+
+    La conexión se abre con el primer envío. Se reconecta y reintenta una vez
+    si el servidor la cortó antes de DATA (Gmail cierra las inactivas) o si
+    respondió un error temporal (4xx). Un rechazo permanente (5xx) se propaga
+    sin reintentar, y un corte durante DATA también: el mensaje pudo haber
+    llegado y reenviarlo lo duplicaría. La lista de destinatarios se guarda en
+    memoria y sólo se relee si cambia el CSV.
     """
-    destinatarios = cargar_emails()
-    if not destinatarios:
-        print("❌ No hay destinatarios configurados. Revisa el archivo CSV.")
-        return
 
+    _compartida = None
+    _lock_compartida = threading.Lock()
+
+    def __init__(self, host=SMTP_HOST, port=SMTP_PORT, usuario=None, clave=None, usar_ssl=SMTP_SSL):
+        self.host = host
+        self.port = port
+        self.usuario = usuario or EMAIL_REMITENTE
+        self.clave = clave or EMAIL_CLAVE_APP
+        self.usar_ssl = usar_ssl
+        self._smtp = None
+        self._lock = threading.Lock()
+        self._destinatarios = None
+        self._version_csv = None
+        self.enviados = 0
+        self.conexiones = 0
+
+    @classmethod
+    def compartida(cls) -> "SesionSMTP":
+        """Sesión única del proceso; se cierra sola al salir."""
+        with cls._lock_compartida:
+            if cls._compartida is None:
+                cls._compartida = cls()
+                atexit.register(cls._compartida.cerrar)
+            return cls._compartida
+
+    def destinatarios(self) -> list:
+        version = RUTA_CSV.stat().st_mtime_ns if RUTA_CSV.exists() else None
+        if self._destinatarios is None or version != self._version_csv:
+            self._destinatarios = cargar_emails()
+            self._version_csv = version
+        return self._destinatarios
+
+    def _conectar(self):
+        if self.usar_ssl:
+            smtp = _SMTP_SSL(self.host, self.port, context=ssl.create_default_context())
+        else:
+            smtp = _SMTP(self.host, self.port)
+        if self.usuario and self.clave:
+            smtp.login(self.usuario, self.clave)
+        self._smtp = smtp
+        self.conexiones += 1
+
+    def _descartar_conexion(self):
+        if self._smtp is not None:
+            try:
+                self._smtp.close()
+            except Exception:
+                pass
+        self._smtp = None
+
+    def enviar(self, msg: EmailMessage):
+        with self._lock:
+            for intento in range(2):
+                if self._smtp is None:
+                    self._conectar()
+                self._smtp.en_data = False
+                try:
+                    self._smtp.send_message(msg)
+                    self.enviados += 1
+                    return
+                except smtplib.SMTPResponseException as e:
+                    if not 400 <= e.smtp_code < 500 or intento:
+                        raise
+                    self._descartar_conexion()
+                except smtplib.SMTPRecipientsRefused as e:
+                    # Es subclase de OSError pero no un corte: el servidor rechazó a todos los destinatarios
+                    if not all(400 <= codigo < 500 for codigo, _ in e.recipients.values()) or intento:
+                        raise
+                    self._descartar_conexion()
+                except (smtplib.SMTPServerDisconnected, OSError):
+                    en_data = self._smtp.en_data
+                    self._descartar_conexion()
+                    if en_data or intento:
+                        raise
+
+    def cerrar(self):
+        with self._lock:
+            if self._smtp is not None:
+                try:
+                    self._smtp.quit()
+                except Exception:
+                    pass
+            self._smtp = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+
+def construir_mensaje_evento(evento: dict, destinatarios: list):
+    """EmailMessage de un evento, o None si su tipo no tiene plantilla."""
     # Usamos el tipo del evento para obtener el asunto del template
     plantilla = PLANTILLAS_HTML.get(evento["tipo"])
     if not plantilla:
         print(f"❌ No se encontró plantilla para el tipo de evento: {evento['tipo']}")
-        return
+        return None
         
     asunto = f"TDLC - {plantilla['nombre']} en caso {evento.get('rol', 'Sin Rol')}"
 
@@ -74,19 +199,70 @@ def enviar_notificacion_evento(evento: dict):
 
     msg.set_content("Este correo contiene contenido en HTML. Usa un visor compatible.")
     msg.add_alternative(html, subtype="html")
+    return msg
+
+def construir_mensaje_digest(eventos: list, destinatarios: list):
+    """Un EmailMessage con varios eventos agrupados por tipo y rol."""
+    roles = sorted({e.get("rol", "") for e in eventos if e.get("rol")})
+    if len(roles) == 1:
+        asunto = f"TDLC - {len(eventos)} novedades en caso {roles[0]}"
+    else:
+        asunto = f"TDLC - {len(eventos)} novedades en {len(roles)} causas"
+
+    msg = EmailMessage()
+    msg["Subject"] = asunto
+    msg["From"] = formataddr(("📊 FK Economics Data", EMAIL_REMITENTE))
+    msg["To"] = ", ".join(destinatarios)
+
+    html = construir_html_digest(eventos)
+    msg.set_content("Este correo contiene contenido en HTML. Usa un visor compatible.")
+    msg.add_alternative(html, subtype="html")
+    return msg
+
+def mensajes_por_grupo(eventos: list, destinatarios: list):
+    """
+    (destinatarios, EmailMessage) por cada grupo de suscriptores que reciben
+    los mismos eventos: un evento solo va con su plantilla, varios en digest.
+    """
+    for emails, eventos_grupo in suscripciones_compartidas().agrupar(eventos, destinatarios):
+        if len(eventos_grupo) == 1:
+            msg = construir_mensaje_evento(eventos_grupo[0], emails)
+        else:
+            msg = construir_mensaje_digest(eventos_grupo, emails)
+        if msg is not None:
+            yield emails, msg
+
+def enviar_notificacion_evento(evento: dict, sesion: SesionSMTP = None):
+    """
+    Envía un único correo para un evento específico usando el template correcto.
+    Esta es una versión refactorizada de 'enviar_aviso_nuevo_documento'.
+    Sin `sesion` usa la conexión compartida del proceso. Sólo lo reciben los
+    destinatarios suscritos al evento (ver suscripciones.py).
+    """
+    sesion = sesion or SesionSMTP.compartida()
+    todos = sesion.destinatarios()
+    if not todos:
+        print("❌ No hay destinatarios configurados. Revisa el archivo CSV.")
+        return
+    destinatarios = suscripciones_compartidas().destinatarios(evento, todos)
+    if not destinatarios:
+        print(f"ℹ️ Nadie está suscrito a '{evento['tipo']}' en {evento.get('rol', '')}.")
+        return
+
+    msg = construir_mensaje_evento(evento, destinatarios)
+    if msg is None:
+        return
 
     try:
-        with smtplib.SMTP_SSL("smtp.gmail.com", 465) as smtp:
-            smtp.login(EMAIL_REMITENTE, EMAIL_CLAVE_APP)
-            smtp.send_message(msg)
+        sesion.enviar(msg)
         print(f"📧 Correo '{evento['tipo']}' enviado a {len(destinatarios)} destinatarios.")
     except Exception as e:
         print(f"❌ Error al enviar correo para el evento '{evento['tipo']}': {e}")
     
-def enviar_resumen_diario(fecha: str, total_tramites: int, eventos_del_dia: list, listado_tramites: list):
+def enviar_resumen_diario(fecha: str, total_tramites: int, eventos_del_dia: list, listado_tramites: list, sesion: SesionSMTP = None):
     """
-    Orquesta el envío de notificaciones individuales para cada evento importante.
-    Esta función ya no envía un resumen, sino una notificación por cada evento.
+    Notifica los eventos importantes del día: uno solo va con su plantilla
+    propia y varios se agrupan en un único correo (ver `construir_html_digest`).
     """
     if not PLANTILLAS_HTML:
         print("❌ No se puede enviar el email de resumen. Los templates HTML no se cargaron correctamente.")
@@ -96,26 +272,25 @@ def enviar_resumen_diario(fecha: str, total_tramites: int, eventos_del_dia: list
         print("✅ No se detectaron eventos importantes para enviar notificaciones.")
         return
         
-    print(f"📧 Preparando {len(eventos_del_dia)} notificaciones para enviar...")
-    for evento in eventos_del_dia:
-        enviar_notificacion_evento(evento)
-        
-    print("✅ Proceso de envío de notificaciones completado.")
-    
-def enviar_correo_resumen_diario(fecha: str, total_tramites: int, listado_tramites: list):
-    if not listado_tramites:
-        print("ℹ️ No hay trámites que incluir en el correo resumen diario.")
-        return
-
-    if not PLANTILLAS_HTML or not construir_html_resumen_diario:
-        print("❌ No se puede construir correo de resumen diario. Faltan plantillas o funciones.")
+    sesion = sesion or SesionSMTP.compartida()
+    if len(eventos_del_dia) == 1:
+        enviar_notificacion_evento(eventos_del_dia[0], sesion)
         return
 
-    destinatarios = cargar_emails()
+    # Varios eventos: un correo agrupado por tipo y rol para cada grupo de suscriptores
+    destinatarios = sesion.destinatarios()
     if not destinatarios:
-        print("❌ No hay destinatarios para enviar el resumen diario.")
+        print("❌ No hay destinatarios configurados. Revisa el archivo CSV.")
         return
-
+    print(f"📧 Preparando un resumen con {len(eventos_del_dia)} eventos...")
+    for emails, msg in mensajes_por_grupo(eventos_del_dia, destinatarios):
+        try:
+            sesion.enviar(msg)
+            print(f"✅ {msg['Subject']} → {len(emails)} destinatarios.")
+        except Exception as e:
+            print(f"❌ Error al enviar el resumen de eventos: {e}")
+    
+def construir_mensaje_resumen(fecha: str, total_tramites: int, listado_tramites: list, destinatarios: list):
     asunto = f"📋 Resumen Diario TDLC – {fecha}"
 
     msg = EmailMessage()
@@ -126,11 +301,26 @@ def enviar_correo_resumen_diario(fecha: str, total_tramites: int, listado_tramit
     html = construir_html_resumen_diario(fecha, total_tramites, listado_tramites)
     msg.set_content("Este correo contiene contenido en HTML. Usa un visor compatible.")
     msg.add_alternative(html, subtype="html")
+    return msg
+
+def enviar_correo_resumen_diario(fecha: str, total_tramites: int, listado_tramites: list, sesion: SesionSMTP = None):
+    if not listado_tramites:
+        print("ℹ️ No hay trámites que incluir en el correo resumen diario.")
+        return
+
+    if not PLANTILLAS_HTML or not construir_html_resumen_diario:
+        print("❌ No se puede construir correo de resumen diario. Faltan plantillas o funciones.")
+        return
+
+    sesion = sesion or SesionSMTP.compartida()
+    destinatarios = suscripciones_compartidas().destinatarios({"tipo": "resumen_diario"}, sesion.destinatarios())
+    if not destinatarios:
+        print("❌ No hay destinatarios para enviar el resumen diario.")
+        return
 
+    msg = construir_mensaje_resumen(fecha, total_tramites, listado_tramites, destinatarios)
     try:
-        with smtplib.SMTP_SSL("smtp.gmail.com", 465) as smtp:
-            smtp.login(EMAIL_REMITENTE, EMAIL_CLAVE_APP)
-            smtp.send_message(msg)
+        sesion.enviar(msg)
         print(f"📬 Correo resumen del día enviado a {len(destinatarios)} destinatarios.")
     except Exception as e:
         print(f"❌ Error al enviar el correo resumen del día: {e}")
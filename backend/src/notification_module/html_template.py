@@ -1,3 +1,7 @@
+from html import escape
+from functools import lru_cache
+from string import Formatter
+
 # Colores FK Economics
 fk_primary = "#2697E1"
 fk_secondary = "#222222"
@@ -150,123 +154,230 @@ PLANTILLAS_HTML = {
 
 }
 
-def construir_html_email(tipo: str, titulo: str, url: str, fecha: str, rol: str, id_causa: str) -> str:
-    # Colores FK Economics
-    fk_primary = "#2697E1"
-    fk_secondary = "#222222"
-    fk_text = "#7C7B7E"
-    fk_bg = "#F7F7F7"
+class Marcado(str):
+    """HTML ya armado que se inserta tal cual (no se escapa)."""
 
-    # Obtener la plantilla y el color según el tipo de notificación
-    plantilla = PLANTILLAS_HTML.get(tipo, {})
-    tipo_color = plantilla.get("color", fk_primary)
-    tipo_nombre = plantilla.get("nombre", "Notificación del TDLC")
-    cuerpo_html = plantilla.get("cuerpo", "<p>No hay contenido disponible para este tipo de notificación.</p>")
-
-    # Formatear el cuerpo del HTML con los datos
-    cuerpo_formateado = cuerpo_html.format(
-        fk_text=fk_text,
-        titulo=titulo,
-        fecha=fecha,
-        rol=rol,
-        id_causa=id_causa,
-        url=url
-    )
 
-    return f"""
+class PlantillaCompilada:
+    """
+    Plantilla con campos `{nombre}` que se analiza una sola vez: guarda los
+    trozos de texto fijo y el nombre de cada campo, y al renderizar sólo
+    intercala los valores. Los valores se escapan como HTML salvo que vengan
+    como `Marcado`.
+    """
+
+    def __init__(self, texto: str):
+        self.partes = []
+        for literal, campo, formato, conversion in Formatter().parse(texto):
+            if formato or conversion:
+                raise ValueError(f"campo con formato no soportado: {campo}")
+            self.partes.append((literal, campo))
+
+    def escribir(self, salida: list, valores: dict):
+        """Agrega el resultado a `salida` (lista de trozos que se une una sola vez al final)."""
+        for literal, campo in self.partes:
+            salida.append(literal)
+            if campo is not None:
+                valor = valores[campo]
+                salida.append(valor if isinstance(valor, Marcado) else escape(str(valor)))
+
+    def render(self, **valores) -> str:
+        salida = []
+        self.escribir(salida, valores)
+        return Marcado("".join(salida))
+
+
+@lru_cache(maxsize=None)
+def compilar(texto: str) -> PlantillaCompilada:
+    return PlantillaCompilada(texto)
+
+
+def cuerpo_compilado(tipo: str):
+    plantilla = PLANTILLAS_HTML.get(tipo)
+    return compilar(plantilla["cuerpo"]) if plantilla else None
+
+
+ESTILO_CELDA = "padding: 6px 10px; border: 1px solid #ccc; font-size: 13px;"
+ESTILO_ENCABEZADO = "padding: 8px; background-color: #f0f0f0; border: 1px solid #ccc; text-align: left;"
+COLUMNAS_RESUMEN = ["Fecha", "Rol", "Referencia", "Tipo", "Firmantes", "Fojas"]
+
+PIE_HTML = f"""
+            <tr>
+                <td style="background-color: #F0F0F0; padding: 18px; text-align: center; font-size: 12px; color: {fk_text};">
+                    Sistema de Monitoreo del TDLC — <strong>FK Economics</strong><br>
+                    Este mensaje fue generado automáticamente.
+                </td>
+            </tr>"""
+
+PLANTILLA_EMAIL = compilar(f"""
     <!DOCTYPE html>
     <html lang="es">
     <head>
         <meta charset="UTF-8">
-        <title>{tipo_nombre}</title>
+        <title>{{tipo_nombre}}</title>
     </head>
     <body style="margin: 0; padding: 20px; font-family: 'Arial', sans-serif; background-color: {fk_bg};">
         <table width="100%" cellpadding="0" cellspacing="0" style="max-width: 600px; margin: auto; background-color: #FFFFFF; border-radius: 8px; box-shadow: 0 4px 12px rgba(0,0,0,0.1); overflow: hidden;">
             <tr>
-                <td style="background-color: {tipo_color}; color: white; padding: 20px 30px; font-size: 22px; font-weight: bold;">
-                    {tipo_nombre} – Rol {rol}
+                <td style="background-color: {{tipo_color}}; color: white; padding: 20px 30px; font-size: 22px; font-weight: bold;">
+                    {{tipo_nombre}} – Rol {{rol}}
                 </td>
             </tr>
             <tr>
                 <td style="padding: 30px;">
-                    {cuerpo_formateado}
-                    <a href="{url}" target="_blank" style="display: inline-block; background-color: {fk_primary}; color: #FFFFFF; text-decoration: none; padding: 12px 20px; border-radius: 5px; font-weight: bold; font-size: 14px;">
+                    {{cuerpo}}
+                    <a href="{{url}}" target="_blank" style="display: inline-block; background-color: {fk_primary}; color: #FFFFFF; text-decoration: none; padding: 12px 20px; border-radius: 5px; font-weight: bold; font-size: 14px;">
                         Ver causa completa
                     </a>
                 </td>
-            </tr>
-            <tr>
-                <td style="background-color: #F0F0F0; padding: 18px; text-align: center; font-size: 12px; color: {fk_text};">
-                    Sistema de Monitoreo del TDLC — <strong>FK Economics</strong><br>
-                    Este mensaje fue generado automáticamente.
-                </td>
-            </tr>
+            </tr>{PIE_HTML}
         </table>
     </body>
     </html>
-    """
-    
-def construir_html_resumen_diario(fecha: str, total_tramites: int, listado_tramites: list) -> str:
-    plantilla = PLANTILLAS_HTML.get("resumen_diario", {})
-    tipo_color = plantilla.get("color", "#222222")
-    tipo_nombre = plantilla.get("nombre", "Resumen Diario del TDLC")
-    cuerpo_html = plantilla.get("cuerpo", "")
-
-    # Convertimos la tabla de trámites en HTML
-    if listado_tramites:
-        columnas = ["Fecha", "Rol", "Referencia", "Tipo", "Firmantes", "Fojas"]
-        filas_html = ""
-        for tramite in listado_tramites:
-            fila = "<tr>" + "".join(
-                f"<td style='padding: 6px 10px; border: 1px solid #ccc; font-size: 13px;'>{tramite.get(col, '')}</td>"
-                for col in columnas
-            ) + "</tr>"
-            filas_html += fila
-
-        tabla_html = f"""
-        <table style="border-collapse: collapse; width: 100%; margin-top: 20px;">
-            <thead>
-                <tr>{"".join(f"<th style='padding: 8px; background-color: #f0f0f0; border: 1px solid #ccc; text-align: left;'>{col}</th>" for col in columnas)}</tr>
-            </thead>
-            <tbody>{filas_html}</tbody>
-        </table>
-        """
-    else:
-        tabla_html = "<p style='color: #999;'>No se registraron trámites hoy.</p>"
-
-    cuerpo_formateado = cuerpo_html.format(
-        fk_text="#7C7B7E",
-        fecha=fecha,
-        total_tramites=total_tramites,
-        tabla_tramites=tabla_html
-    )
+    """)
 
-    return f"""
+PLANTILLA_RESUMEN = compilar(f"""
     <!DOCTYPE html>
     <html lang="es">
     <head>
         <meta charset="UTF-8">
-        <title>{tipo_nombre}</title>
+        <title>{{tipo_nombre}}</title>
     </head>
-    <body style="margin: 0; padding: 20px; font-family: Arial, sans-serif; background-color: #F7F7F7;">
+    <body style="margin: 0; padding: 20px; font-family: Arial, sans-serif; background-color: {fk_bg};">
         <table width="100%" cellpadding="0" cellspacing="0" style="max-width: 700px; margin: auto; background-color: #FFFFFF; border-radius: 8px; box-shadow: 0 4px 12px rgba(0,0,0,0.1); overflow: hidden;">
             <tr>
-                <td style="background-color: {tipo_color}; color: white; padding: 20px 30px; font-size: 20px; font-weight: bold;">
-                    {tipo_nombre} – {fecha}
+                <td style="background-color: {{tipo_color}}; color: white; padding: 20px 30px; font-size: 20px; font-weight: bold;">
+                    {{tipo_nombre}} – {{fecha}}
                 </td>
             </tr>
             <tr>
                 <td style="padding: 30px;">
-                    {cuerpo_formateado}
+                    {{cuerpo}}
                 </td>
-            </tr>
+            </tr>{PIE_HTML}
+        </table>
+    </body>
+    </html>
+    """)
+
+PLANTILLA_DIGEST = compilar(f"""
+    <!DOCTYPE html>
+    <html lang="es">
+    <head>
+        <meta charset="UTF-8">
+        <title>Novedades del TDLC</title>
+    </head>
+    <body style="margin: 0; padding: 20px; font-family: Arial, sans-serif; background-color: {fk_bg};">
+        <table width="100%" cellpadding="0" cellspacing="0" style="max-width: 700px; margin: auto; background-color: #FFFFFF; border-radius: 8px; box-shadow: 0 4px 12px rgba(0,0,0,0.1); overflow: hidden;">
             <tr>
-                <td style="background-color: #F0F0F0; padding: 18px; text-align: center; font-size: 12px; color: #7C7B7E;">
-                    Sistema de Monitoreo del TDLC — <strong>FK Economics</strong><br>
-                    Este mensaje fue generado automáticamente.
+                <td style="background-color: {fk_secondary}; color: white; padding: 20px 30px; font-size: 20px; font-weight: bold;">
+                    Novedades del TDLC – {{total}} evento(s)
                 </td>
             </tr>
+            <tr>
+                <td style="padding: 30px; color: {fk_text};">
+                    <p>Se detectaron los siguientes eventos en las causas monitoreadas:</p>
+                    {{secciones}}
+                </td>
+            </tr>{PIE_HTML}
         </table>
     </body>
     </html>
+    """)
+
+# La tabla de trámites puede tener miles de filas: cada fila se escribe en la
+# misma lista de trozos y se une una sola vez (tiempo lineal en el total)
+FILA_RESUMEN = compilar(
+    "<tr>" + "".join(f"<td style='{ESTILO_CELDA}'>{{{i}}}</td>" for i in range(len(COLUMNAS_RESUMEN))) + "</tr>"
+)
+ENCABEZADO_RESUMEN = "".join(f"<th style='{ESTILO_ENCABEZADO}'>{col}</th>" for col in COLUMNAS_RESUMEN)
+
+FILA_DIGEST = compilar(
+    f"<tr>"
+    f"<td style='{ESTILO_CELDA} font-weight: bold;'>{{rol}}</td>"
+    f"<td style='{ESTILO_CELDA}'>{{fecha}}</td>"
+    f"<td style='{ESTILO_CELDA}'>{{titulo}}</td>"
+    f"<td style='{ESTILO_CELDA}'><a href='{{url}}' target='_blank' style='color: {fk_primary};'>Ver causa</a></td>"
+    f"</tr>"
+)
+ENCABEZADO_DIGEST = "".join(f"<th style='{ESTILO_ENCABEZADO}'>{col}</th>" for col in ["Rol", "Fecha", "Detalle", ""])
+
+
+def construir_html_email(tipo: str, titulo: str, url: str, fecha: str, rol: str, id_causa: str) -> str:
+    # Obtener la plantilla y el color según el tipo de notificación
+    plantilla = PLANTILLAS_HTML.get(tipo, {})
+    cuerpo = cuerpo_compilado(tipo)
+    if cuerpo is not None:
+        cuerpo = cuerpo.render(titulo=titulo, fecha=fecha, rol=rol, id_causa=id_causa)
+    else:
+        cuerpo = Marcado("<p>No hay contenido disponible para este tipo de notificación.</p>")
+
+    return PLANTILLA_EMAIL.render(
+        tipo_nombre=plantilla.get("nombre", "Notificación del TDLC"),
+        tipo_color=plantilla.get("color", fk_primary),
+        rol=rol,
+        cuerpo=cuerpo,
+        url=url,
+    )
+
+
+def construir_html_resumen_diario(fecha: str, total_tramites: int, listado_tramites: list) -> str:
+    plantilla = PLANTILLAS_HTML.get("resumen_diario", {})
+
+    # Convertimos la tabla de trámites en HTML
+    if listado_tramites:
+        partes = ['\n        <table style="border-collapse: collapse; width: 100%; margin-top: 20px;">\n'
+                  f'            <thead>\n                <tr>{ENCABEZADO_RESUMEN}</tr>\n            </thead>\n'
+                  '            <tbody>']
+        for tramite in listado_tramites:
+            FILA_RESUMEN.escribir(partes, {str(i): tramite.get(col, "") for i, col in enumerate(COLUMNAS_RESUMEN)})
+        partes.append("</tbody>\n        </table>\n        ")
+        tabla_html = Marcado("".join(partes))
+    else:
+        tabla_html = Marcado("<p style='color: #999;'>No se registraron trámites hoy.</p>")
+
+    cuerpo = cuerpo_compilado("resumen_diario")
+    cuerpo = cuerpo.render(fk_text=fk_text, fecha=fecha, total_tramites=total_tramites, tabla_tramites=tabla_html) if cuerpo else tabla_html
+
+    return PLANTILLA_RESUMEN.render(
+        tipo_nombre=plantilla.get("nombre", "Resumen Diario del TDLC"),
+        tipo_color=plantilla.get("color", "#222222"),
+        fecha=fecha,
+        cuerpo=cuerpo,
+    )
+
+
+def construir_html_digest(eventos: list) -> str:
+    """
+    Un solo correo con varios eventos, agrupados por tipo y dentro de cada
+    tipo por rol. Cada evento usa las mismas claves que `construir_html_email`
+    (con los nombres alternativos que generan los scrapers).
     """
+    grupos = {}
+    for evento in eventos:
+        por_rol = grupos.setdefault(evento.get("tipo", ""), {})
+        por_rol.setdefault(evento.get("rol", "") or "Sin Rol", []).append(evento)
+
+    partes = []
+    for tipo, por_rol in grupos.items():
+        plantilla = PLANTILLAS_HTML.get(tipo, {})
+        filas = []
+        for rol, eventos_rol in por_rol.items():
+            for evento in eventos_rol:
+                FILA_DIGEST.escribir(filas, {
+                    "rol": rol,
+                    "fecha": evento.get("fecha") or evento.get("Fecha", ""),
+                    "titulo": evento.get("titulo") or evento.get("descripcion") or evento.get("Referencia", ""),
+                    "url": evento.get("url") or evento.get("link") or evento.get("Link_Descarga", ""),
+                })
+        partes.append(
+            f'\n        <h3 style="color: {escape(plantilla.get("color", fk_primary))}; margin: 24px 0 8px 0;">'
+            f'{escape(plantilla.get("nombre", "Notificación del TDLC"))} ({sum(map(len, por_rol.values()))})</h3>\n'
+            f'        <table style="border-collapse: collapse; width: 100%;">\n'
+            f'            <thead>\n                <tr>{ENCABEZADO_DIGEST}</tr>\n            </thead>\n'
+            f'            <tbody>'
+        )
+        partes.extend(filas)
+        partes.append("</tbody>\n        </table>\n        ")
+
+    return PLANTILLA_DIGEST.render(total=len(eventos), secciones=Marcado("".join(partes)))
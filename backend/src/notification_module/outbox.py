@@ -0,0 +1,381 @@
+import os
+import sys
+import json
+import time
+import random
+import sqlite3
+import argparse
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+# Mismo esquema de imports que email_notifier (funciona como script y como módulo)
+MODULE_DIR = Path(__file__).resolve().parent
+sys.path.append(str(MODULE_DIR))
+
+from email_notifier import SesionSMTP, construir_mensaje_evento, construir_mensaje_resumen, mensajes_por_grupo
+from html_template import PLANTILLAS_HTML
+from suscripciones import suscripciones_compartidas
+
+RUTA_OUTBOX = Path("backend/data/notifications/outbox.sqlite")
+
+# Tiempo que un envío queda reservado por un despachador; si el proceso muere
+# sin confirmarlo, pasado este plazo otro despachador lo vuelve a tomar
+LEASE_SEGUNDOS = 300
+
+# Los eventos se juntan durante esta ventana (segundos, desde el más antiguo
+# pendiente) y salen en un solo correo. Con NOTIF_VENTANA_DIGEST=-1 se manda
+# un correo por evento como antes.
+VENTANA_DIGEST = float(os.getenv("NOTIF_VENTANA_DIGEST", "120"))
+MAX_EVENTOS_DIGEST = 200
+
+
+def clave_evento(evento: dict) -> str:
+    """Clave de idempotencia (tipo, rol, fecha): el mismo evento no se encola dos veces."""
+    fecha = str(evento.get("fecha") or evento.get("Fecha") or "").strip()[:10]
+    return f"{str(evento.get('tipo', '')).strip().lower()}|{str(evento.get('rol', '')).strip().upper()}|{fecha}"
+
+
+class Outbox:
+    """
+    Cola persistente de notificaciones (SQLite). Los scrapers sólo encolan, lo
+    que es un insert local, y el envío real lo hace `Despachador` por separado.
+
+    Cada fila pasa por pendiente → enviando → enviado, o vuelve a pendiente
+    con un `proximo_intento` posterior si el envío falla. Tras `max_intentos`
+    queda en fallido para revisión manual.
+
+    Las filas con `clave` son únicas: volver a encolar la misma clave (p. ej.
+    al re-ejecutar un scraper sobre el mismo día) no hace nada, salvo que esa
+    fila haya quedado en fallido; en ese caso vuelve a pendiente con el
+    payload nuevo y los intentos en cero.
+    """
+
+    def __init__(self, path=RUTA_OUTBOX):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS outbox ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT, clase TEXT NOT NULL, payload TEXT NOT NULL,"
+            " estado TEXT NOT NULL DEFAULT 'pendiente', intentos INTEGER NOT NULL DEFAULT 0,"
+            " proximo_intento REAL NOT NULL, error TEXT, creado REAL NOT NULL, enviado REAL)"
+        )
+        columnas = {fila[1] for fila in self._conn.execute("PRAGMA table_info(outbox)")}
+        if "clave" not in columnas:
+            self._conn.execute("ALTER TABLE outbox ADD COLUMN clave TEXT")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS outbox_cola ON outbox (estado, proximo_intento)")
+        self._conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS outbox_clave ON outbox (clave)")
+
+    def encolar(self, clase: str, payload: dict, clave: str = None):
+        """
+        Id de la fila nueva (o de la fallida que se reactivó), o None si ya
+        había una con la misma clave pendiente, en curso o enviada.
+        """
+        ahora = time.time()
+        texto = json.dumps(payload, ensure_ascii=False, default=str)
+        with self._lock, self._conn:
+            cur = self._conn.execute(
+                "INSERT OR IGNORE INTO outbox (clase, payload, proximo_intento, creado, clave) VALUES (?, ?, ?, ?, ?)",
+                (clase, texto, ahora, ahora, clave),
+            )
+            if cur.rowcount:
+                return cur.lastrowid
+            fila = self._conn.execute(
+                "SELECT id FROM outbox WHERE clave = ? AND estado = 'fallido'", (clave,)
+            ).fetchone()
+            if fila is None:
+                return None
+            self._conn.execute(
+                "UPDATE outbox SET clase = ?, payload = ?, estado = 'pendiente', intentos = 0, error = NULL,"
+                " proximo_intento = ?, creado = ? WHERE id = ?",
+                (clase, texto, ahora, ahora, fila[0]),
+            )
+            return fila[0]
+
+    def _tomar(self, condicion: str, parametros: tuple, limite: int, ahora: float):
+        filas = self._conn.execute(
+            "SELECT id, clase, payload, intentos FROM outbox "
+            f"WHERE estado IN ('pendiente', 'enviando') AND proximo_intento <= ? AND {condicion} "
+            "ORDER BY id LIMIT ?",
+            (ahora, *parametros, limite),
+        ).fetchall()
+        self._conn.executemany(
+            "UPDATE outbox SET estado = 'enviando', proximo_intento = ? WHERE id = ?",
+            [(ahora + LEASE_SEGUNDOS, f[0]) for f in filas],
+        )
+        return [(i, clase, json.loads(payload), intentos) for i, clase, payload, intentos in filas]
+
+    def reservar(self, limite: int, excluir: tuple = ()) -> list[tuple[int, str, dict, int]]:
+        """Toma hasta `limite` envíos vencidos (salvo las clases `excluir`) y los marca como en curso."""
+        ahora = time.time()
+        condicion = f"clase NOT IN ({', '.join('?' * len(excluir))})" if excluir else "1"
+        with self._lock, self._conn:
+            return self._tomar(condicion, tuple(excluir), limite, ahora)
+
+    def reservar_digest(self, ventana: float, limite: int = MAX_EVENTOS_DIGEST) -> list[tuple[int, str, dict, int]]:
+        """
+        Toma los eventos vencidos para mandarlos juntos, pero sólo cuando el
+        más antiguo ya esperó `ventana` segundos; antes devuelve [] para que
+        sigan llegando eventos al mismo correo.
+        """
+        ahora = time.time()
+        with self._lock, self._conn:
+            mas_antiguo = self._conn.execute(
+                "SELECT MIN(creado) FROM outbox WHERE clase = 'evento' "
+                "AND estado IN ('pendiente', 'enviando') AND proximo_intento <= ?",
+                (ahora,),
+            ).fetchone()[0]
+            if mas_antiguo is None or ahora - mas_antiguo < ventana:
+                return []
+            return self._tomar("clase = 'evento'", (), limite, ahora)
+
+    def marcar_enviado(self, id_: int):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE outbox SET estado = 'enviado', enviado = ?, error = NULL WHERE id = ?", (time.time(), id_)
+            )
+
+    def marcar_error(self, id_: int, intentos: int, error: str, espera: float, definitivo: bool):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE outbox SET estado = ?, intentos = ?, error = ?, proximo_intento = ? WHERE id = ?",
+                ("fallido" if definitivo else "pendiente", intentos, error, time.time() + espera, id_),
+            )
+
+    def pendientes(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM outbox WHERE estado IN ('pendiente', 'enviando')"
+            ).fetchone()[0]
+
+
+_outbox = None
+_lock_outbox = threading.Lock()
+
+
+def outbox_compartido() -> Outbox:
+    global _outbox
+    with _lock_outbox:
+        if _outbox is None:
+            _outbox = Outbox()
+        return _outbox
+
+
+def encolar_evento(evento: dict):
+    """Deja una notificación de evento en la cola (salvo que ya esté); la envía el despachador."""
+    return outbox_compartido().encolar("evento", evento, clave=clave_evento(evento))
+
+
+def encolar_eventos(eventos: list) -> int:
+    nuevos = sum(1 for evento in eventos if encolar_evento(evento) is not None)
+    if eventos:
+        repetidos = len(eventos) - nuevos
+        print(f"📨 {nuevos} notificación(es) encoladas para envío" + (f" ({repetidos} ya notificadas)." if repetidos else "."))
+    return nuevos
+
+
+def encolar_resumen_diario(fecha: str, total_tramites: int, listado_tramites: list):
+    if not listado_tramites:
+        print("ℹ️ No hay trámites que incluir en el correo resumen diario.")
+        return None
+    return outbox_compartido().encolar(
+        "resumen", {"fecha": fecha, "total_tramites": total_tramites, "listado_tramites": listado_tramites},
+        clave=f"resumen||{fecha}",
+    )
+
+
+class Despachador:
+    """
+    Vacía el outbox con `workers` hilos, cada uno con su propia conexión SMTP.
+    Un envío fallido se reintenta con backoff exponencial (más jitter) hasta
+    `max_intentos`. Puede correr como proceso aparte (`python outbox.py`) o en
+    segundo plano dentro de un scraper con `iniciar()` / `detener()`.
+
+    Con `ventana_digest` los eventos no salen uno por uno: se juntan durante la
+    ventana y se mandan en un solo correo agrupado por tipo y rol. Con None
+    (o negativo) cada evento va en su propio correo.
+    """
+
+    def __init__(self, outbox: Outbox = None, workers=2, max_intentos=6, backoff_base=30, backoff_max=3600,
+                 ventana_digest=VENTANA_DIGEST):
+        self.outbox = outbox or outbox_compartido()
+        self.workers = workers
+        self.ventana_digest = ventana_digest if ventana_digest is not None and ventana_digest >= 0 else None
+        self.max_intentos = max_intentos
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._local = threading.local()
+        self._sesiones = []
+        self._lock = threading.Lock()
+        self._detener = threading.Event()
+        self._hilo = None
+        self._pool = None
+        self.enviados = 0
+        self.errores = 0
+        self.digests = 0
+
+    def _sesion(self) -> SesionSMTP:
+        if getattr(self._local, "sesion", None) is None:
+            self._local.sesion = SesionSMTP()
+            with self._lock:
+                self._sesiones.append(self._local.sesion)
+        return self._local.sesion
+
+    def _despachar(self, clase: str, payload: dict):
+        sesion = self._sesion()
+        todos = sesion.destinatarios()
+        if not todos:
+            raise RuntimeError("no hay destinatarios configurados")
+        destinatarios = suscripciones_compartidas().destinatarios(
+            payload if clase == "evento" else {"tipo": "resumen_diario"}, todos
+        )
+        if not destinatarios:
+            return  # nadie suscrito: queda como enviado
+        if clase == "evento":
+            msg = construir_mensaje_evento(payload, destinatarios)
+            if msg is None:
+                return  # sin plantilla: no tiene sentido reintentar
+        elif clase == "resumen":
+            msg = construir_mensaje_resumen(payload["fecha"], payload["total_tramites"], payload["listado_tramites"], destinatarios)
+        else:
+            raise ValueError(f"clase de notificación desconocida: {clase}")
+        sesion.enviar(msg)
+
+    def _despachar_digest(self, eventos: list):
+        sesion = self._sesion()
+        destinatarios = sesion.destinatarios()
+        if not destinatarios:
+            raise RuntimeError("no hay destinatarios configurados")
+        # Un correo por grupo de suscriptores. Si falla uno a mitad de camino
+        # se reintenta el lote completo: mejor un correo repetido que perder uno.
+        for _, msg in mensajes_por_grupo(eventos, destinatarios):
+            sesion.enviar(msg)
+
+    def _registrar_error(self, id_: int, clase: str, intentos: int, error: Exception):
+        intentos += 1
+        definitivo = intentos >= self.max_intentos
+        espera = min(self.backoff_max, self.backoff_base * 2 ** (intentos - 1)) * random.uniform(0.8, 1.2)
+        self.outbox.marcar_error(id_, intentos, str(error), espera, definitivo)
+        with self._lock:
+            self.errores += 1
+        estado = "descartado" if definitivo else f"reintento en {espera:.0f}s"
+        print(f"❌ Notificación {id_} ({clase}) falló [{intentos}/{self.max_intentos}]: {error} → {estado}")
+
+    def _procesar(self, item):
+        id_, clase, payload, intentos = item
+        try:
+            self._despachar(clase, payload)
+        except Exception as e:
+            self._registrar_error(id_, clase, intentos, e)
+            return
+        self.outbox.marcar_enviado(id_)
+        with self._lock:
+            self.enviados += 1
+
+    def _procesar_digest(self, lote: list):
+        # Sin plantilla no hay nada que mostrar; se descartan igual que en `_despachar`
+        validos = []
+        for item in lote:
+            if item[2].get("tipo") in PLANTILLAS_HTML:
+                validos.append(item)
+            else:
+                self.outbox.marcar_enviado(item[0])
+        if len(validos) <= 1:
+            for item in validos:
+                self._procesar(item)
+            return
+        try:
+            self._despachar_digest([payload for _, _, payload, _ in validos])
+        except Exception as e:
+            for id_, clase, _, intentos in validos:
+                self._registrar_error(id_, clase, intentos, e)
+            return
+        for id_, *_ in validos:
+            self.outbox.marcar_enviado(id_)
+        with self._lock:
+            self.enviados += len(validos)
+            self.digests += 1
+        print(f"📧 Resumen con {len(validos)} eventos enviado.")
+
+    def vaciar(self, forzar=False) -> int:
+        """
+        Envía todo lo que esté vencido ahora; devuelve cuántos se procesaron.
+        Con `forzar` los eventos en espera de digest salen sin esperar la ventana.
+        """
+        if self._pool is None:
+            # Pool fijo: cada hilo conserva su conexión SMTP entre vaciados
+            self._pool = ThreadPoolExecutor(max_workers=self.workers)
+        procesados = 0
+        excluir = ()
+        if self.ventana_digest is not None:
+            excluir = ("evento",)
+            while True:
+                lote = self.outbox.reservar_digest(0 if forzar else self.ventana_digest)
+                if not lote:
+                    break
+                self._procesar_digest(lote)
+                procesados += len(lote)
+        while True:
+            lote = self.outbox.reservar(self.workers * 4, excluir=excluir)
+            if not lote:
+                break
+            list(self._pool.map(self._procesar, lote))
+            procesados += len(lote)
+        return procesados
+
+    def correr(self, continuo=False, intervalo=5):
+        """
+        Vacía la cola. En modo continuo sigue esperando nuevos envíos (y los
+        reintentos programados) hasta `detener()`; si no, los reintentos
+        quedan para la próxima ejecución y los eventos salen sin esperar la
+        ventana del digest.
+        """
+        self.vaciar(forzar=not continuo)
+        while continuo and not self._detener.wait(intervalo):
+            self.vaciar()
+
+    def iniciar(self, intervalo=2):
+        """Despacha en un hilo de fondo mientras el proceso sigue scrapeando."""
+        self._hilo = threading.Thread(target=self.correr, kwargs={"continuo": True, "intervalo": intervalo}, daemon=True)
+        self._hilo.start()
+        return self
+
+    def detener(self, timeout=60):
+        """Detiene el hilo de fondo tras un último vaciado de lo ya encolado."""
+        self._detener.set()
+        if self._hilo:
+            self._hilo.join(timeout)
+        self.vaciar(forzar=True)
+        self.cerrar()
+        print(f"📬 Despachador: {self.enviados} enviados ({self.digests} digests), {self.errores} errores, {self.outbox.pendientes()} pendientes")
+
+    def cerrar(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+        with self._lock:
+            for sesion in self._sesiones:
+                sesion.cerrar()
+            self._sesiones.clear()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Despacha las notificaciones encoladas en el outbox")
+    parser.add_argument("--workers", type=int, default=2, help="Conexiones SMTP en paralelo")
+    parser.add_argument("--continuo", action="store_true", help="Sigue esperando nuevas notificaciones")
+    parser.add_argument("--max-intentos", type=int, default=6)
+    parser.add_argument("--ventana-digest", type=float, default=VENTANA_DIGEST,
+                        help="Segundos que se juntan eventos en un solo correo (negativo: un correo por evento)")
+    args = parser.parse_args()
+
+    despachador = Despachador(workers=args.workers, max_intentos=args.max_intentos, ventana_digest=args.ventana_digest)
+    try:
+        despachador.correr(continuo=args.continuo)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        despachador.cerrar()
+    print(f"📬 {despachador.enviados} enviados ({despachador.digests} digests), {despachador.errores} errores, {despachador.outbox.pendientes()} pendientes")
@@ -0,0 +1,208 @@
+import sys
+import smtplib
+import socketserver
+import threading
+from email.message import EmailMessage
+from pathlib import Path
+
+MODULE_DIR = Path(__file__).resolve().parent
+sys.path.append(str(MODULE_DIR))
+
+from email_notifier import SesionSMTP
+
+
+class ServidorSMTP(socketserver.ThreadingTCPServer):
+    """
+    SMTP mínimo en 127.0.0.1 que guarda lo recibido y puede fallar a pedido,
+    para probar la sesión compartida sin salir a internet. Se usa un servidor
+    propio y no aiosmtpd porque hay que poder cortar la conexión a mitad de DATA.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.recibidos = []
+        self.conexiones = 0
+        self.abiertas = set()
+        self.rechazar_rcpt = set()  # destinatarios que reciben 550
+        self.fallas_data = []       # "451" o "cortar", una por mensaje, en orden
+        self._lock = threading.Lock()
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    def cortar_conexiones(self):
+        """Como un servidor que cierra las conexiones inactivas."""
+        with self._lock:
+            for handler in list(self.abiertas):
+                handler.cerrar()
+
+    def detener(self):
+        self.cortar_conexiones()
+        self.shutdown()
+        self.server_close()
+
+
+class _Handler(socketserver.StreamRequestHandler):
+
+    def cerrar(self):
+        try:
+            self.request.shutdown(2)
+        except OSError:
+            pass
+
+    def responder(self, linea: str):
+        self.wfile.write(f"{linea}\r\n".encode())
+
+    def handle(self):
+        servidor = self.server
+        with servidor._lock:
+            servidor.conexiones += 1
+            servidor.abiertas.add(self)
+        try:
+            self.responder("220 localhost ESMTP prueba")
+            destinatarios = []
+            while True:
+                linea = self.rfile.readline()
+                if not linea:
+                    return
+                comando = linea.decode(errors="replace").strip()
+                verbo = comando.split(" ", 1)[0].upper()
+                if verbo in ("EHLO", "HELO"):
+                    self.responder("250 localhost")
+                elif verbo == "MAIL":
+                    destinatarios = []
+                    self.responder("250 OK")
+                elif verbo == "RCPT":
+                    direccion = comando.split(":", 1)[1].strip(" <>").lower()
+                    if direccion in servidor.rechazar_rcpt:
+                        self.responder("550 5.1.1 Usuario desconocido")
+                    else:
+                        destinatarios.append(direccion)
+                        self.responder("250 OK")
+                elif verbo == "DATA":
+                    self.responder("354 Fin con <CRLF>.<CRLF>")
+                    cuerpo = []
+                    while (linea := self.rfile.readline()) not in (b".\r\n", b""):
+                        cuerpo.append(linea)
+                    falla = servidor.fallas_data.pop(0) if servidor.fallas_data else None
+                    if falla == "cortar":
+                        # El mensaje llegó completo pero el cliente nunca ve el 250
+                        with servidor._lock:
+                            servidor.recibidos.append((destinatarios, b"".join(cuerpo)))
+                        return
+                    if falla == "451":
+                        self.responder("451 4.3.0 Intente más tarde")
+                        continue
+                    with servidor._lock:
+                        servidor.recibidos.append((destinatarios, b"".join(cuerpo)))
+                    self.responder("250 OK encolado")
+                elif verbo in ("RSET", "NOOP"):
+                    self.responder("250 OK")
+                elif verbo == "QUIT":
+                    self.responder("221 Adiós")
+                    return
+                else:
+                    self.responder("502 No implementado")
+        except OSError:
+            return
+        finally:
+            with servidor._lock:
+                servidor.abiertas.discard(self)
+
+
+def mensaje(para: str, asunto: str) -> EmailMessage:
+    msg = EmailMessage()
+    msg["Subject"] = asunto
+    msg["From"] = "notificaciones@ejemplo.cl"
+    msg["To"] = para
+    msg.set_content("Prueba de la sesión SMTP compartida.")
+    return msg
+
+
+def nueva_sesion(servidor: ServidorSMTP) -> SesionSMTP:
+    sesion = SesionSMTP(host="127.0.0.1", port=servidor.port, usar_ssl=False)
+    # Sin login aunque el entorno tenga credenciales configuradas
+    sesion.usuario = sesion.clave = None
+    return sesion
+
+
+def caso_reutiliza_conexion(servidor):
+    with nueva_sesion(servidor) as sesion:
+        for i in range(5):
+            sesion.enviar(mensaje("a@ejemplo.cl", f"Mensaje {i}"))
+    assert len(servidor.recibidos) == 5, servidor.recibidos
+    assert servidor.conexiones == 1, servidor.conexiones
+
+
+def caso_reconecta_si_el_servidor_corto(servidor):
+    with nueva_sesion(servidor) as sesion:
+        sesion.enviar(mensaje("a@ejemplo.cl", "Antes del corte"))
+        servidor.cortar_conexiones()
+        sesion.enviar(mensaje("a@ejemplo.cl", "Después del corte"))
+        assert sesion.conexiones == 2, sesion.conexiones
+    assert len(servidor.recibidos) == 2, servidor.recibidos
+
+
+def caso_5xx_no_se_reintenta(servidor):
+    servidor.rechazar_rcpt.add("nadie@ejemplo.cl")
+    with nueva_sesion(servidor) as sesion:
+        try:
+            sesion.enviar(mensaje("nadie@ejemplo.cl", "Destinatario inválido"))
+        except smtplib.SMTPRecipientsRefused:
+            pass
+        else:
+            raise AssertionError("se esperaba SMTPRecipientsRefused")
+        # La misma conexión sigue sirviendo para los demás
+        sesion.enviar(mensaje("a@ejemplo.cl", "Destinatario válido"))
+        assert sesion.conexiones == 1, sesion.conexiones
+    assert len(servidor.recibidos) == 1, servidor.recibidos
+
+
+def caso_4xx_se_reintenta(servidor):
+    servidor.fallas_data.append("451")
+    with nueva_sesion(servidor) as sesion:
+        sesion.enviar(mensaje("a@ejemplo.cl", "Rechazo temporal"))
+        assert sesion.conexiones == 2, sesion.conexiones
+    assert len(servidor.recibidos) == 1, servidor.recibidos
+
+
+def caso_corte_en_data_no_duplica(servidor):
+    servidor.fallas_data.append("cortar")
+    with nueva_sesion(servidor) as sesion:
+        try:
+            sesion.enviar(mensaje("a@ejemplo.cl", "Corte tras DATA"))
+        except smtplib.SMTPServerDisconnected:
+            pass
+        else:
+            raise AssertionError("se esperaba SMTPServerDisconnected")
+    assert len(servidor.recibidos) == 1, servidor.recibidos
+
+
+CASOS = [
+    caso_reutiliza_conexion,
+    caso_reconecta_si_el_servidor_corto,
+    caso_5xx_no_se_reintenta,
+    caso_4xx_se_reintenta,
+    caso_corte_en_data_no_duplica,
+]
+
+
+if __name__ == "__main__":
+    fallidos = 0
+    for caso in CASOS:
+        servidor = ServidorSMTP()
+        try:
+            caso(servidor)
+            print(f"✅ {caso.__name__}")
+        except Exception as e:
+            fallidos += 1
+            print(f"❌ {caso.__name__}: {type(e).__name__}: {e}")
+        finally:
+            servidor.detener()
+    print(f"{'✅' if not fallidos else '❌'} {len(CASOS) - fallidos}/{len(CASOS)} casos de la sesión SMTP")
+    sys.exit(1 if fallidos else 0)
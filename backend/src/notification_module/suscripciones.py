@@ -0,0 +1,148 @@
+import csv
+import threading
+import unicodedata
+from pathlib import Path
+
+RUTA_SUSCRIPCIONES = Path("backend/data/notifications/suscripciones.csv")
+
+# Atributos del evento por los que se puede filtrar. Cada fila del CSV es una
+# regla: `email` + valores para cualquiera de estos atributos (vacío = todos,
+# varios valores separados por "|"). Una regla aplica si todos sus atributos
+# calzan con el evento; un destinatario recibe el evento si alguna de sus
+# reglas aplica. Quien no tiene reglas recibe todo, como antes.
+ATRIBUTOS = ("tipo", "rol", "procedimiento", "tipo_audiencia")
+
+
+def normalizar(valor) -> str:
+    """Minúsculas, sin tildes ni espacios extra: 'Audiencia Pública ' == 'audiencia publica'."""
+    texto = unicodedata.normalize("NFKD", str(valor or "")).encode("ascii", "ignore").decode()
+    return " ".join(texto.lower().split())
+
+
+def atributos_evento(evento: dict) -> dict:
+    # Los scrapers guardan cada atributo en el evento con el mismo nombre
+    return {atributo: normalizar(evento.get(atributo)) for atributo in ATRIBUTOS}
+
+
+class IndiceSuscripciones:
+    """
+    Índice invertido de las reglas: por cada atributo, valor → ids de reglas
+    que lo piden, más las reglas que aceptan cualquier valor. Los
+    destinatarios de un evento salen de intersectar, atributo por atributo,
+    esos conjuntos (un lookup por atributo), sin recorrer cada destinatario
+    ni cada regla.
+
+    Se arma para una lista de destinatarios (`todos`, la de
+    notifications_emails.csv): las reglas de correos que no están en la lista
+    se ignoran, y los que no tienen reglas quedan precalculados.
+    """
+
+    def __init__(self, reglas: list[dict], todos: list):
+        self.posicion = {}
+        for email in todos:
+            self.posicion.setdefault(email.strip().lower(), (len(self.posicion), email))
+        self.email_regla = []
+        self.por_valor = {a: {} for a in ATRIBUTOS}
+        self.comodin = {a: set() for a in ATRIBUTOS}
+        con_reglas = set()
+        for regla in reglas:
+            email = regla.get("email", "").strip().lower()
+            if email not in self.posicion:
+                continue
+            id_regla = len(self.email_regla)
+            self.email_regla.append(email)
+            con_reglas.add(email)
+            for atributo in ATRIBUTOS:
+                valores = {normalizar(v) for v in (regla.get(atributo) or "").split("|")} - {""}
+                if not valores:
+                    self.comodin[atributo].add(id_regla)
+                for valor in valores:
+                    self.por_valor[atributo].setdefault(valor, set()).add(id_regla)
+        self.sin_reglas = set(self.posicion) - con_reglas
+
+    def reglas_que_aplican(self, evento: dict) -> set:
+        candidatos = []
+        for atributo, valor in atributos_evento(evento).items():
+            exactas = self.por_valor[atributo].get(valor, set()) if valor else set()
+            candidatos.append((exactas, self.comodin[atributo]))
+        # Se parte por el atributo más selectivo para que las intersecciones sean chicas
+        candidatos.sort(key=lambda par: len(par[0]) + len(par[1]))
+        exactas, comodin = candidatos[0]
+        reglas = exactas | comodin
+        for exactas, comodin in candidatos[1:]:
+            if not reglas:
+                break
+            reglas = {r for r in reglas if r in exactas or r in comodin}
+        return reglas
+
+    def destinatarios(self, evento: dict) -> list:
+        """Correos que deben recibir el evento, en el orden de la lista original."""
+        suscritos = self.sin_reglas | {self.email_regla[r] for r in self.reglas_que_aplican(evento)}
+        return [self.posicion[e][1] for e in sorted(suscritos, key=lambda e: self.posicion[e][0])]
+
+    def agrupar(self, eventos: list) -> list[tuple[list, list]]:
+        """
+        Reparte varios eventos en (destinatarios, eventos): cada destinatario
+        aparece en un solo grupo, con exactamente los eventos que le tocan, y
+        los que reciben lo mismo comparten correo.
+        """
+        por_destinatario = {}
+        for i, evento in enumerate(eventos):
+            for email in self.destinatarios(evento):
+                por_destinatario.setdefault(email, []).append(i)
+        grupos = {}
+        for email, indices in por_destinatario.items():
+            grupos.setdefault(tuple(indices), []).append(email)
+        return [(emails, [eventos[i] for i in indices]) for indices, emails in grupos.items()]
+
+
+def cargar_reglas(path=RUTA_SUSCRIPCIONES) -> list[dict]:
+    path = Path(path)
+    if not path.exists():
+        return []
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+class Suscripciones:
+    """
+    `IndiceSuscripciones` del CSV, que se reconstruye sólo cuando cambia el
+    archivo de reglas o la lista de destinatarios.
+    """
+
+    def __init__(self, path=RUTA_SUSCRIPCIONES):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._indice = None
+        self._version = None
+        self._todos = None
+
+    def indice(self, todos: list) -> IndiceSuscripciones:
+        version = self.path.stat().st_mtime_ns if self.path.exists() else None
+        with self._lock:
+            # SesionSMTP.destinatarios() devuelve la misma lista mientras no cambie el CSV
+            mismos = todos is self._todos or todos == self._todos
+            if self._indice is None or version != self._version or not mismos:
+                self._indice = IndiceSuscripciones(cargar_reglas(self.path), todos)
+                self._version = version
+                self._todos = todos
+            return self._indice
+
+    def destinatarios(self, evento: dict, todos: list) -> list:
+        """De `todos` (la lista de correos), los que deben recibir el evento."""
+        return self.indice(todos).destinatarios(evento)
+
+    def agrupar(self, eventos: list, todos: list) -> list[tuple[list, list]]:
+        return self.indice(todos).agrupar(eventos)
+
+
+_suscripciones = None
+_lock_suscripciones = threading.Lock()
+
+
+def suscripciones_compartidas() -> Suscripciones:
+    global _suscripciones
+    with _lock_suscripciones:
+        if _suscripciones is None:
+            _suscripciones = Suscripciones()
+        return _suscripciones
@@ -0,0 +1,203 @@
+# audiencias_api.py
+from datetime import date, datetime, timedelta
+from urllib.parse import urlsplit, parse_qsl
+from dateutil.relativedelta import relativedelta
+from .sitios import CONSULTAS_URL
+
+URL_AUDIENCIAS = f"{CONSULTAS_URL}/audiencia"
+
+MESES = ["enero","febrero","marzo","abril","mayo","junio","julio","agosto","septiembre","octubre","noviembre","diciembre"]
+
+# Formatos de fecha que puede usar el endpoint para el rango del mes
+FORMATOS_FECHA = ["%d-%m-%Y", "%Y-%m-%d", "%d/%m/%Y", "%Y/%m/%d"]
+
+# Nombres posibles de cada campo en el JSON de una audiencia
+CAMPOS_AUDIENCIA = {
+    "fecha": ["fecha", "fechaAudiencia", "fechaInicio", "start"],
+    "hora": ["hora", "horaAudiencia", "horaInicio"],
+    "rol": ["rol", "rolCausa"],
+    "caratula": ["caratula", "descripcion", "descripcionCausa", "nombreCausa"],
+    "tipo_audiencia": ["tipoAudiencia", "tipo_audiencia", "tipo"],
+    "estado": ["estado", "estadoAudiencia"],
+    "doc_resolucion": ["docResolucion", "documento", "urlDocumento", "linkDocumento"],
+}
+
+
+def _rango_mes(mes: int, anio: int):
+    primero = date(anio, mes, 1)
+    siguiente = primero + relativedelta(months=1)
+    return primero, siguiente - timedelta(days=1), siguiente
+
+
+def construir_plantilla_url(url: str, mes: int, anio: int):
+    """
+    A partir de la URL REST que la página llamó para (mes, anio), arma una
+    plantilla con marcadores que permite pedir cualquier otro mes.
+    Devuelve None si no se reconoce cómo va codificado el mes en la URL.
+    """
+    primero, ultimo, siguiente = _rango_mes(mes, anio)
+    plantilla = url
+
+    # 1) Rango de fechas explícito (desde/hasta)
+    for fmt in FORMATOS_FECHA:
+        for marcador, dia in (("__DESDE__", primero), ("__HASTA__", ultimo), ("__SIGUIENTE__", siguiente)):
+            texto = dia.strftime(fmt)
+            if texto in plantilla:
+                plantilla = plantilla.replace(texto, f"{marcador}{fmt}__")
+    if plantilla != url:
+        return plantilla
+
+    # 2) Parámetros de query con nombre de mes/año
+    partes = urlsplit(url)
+    for clave, valor in parse_qsl(partes.query):
+        nombre = clave.lower()
+        if any(k in nombre for k in ("anio", "ano", "year")) and valor == str(anio):
+            plantilla = plantilla.replace(f"{clave}={valor}", f"{clave}=__ANIO__")
+        elif any(k in nombre for k in ("mes", "month")) and valor in (str(mes), f"{mes:02d}"):
+            marcador = "__MES2__" if valor == f"{mes:02d}" and mes < 10 else "__MES__"
+            plantilla = plantilla.replace(f"{clave}={valor}", f"{clave}={marcador}")
+    if "__ANIO__" in plantilla and ("__MES__" in plantilla or "__MES2__" in plantilla):
+        return plantilla
+
+    # 3) Segmentos de path consecutivos /anio/mes o /mes/anio
+    for seg_mes in (f"{mes:02d}", str(mes)):
+        marcador = "__MES2__" if seg_mes == f"{mes:02d}" and mes < 10 else "__MES__"
+        for patron, reemplazo in (
+            (f"/{anio}/{seg_mes}", f"/__ANIO__/{marcador}"),
+            (f"/{seg_mes}/{anio}", f"/{marcador}/__ANIO__"),
+        ):
+            if partes.path.endswith(patron) or f"{patron}/" in partes.path:
+                return url.replace(patron, reemplazo, 1)
+    return None
+
+
+def renderizar_plantilla(plantilla: str, mes: int, anio: int) -> str:
+    primero, ultimo, siguiente = _rango_mes(mes, anio)
+    url = plantilla.replace("__ANIO__", str(anio)).replace("__MES2__", f"{mes:02d}").replace("__MES__", str(mes))
+    for fmt in FORMATOS_FECHA:
+        url = (url.replace(f"__DESDE__{fmt}__", primero.strftime(fmt))
+                  .replace(f"__HASTA__{fmt}__", ultimo.strftime(fmt))
+                  .replace(f"__SIGUIENTE__{fmt}__", siguiente.strftime(fmt)))
+    return url
+
+
+def _texto(valor) -> str:
+    if valor is None:
+        return ""
+    if isinstance(valor, dict):
+        for k in ("descripcion", "nombre", "glosa", "valor"):
+            if k in valor:
+                return _texto(valor[k])
+        return ""
+    return str(valor).strip()
+
+
+def _parse_fecha_hora(valor):
+    """Normaliza la fecha del JSON (epoch ms o ISO) a (dd-mm-yyyy, HH:MM)."""
+    if valor in (None, ""):
+        return "", ""
+    if isinstance(valor, (int, float)):
+        dt = datetime.fromtimestamp(valor / 1000)
+        return dt.strftime("%d-%m-%Y"), dt.strftime("%H:%M")
+    texto = str(valor).strip()
+    try:
+        dt = datetime.fromisoformat(texto.replace("Z", ""))
+    except ValueError:
+        return texto, ""
+    hora = dt.strftime("%H:%M") if len(texto) > 10 else ""
+    return dt.strftime("%d-%m-%Y"), hora
+
+
+def normalizar_audiencia(item: dict) -> dict:
+    """Convierte una audiencia del JSON al esquema de filas del calendario."""
+    fila = {}
+    for campo, candidatos in CAMPOS_AUDIENCIA.items():
+        fila[campo] = next((item[c] for c in candidatos if c in item and item[c] not in (None, "")), "")
+
+    fecha, hora_desde_fecha = _parse_fecha_hora(fila["fecha"])
+    fila["fecha"] = fecha
+    fila["hora"] = _texto(fila["hora"]) or hora_desde_fecha
+    for campo in ("rol", "caratula", "tipo_audiencia", "estado", "doc_resolucion"):
+        fila[campo] = _texto(fila[campo])
+    return fila
+
+
+def _extraer_lista(data):
+    if isinstance(data, list):
+        return data
+    if isinstance(data, dict):
+        for k in ("content", "data", "audiencias", "items", "resultado"):
+            if isinstance(data.get(k), list):
+                return data[k]
+    return None
+
+
+class AudienciasAPI:
+    """
+    Consulta directa de las audiencias de un mes usando el mismo endpoint REST
+    que llama la página /audiencia. La forma de la URL se descubre escuchando
+    el tráfico de la carga inicial, así cada mes cuesta un solo request sin
+    importar su distancia al mes actual.
+    """
+
+    def __init__(self, page, url=URL_AUDIENCIAS):
+        self.page = page
+        self.url = url
+        self.plantilla = None
+
+    def descubrir(self, timeout=20_000):
+        """Carga la página, intercepta el request de audiencias y arma la plantilla."""
+        capturas = []
+
+        def on_response(response):
+            if "/rest/" in response.url and "audiencia" in response.url.lower():
+                capturas.append(response)
+
+        self.page.on("response", on_response)
+        try:
+            self.page.goto(self.url, wait_until="domcontentloaded")
+            self.page.wait_for_selector("div.controls", timeout=timeout)
+            self.page.wait_for_load_state("networkidle", timeout=timeout)
+        finally:
+            self.page.remove_listener("response", on_response)
+
+        try:
+            mes_txt = self.page.locator("div.title-month span").first.text_content(timeout=5000).strip().lower()
+            anio = int(self.page.locator("div.title-year span").first.text_content(timeout=5000).strip())
+            mes = MESES.index(mes_txt) + 1
+        except Exception as e:
+            print(f"⚠️ No se pudo leer el mes visible del calendario: {e}")
+            return None
+
+        for response in capturas:
+            try:
+                if _extraer_lista(response.json()) is None:
+                    continue
+            except Exception:
+                continue
+            plantilla = construir_plantilla_url(response.url, mes, anio)
+            if plantilla:
+                self.plantilla = plantilla
+                print(f"🔌 Endpoint de audiencias detectado: {plantilla}")
+                return plantilla
+
+        print("⚠️ No se detectó el endpoint REST de audiencias; se usará navegación por clicks.")
+        return None
+
+    def audiencias_mes(self, mes: int, anio: int):
+        """Lista de filas del mes, o None si la consulta directa no está disponible."""
+        if not self.plantilla:
+            return None
+        url = renderizar_plantilla(self.plantilla, mes, anio)
+        try:
+            response = self.page.request.get(url)
+            if not response.ok:
+                print(f"⚠️ {response.status} al consultar {url}")
+                return None
+            items = _extraer_lista(response.json())
+        except Exception as e:
+            print(f"⚠️ Error consultando audiencias {mes:02d}-{anio}: {e}")
+            return None
+        if items is None:
+            return None
+        return [normalizar_audiencia(item) for item in items if isinstance(item, dict)]
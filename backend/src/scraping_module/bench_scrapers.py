@@ -0,0 +1,474 @@
+import sys
+import os
+
+# Agrega la raíz del proyecto al sys.path para poder importar backend.src...
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../.."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+import argparse
+import base64
+import csv
+import glob
+import json
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+from backend.src.scraping_module.instrumentacion import REPORTES_DIR
+
+SRC_DIR = os.path.join(PROJECT_ROOT, "backend", "src")
+FIXTURES_DIR = os.path.join(PROJECT_ROOT, "backend", "data", "fixtures", "scrapers")
+# Los scrapers dejan sus reportes relativos a su carpeta de trabajo; el del benchmark va al repo
+RESULTADOS_DIR = os.path.join(PROJECT_ROOT, REPORTES_DIR)
+
+# Sitio → (host real, variable de entorno con que los scrapers leen su URL base)
+SITIOS = {
+    "consultas": ("consultas.tdlc.cl", "TDLC_CONSULTAS_URL"),
+    "web": ("www.tdlc.cl", "TDLC_WEB_URL"),
+}
+HOSTS = {"consultas.tdlc.cl": "consultas", "www.tdlc.cl": "web", "tdlc.cl": "web"}
+
+# Cada escenario corre un scraper tal cual (como proceso aparte) y cuenta lo
+# que dejó escrito. `salida` es relativa a la carpeta de trabajo del escenario.
+ESCENARIOS = {
+    "estado_diario": {
+        "script": "scraping_module/estadodiario_tdlc.py",
+        "args": lambda meta: ["--fecha", meta["fecha"]] if meta.get("fecha") else [],
+        "salida": "backend/data/estado_diario/estado_diario_tmp.csv",
+        "unidad": "causas",
+    },
+    "calendario": {
+        "script": "scraping_module/calendar_tdlc.py",
+        "salida": "backend/data/calendar/calendario_audiencias.csv",
+        "unidad": "audiencias",
+    },
+    "sentencias": {
+        "script": "scraping_module/sentencias_tdlc.py",
+        "salida": "backend/data/sentencias_detalle.csv",
+        "unidad": "sentencias",
+    },
+    "resoluciones": {
+        "script": "scraping_module/resoluciones_tdlc.py",
+        "salida": "backend/data/resoluciones_detalle.csv",
+        "unidad": "resoluciones",
+    },
+    "informes": {
+        "script": "data_collection/03-informes/scraping_listado.py",
+        "salida": "data/informes_listado.csv",
+        "unidad": "informes",
+    },
+}
+
+TIPOS_TEXTO = ("text/", "json", "javascript", "xml")
+HEADERS_OMITIDOS = {"content-length", "content-encoding", "transfer-encoding", "connection", "keep-alive"}
+
+
+def clave_url(url: str) -> str:
+    partes = urlsplit(url)
+    return partes.path + (f"?{partes.query}" if partes.query else "")
+
+
+# ============== Fixtures ==============
+class Fixtures:
+    """
+    Respuestas grabadas por sitio, indexadas por (método, path?query).
+
+    - `*.har` en cualquier parte de la carpeta (los de `--grabar`, o uno
+      exportado desde el navegador / Playwright `record_har_path`).
+    - `html/<sitio>/<path>` (o `<path>.html`, `<path>/index.html`): páginas
+      sueltas, que responden a ese path con cualquier query.
+    - `datos/`: archivos que se copian a la carpeta de trabajo antes de cada
+      corrida (p. ej. un listado previo para que el scraper sólo busque nuevas).
+    - `meta.json`: fecha de la grabación, con la que se llama a los scrapers
+      que dependen del día, y `escenarios` que cubre la grabación.
+
+    Lo que no está en los fixtures no se aproxima con otra URL: se responde
+    404 y la corrida queda marcada como incompleta (ver README.md de la carpeta).
+    """
+
+    def __init__(self, directorio: str):
+        self.directorio = directorio
+        self.entradas = {sitio: {} for sitio in SITIOS}
+        self.meta = {}
+        path_meta = os.path.join(directorio, "meta.json")
+        if os.path.exists(path_meta):
+            with open(path_meta, encoding="utf-8") as f:
+                self.meta = json.load(f)
+        for path in sorted(glob.glob(os.path.join(directorio, "**", "*.har"), recursive=True)):
+            self.cargar_har(path)
+
+    def cargar_har(self, path: str):
+        with open(path, encoding="utf-8") as f:
+            har = json.load(f)
+        for entrada in har.get("log", {}).get("entries", []):
+            request, response = entrada["request"], entrada["response"]
+            sitio = HOSTS.get(urlsplit(request["url"]).hostname or "")
+            if sitio is None:
+                continue
+            contenido = response.get("content", {})
+            texto = contenido.get("text", "") or ""
+            cuerpo = base64.b64decode(texto) if contenido.get("encoding") == "base64" else texto.encode("utf-8")
+            headers = {h["name"]: h["value"] for h in response.get("headers", [])}
+            headers.setdefault("Content-Type", contenido.get("mimeType") or "text/html")
+            self.agregar(sitio, request["method"], request["url"], response["status"], headers, cuerpo)
+
+    def agregar(self, sitio: str, metodo: str, url: str, status: int, headers: dict, cuerpo: bytes):
+        # La primera grabación de una URL manda
+        self.entradas[sitio].setdefault((metodo, clave_url(url)), (status, headers, cuerpo))
+
+    @property
+    def escenarios(self) -> list:
+        return self.meta.get("escenarios", [])
+
+    def vacia(self) -> bool:
+        return not any(self.entradas.values()) and not os.path.isdir(os.path.join(self.directorio, "html"))
+
+    def buscar(self, sitio: str, metodo: str, clave: str):
+        """Respuesta grabada para esa URL exacta, o la página de `html/` para su path."""
+        encontrada = self.entradas[sitio].get((metodo, clave))
+        if encontrada or metodo != "GET":
+            return encontrada
+        return self._html(sitio, urlsplit(clave).path)
+
+    def _html(self, sitio: str, path: str):
+        base = os.path.join(self.directorio, "html", sitio, path.strip("/"))
+        for candidato in (base, base + ".html", os.path.join(base, "index.html")):
+            if os.path.isfile(candidato):
+                with open(candidato, "rb") as f:
+                    return 200, {"Content-Type": "text/html; charset=utf-8"}, f.read()
+        return None
+
+    def guardar_har(self, sitio: str, grabadas: list):
+        if not grabadas:
+            return None
+        os.makedirs(self.directorio, exist_ok=True)
+        path = os.path.join(self.directorio, f"grabacion_{sitio}.har")
+        entradas = []
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                entradas = json.load(f)["log"]["entries"]
+        for metodo, url, status, headers, cuerpo in grabadas:
+            entradas.append({
+                "startedDateTime": datetime.now().astimezone().isoformat(),
+                "request": {"method": metodo, "url": url, "headers": []},
+                "response": {
+                    "status": status, "statusText": "",
+                    "headers": [{"name": k, "value": v} for k, v in headers.items()],
+                    "content": {"size": len(cuerpo), "mimeType": headers.get("Content-Type", ""),
+                                "text": base64.b64encode(cuerpo).decode("ascii"), "encoding": "base64"},
+                },
+            })
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"log": {"version": "1.2", "creator": {"name": "bench_scrapers", "version": "1"}, "entries": entradas}}, f)
+        os.replace(tmp, path)
+        return path
+
+
+# ============== Servidor ==============
+class ServidorFixtures:
+    """
+    Un servidor HTTP local por sitio (así los paths relativos al origen que
+    pide el JS de la página llegan al sitio correcto). Reescribe en las
+    respuestas de texto las URLs absolutas de los sitios reales a las locales,
+    para que los links que siguen los scrapers no salgan a internet.
+
+    Con `grabar=True` lo que no está en los fixtures se pide al sitio real, se
+    sirve y se guarda en `grabacion_<sitio>.har`.
+    """
+
+    def __init__(self, fixtures: Fixtures, grabar: bool = False, latencia_ms: float = 0):
+        self.fixtures = fixtures
+        self.grabar = grabar
+        self.latencia = latencia_ms / 1000
+        self._lock = threading.Lock()
+        self.servidores = {}
+        self.bases = {}
+        self.grabadas = {sitio: [] for sitio in SITIOS}
+        self.reiniciar_contadores()
+
+    def reiniciar_contadores(self):
+        with self._lock:
+            self.contadores = {"requests": 0, "documentos": 0, "api": 0, "bytes": 0, "faltantes": 0}
+            self.faltantes = {}
+
+    def _contar(self, headers: dict, cuerpo: bytes, encontrada: bool, url: str):
+        tipo = headers.get("Content-Type", "")
+        with self._lock:
+            self.contadores["requests"] += 1
+            self.contadores["bytes"] += len(cuerpo)
+            if not encontrada:
+                self.contadores["faltantes"] += 1
+                self.faltantes[url] = self.faltantes.get(url, 0) + 1
+            elif "html" in tipo:
+                self.contadores["documentos"] += 1
+            elif "json" in tipo:
+                self.contadores["api"] += 1
+
+    def _reescribir(self, cuerpo: bytes, headers: dict) -> bytes:
+        if not any(t in headers.get("Content-Type", "") for t in TIPOS_TEXTO):
+            return cuerpo
+        for sitio, (host, _) in SITIOS.items():
+            local = self.bases[sitio].encode()
+            for esquema in (b"https://", b"http://", b"https:\\/\\/", b"http:\\/\\/"):
+                reemplazo = local.replace(b"/", b"\\/") if b"\\/" in esquema else local
+                cuerpo = cuerpo.replace(esquema + host.encode(), reemplazo)
+        return cuerpo
+
+    def _pedir_al_sitio(self, sitio: str, metodo: str, clave: str, headers: dict, cuerpo: bytes):
+        host = SITIOS[sitio][0]
+        url = f"https://{host}{clave}"
+        pedidos = {k: v for k, v in headers.items() if k.lower() not in ("host", "accept-encoding", "connection", "content-length")}
+        for k in ("Origin", "Referer"):
+            if k in pedidos:
+                pedidos[k] = pedidos[k].replace(self.bases[sitio], f"https://{host}")
+        request = urllib.request.Request(url, data=cuerpo or None, headers=pedidos, method=metodo)
+        try:
+            with urllib.request.urlopen(request, timeout=60) as r:
+                status, respuesta, datos = r.status, dict(r.headers), r.read()
+        except urllib.error.HTTPError as e:
+            status, respuesta, datos = e.code, dict(e.headers), e.read()
+        respuesta = {k: v for k, v in respuesta.items() if k.lower() not in HEADERS_OMITIDOS}
+        with self._lock:
+            self.fixtures.agregar(sitio, metodo, url, status, respuesta, datos)
+            self.grabadas[sitio].append((metodo, url, status, respuesta, datos))
+        return status, respuesta, datos
+
+    def _handler(self, sitio: str):
+        servidor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _responder(self):
+                largo = int(self.headers.get("Content-Length") or 0)
+                cuerpo_pedido = self.rfile.read(largo) if largo else b""
+                encontrada = servidor.fixtures.buscar(sitio, self.command, self.path)
+                if encontrada is None and servidor.grabar:
+                    try:
+                        encontrada = servidor._pedir_al_sitio(sitio, self.command, self.path, dict(self.headers), cuerpo_pedido)
+                    except Exception as e:
+                        print(f"⚠️ No se pudo grabar {self.path}: {e}")
+                if encontrada is None:
+                    status, headers, cuerpo = 404, {"Content-Type": "text/plain"}, b"sin fixture"
+                else:
+                    status, headers, cuerpo = encontrada
+                    cuerpo = servidor._reescribir(cuerpo, headers)
+                servidor._contar(headers, cuerpo, encontrada is not None, f"{sitio}{self.path}")
+                if servidor.latencia:
+                    time.sleep(servidor.latencia)
+
+                self.send_response(status)
+                for k, v in headers.items():
+                    if k.lower() not in HEADERS_OMITIDOS:
+                        self.send_header(k, v)
+                self.send_header("Content-Length", str(len(cuerpo)))
+                self.end_headers()
+                if self.command != "HEAD":
+                    self.wfile.write(cuerpo)
+
+            do_GET = do_POST = do_HEAD = _responder
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def iniciar(self):
+        for sitio in SITIOS:
+            httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._handler(sitio))
+            httpd.daemon_threads = True
+            self.servidores[sitio] = httpd
+            self.bases[sitio] = f"http://127.0.0.1:{httpd.server_address[1]}"
+            threading.Thread(target=httpd.serve_forever, daemon=True).start()
+        return self
+
+    def detener(self):
+        for httpd in self.servidores.values():
+            httpd.shutdown()
+            httpd.server_close()
+        if self.grabar:
+            for sitio, grabadas in self.grabadas.items():
+                path = self.fixtures.guardar_har(sitio, grabadas)
+                if path:
+                    print(f"💾 {len(grabadas)} respuestas de {SITIOS[sitio][0]} grabadas en {path}")
+
+
+# ============== Corridas ==============
+def contar_filas(path: str) -> int:
+    if not os.path.exists(path):
+        return 0
+    with open(path, newline="", encoding="utf-8") as f:
+        return sum(1 for _ in csv.DictReader(f))
+
+
+def preparar_trabajo(fixtures: Fixtures) -> str:
+    """Carpeta de trabajo nueva con la estructura backend/data y los datos semilla."""
+    trabajo = tempfile.mkdtemp(prefix="bench_scrapers_")
+    for sub in ("backend/data/notifications", "backend/data/metrics", "data"):
+        os.makedirs(os.path.join(trabajo, sub), exist_ok=True)
+    semilla = os.path.join(fixtures.directorio, "datos")
+    if os.path.isdir(semilla):
+        shutil.copytree(semilla, trabajo, dirs_exist_ok=True)
+    return trabajo
+
+
+def entorno(servidor: ServidorFixtures) -> dict:
+    env = dict(os.environ)
+    for sitio, (_, variable) in SITIOS.items():
+        env[variable] = servidor.bases[sitio]
+    env["SCRAPER_HEADLESS"] = "1"
+    # calendar_tdlc importa `src.` y estadodiario `backend.src.` desde la carpeta de trabajo
+    env["PYTHONPATH"] = os.pathsep.join([PROJECT_ROOT, os.path.join(PROJECT_ROOT, "backend"), env.get("PYTHONPATH", "")])
+    # Ningún correo sale de una corrida de benchmark
+    env.update({"SMTP_HOST": "127.0.0.1", "SMTP_PORT": "9", "SMTP_SSL": "0"})
+    return env
+
+
+def reporte_scraper(trabajo: str) -> dict:
+    """Último reporte de instrumentacion.py que dejó el scraper, si es que instrumenta."""
+    reportes = sorted(glob.glob(os.path.join(trabajo, "backend", "data", "metrics", "*.json")), key=os.path.getmtime)
+    if not reportes:
+        return {}
+    with open(reportes[-1], encoding="utf-8") as f:
+        reporte = json.load(f)
+    return {"contadores": reporte.get("contadores", {}),
+            "etapas_s": {k: v["total"] for k, v in list(reporte.get("etapas_s", {}).items())[:6]}}
+
+
+def _texto(salida) -> str:
+    return salida.decode("utf-8", "replace") if isinstance(salida, bytes) else (salida or "")
+
+
+def correr_escenario(nombre: str, servidor: ServidorFixtures, fixtures: Fixtures, timeout: float, conservar: bool) -> dict:
+    escenario = ESCENARIOS[nombre]
+    trabajo = preparar_trabajo(fixtures)
+    salida = os.path.join(trabajo, escenario["salida"])
+    filas_antes = contar_filas(salida)
+    args = escenario.get("args", lambda meta: [])(fixtures.meta)
+    comando = [sys.executable, os.path.join(SRC_DIR, escenario["script"]), *args]
+
+    servidor.reiniciar_contadores()
+    inicio = time.perf_counter()
+    try:
+        proceso = subprocess.run(comando, cwd=trabajo, env=entorno(servidor), capture_output=True, text=True, timeout=timeout)
+        codigo, log = proceso.returncode, proceso.stdout + proceso.stderr
+    except subprocess.TimeoutExpired as e:
+        codigo, log = "timeout", _texto(e.stdout) + _texto(e.stderr)
+    duracion = time.perf_counter() - inicio
+
+    registros = contar_filas(salida) - filas_antes
+    minutos = duracion / 60
+    resultado = {
+        "escenario": nombre,
+        "codigo": codigo,
+        "duracion_s": round(duracion, 2),
+        "unidad": escenario["unidad"],
+        "registros": registros,
+        "registros_por_min": round(registros / minutos, 1) if minutos else 0.0,
+        "paginas_por_min": round(servidor.contadores["documentos"] / minutos, 1) if minutos else 0.0,
+        "requests_por_min": round(servidor.contadores["requests"] / minutos, 1) if minutos else 0.0,
+        "servidor": dict(servidor.contadores),
+        "faltantes": sorted(servidor.faltantes, key=servidor.faltantes.get, reverse=True)[:10],
+        # Con respuestas sin fixture la corrida no es comparable con otras
+        "completo": servidor.contadores["faltantes"] == 0,
+        "scraper": reporte_scraper(trabajo),
+    }
+    if codigo != 0:
+        resultado["log"] = log[-2000:]
+    if conservar:
+        resultado["trabajo"] = trabajo
+    else:
+        shutil.rmtree(trabajo, ignore_errors=True)
+    return resultado
+
+
+def guardar(resultados: list, args) -> str:
+    os.makedirs(RESULTADOS_DIR, exist_ok=True)
+    path = os.path.join(RESULTADOS_DIR, f"bench_scrapers_{datetime.now():%Y%m%d_%H%M%S}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({
+            "fecha": datetime.now().isoformat(timespec="seconds"),
+            "fixtures": args.fixtures,
+            "latencia_ms": args.latencia_ms,
+            "grabando": args.grabar,
+            "resultados": resultados,
+        }, f, ensure_ascii=False, indent=2)
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Corre los scrapers contra fixtures grabados servidos en local y mide su rendimiento")
+    parser.add_argument("escenarios", nargs="*",
+                        help=f"{', '.join(ESCENARIOS)}. Por defecto, los que cubren los fixtures (meta.json)")
+    parser.add_argument("--fixtures", default=FIXTURES_DIR)
+    parser.add_argument("--repeticiones", type=int, default=1)
+    parser.add_argument("--latencia-ms", type=float, default=0, help="Demora artificial por respuesta, para simular la red")
+    parser.add_argument("--grabar", action="store_true", help="Pide al sitio real lo que falte en los fixtures y lo graba")
+    parser.add_argument("--timeout", type=float, default=1800, help="Máximo por corrida (s)")
+    parser.add_argument("--conservar", action="store_true", help="No borra la carpeta de trabajo de cada corrida")
+    args = parser.parse_args()
+
+    desconocidos = set(args.escenarios) - set(ESCENARIOS)
+    if desconocidos:
+        parser.error(f"Escenarios desconocidos: {', '.join(sorted(desconocidos))}")
+
+    fixtures = Fixtures(args.fixtures)
+    if args.grabar:
+        if not args.escenarios:
+            parser.error("Con --grabar hay que indicar qué escenarios grabar")
+        # Los scrapers que dependen del día se vuelven a correr con la fecha de la grabación
+        fixtures.meta.setdefault("fecha", datetime.now().strftime("%d-%m-%Y"))
+        fixtures.meta["grabado"] = datetime.now().isoformat(timespec="seconds")
+        fixtures.meta["escenarios"] = sorted(set(fixtures.escenarios) | set(args.escenarios))
+        os.makedirs(args.fixtures, exist_ok=True)
+        with open(os.path.join(args.fixtures, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(fixtures.meta, f, ensure_ascii=False, indent=2)
+    else:
+        if fixtures.vacia():
+            parser.error(f"No hay fixtures en {args.fixtures}. Grábelos con --grabar <escenario> (ver {FIXTURES_DIR}/README.md)")
+        args.escenarios = args.escenarios or fixtures.escenarios
+        sin_fixtures = set(args.escenarios) - set(fixtures.escenarios)
+        if not args.escenarios or sin_fixtures:
+            parser.error(f"Los fixtures de {args.fixtures} no cubren: {', '.join(sorted(sin_fixtures)) or 'ningún escenario'}. "
+                         f"Grábelos con --grabar (cubiertos: {', '.join(fixtures.escenarios) or 'ninguno'})")
+    total = sum(len(e) for e in fixtures.entradas.values())
+    print(f"📼 {total} respuestas en fixtures ({args.fixtures}){' — grabando lo que falte' if args.grabar else ''}")
+
+    servidor = ServidorFixtures(fixtures, grabar=args.grabar, latencia_ms=args.latencia_ms).iniciar()
+    resultados = []
+    try:
+        for nombre in args.escenarios:
+            for i in range(args.repeticiones):
+                r = correr_escenario(nombre, servidor, fixtures, args.timeout, args.conservar)
+                r["repeticion"] = i + 1
+                resultados.append(r)
+                if r["codigo"] != 0:
+                    estado = f"❌ ({r['codigo']})"
+                elif not r["completo"]:
+                    estado = "❌ (faltan fixtures)"
+                else:
+                    estado = "✅"
+                print(f"{estado} {nombre:<14} {r['duracion_s']:>8.1f}s  {r['registros']:>6} {r['unidad']:<12} "
+                      f"{r['registros_por_min']:>8.1f}/min  {r['paginas_por_min']:>8.1f} pág/min  "
+                      f"{r['servidor']['requests']:>6} requests  {r['servidor']['faltantes']} sin fixture")
+                for url in r["faltantes"][:3]:
+                    print(f"   ↳ sin fixture: {url}")
+                if r["codigo"] != 0 and r.get("log", "").strip():
+                    print(f"   ↳ {r['log'].strip().splitlines()[-1]}")
+    finally:
+        servidor.detener()
+
+    print(f"💾 Resultados en {guardar(resultados, args)}")
+    incompletos = sorted({r["escenario"] for r in resultados if not r["completo"]})
+    if incompletos and not args.grabar:
+        print(f"❌ Pidieron URLs sin fixture: {', '.join(incompletos)}. Vuelva a grabarlos con --grabar.")
+        sys.exit(1)
@@ -1,18 +1,23 @@
 # calendar_tdlc.py
 from playwright.sync_api import sync_playwright
-import csv, os, time
+import csv, json, os, time
 from datetime import datetime
 from dateutil.relativedelta import relativedelta
 import unicodedata
 import re
 import sys, os
 sys.path.append(os.path.abspath("backend"))
-from src.notification_module.email_notifier import enviar_notificacion_evento
+from src.notification_module.outbox import encolar_evento, Despachador
 from src.notification_module.html_template import PLANTILLAS_HTML
+from src.scraping_module.audiencias_api import AudienciasAPI
+from src.scraping_module.sitios import CONSULTAS_URL, HEADLESS_FORZADO
+from src.storage_module.calendario_meta import CalendarioMeta
+from src.storage_module.calendario_keys import CalendarioKeyStore, CAMPOS_FILA, hash_fila
+from src.storage_module.atomic_io import archivo_atomico, append_csv_atomico
 
 
 MESES_SIN_RESULTADOS_LIMITE = 3
-URL = "https://consultas.tdlc.cl/audiencia"
+URL = f"{CONSULTAS_URL}/audiencia"
 CSV_PATH = "backend/data/calendar/calendario_audiencias.csv" 
 
 # ============== Utilidades CSV (append + dedupe) ==============
@@ -67,41 +72,70 @@ def es_audiencia_relevante(tipo: str) -> bool:
         "vista causa" in tipo_norm
     )
 
-def cargar_keys_existentes(csv_path: str) -> set[tuple[str, str, str]]:
-    keys = set()
-    if not os.path.exists(csv_path):
-        return keys
-    with open(csv_path, "r", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
+def cargar_keys_existentes(csv_path: str) -> CalendarioKeyStore:
+    """Índice persistente de keys (fecha, hora, rol); se abre al primer uso."""
+    return CalendarioKeyStore(csv_path)
+
+def aplicar_cambios(csv_path: str, cambios: dict[tuple[str,str,str], dict]) -> list[dict]:
+    """
+    Compacta el CSV reescribiendo en su lugar las filas cuyas keys cambiaron.
+    Escribe a un temporal y lo reemplaza de forma atómica. Devuelve el changelog.
+    """
+    changelog = []
+    with open(csv_path, "r", encoding="utf-8", newline="") as fin, archivo_atomico(csv_path) as fout:
+        reader = csv.DictReader(fin)
+        writer = csv.DictWriter(fout, fieldnames=reader.fieldnames or HEADER, extrasaction="ignore")
+        writer.writeheader()
         for r in reader:
-            key = (
-                (r.get("fecha") or "").strip(),
-                (r.get("hora") or "").strip(),
-                (r.get("rol") or "").strip(),
-            )
-            if any(key):  # ignora filas vacías
-                keys.add(key)
-    return keys
-
-def append_mes(csv_path: str, filas: list[dict], keys_existentes: set[tuple[str,str,str]]) -> int:
-    """Apendea filas nuevas (dedupe por fecha-hora-rol). Crea header si no existe."""
+            key = ((r.get("fecha") or "").strip(), (r.get("hora") or "").strip(), (r.get("rol") or "").strip())
+            nueva = cambios.get(key)
+            if nueva:
+                diferencias = {
+                    campo: [(r.get(campo) or "").strip(), nueva[campo]]
+                    for campo in CAMPOS_FILA
+                    if (r.get(campo) or "").strip() != nueva[campo]
+                }
+                if diferencias:
+                    changelog.append({"fecha": key[0], "hora": key[1], "rol": key[2], "cambios": diferencias})
+                r = {**r, **nueva}
+            writer.writerow(r)
+    return changelog
+
+def registrar_changelog(csv_path: str, changelog: list[dict]):
+    if not changelog:
+        return
+    ts = datetime.now().isoformat(timespec="seconds")
+    with open(f"{csv_path}.changelog.jsonl", "a", encoding="utf-8") as f:
+        for entrada in changelog:
+            f.write(json.dumps({"ts": ts, **entrada}, ensure_ascii=False) + "\n")
+
+def append_mes(csv_path: str, filas: list[dict], keys_existentes: CalendarioKeyStore, upsert: bool = False) -> int:
+    """
+    Apendea filas nuevas (dedupe por fecha-hora-rol). Crea header si no existe.
+    Con `upsert=True` además detecta audiencias ya guardadas cuyo estado,
+    tipo o carátula cambió, las reescribe en el CSV y registra el cambio en
+    `<csv>.changelog.jsonl`.
+    """
     if not filas:
         return 0
 
     nuevos = []
+    cambios = {}
+    keys_nuevas = set()
     for r in filas:
         key = ((r.get("fecha") or "").strip(), (r.get("hora") or "").strip(), (r.get("rol") or "").strip())
+        nueva = {
+            "fecha": key[0],
+            "hora": key[1],
+            "rol": key[2],
+            "caratula": (r.get("caratula") or "").strip(),
+            "tipo_audiencia": normalizar_tipo_audiencia((r.get("tipo_audiencia") or "").strip()),
+            "estado": (r.get("estado") or "").strip(),
+        }
         if key and key not in keys_existentes:
-            nueva = {
-                "fecha": (r.get("fecha") or "").strip(),
-                "hora": (r.get("hora") or "").strip(),
-                "rol": (r.get("rol") or "").strip(),
-                "caratula": (r.get("caratula") or "").strip(),
-                "tipo_audiencia": normalizar_tipo_audiencia((r.get("tipo_audiencia") or "").strip()),
-                "estado": (r.get("estado") or "").strip(),
-            }
             nuevos.append(nueva)
-            keys_existentes.add(key)
+            keys_nuevas.add(key)
+            keys_existentes.add(key, hash_fila(nueva))
 
             # 🔔 Enviar notificación si es una audiencia relevante
             if es_audiencia_relevante(nueva["tipo_audiencia"]):
@@ -113,28 +147,36 @@ def append_mes(csv_path: str, filas: list[dict], keys_existentes: set[tuple[str,
                     "Fecha": nueva["fecha"],
                     "tipo": tipo_evento,  # 👈 clave corregida
                     "TipoTramite": nueva["tipo_audiencia"],
+                    "tipo_audiencia": nueva["tipo_audiencia"],
                     "Referencia": nueva["caratula"],
                     "Link_Descarga": "https://consultas.tdlc.cl/audiencia"
                 }
 
                 if tipo_evento in PLANTILLAS_HTML:
-                    enviar_notificacion_evento(evento)
+                    encolar_evento(evento)
                 else:
                     print(f"❌ No se encontró plantilla para audiencia: '{tipo_evento}'")
 
+        elif upsert and key not in keys_nuevas:
+            h = hash_fila(nueva)
+            if keys_existentes.row_hash(key) != h:
+                cambios[key] = nueva
+                keys_existentes.add(key, h)
 
-    if not nuevos:
+    if not nuevos and not cambios:
         print("🟰 Nada nuevo que agregar (todo duplicado).")
         return 0
 
-    first_write = not os.path.exists(csv_path)
-    os.makedirs(os.path.dirname(csv_path), exist_ok=True)
-    with open(csv_path, "a", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=HEADER)
-        if first_write:
-            writer.writeheader()
-        writer.writerows(nuevos)
-    print(f"💾 Agregadas {len(nuevos)} filas nuevas a {csv_path}")
+    meta = CalendarioMeta.cargar(csv_path)  # antes de escribir, para no contar dos veces
+    if nuevos:
+        append_csv_atomico(csv_path, HEADER, nuevos)
+        print(f"💾 Agregadas {len(nuevos)} filas nuevas a {csv_path}")
+    if cambios:
+        changelog = aplicar_cambios(csv_path, cambios)
+        registrar_changelog(csv_path, changelog)
+        print(f"✏️ {len(changelog)} audiencia(s) con cambios reescritas en {csv_path}")
+    keys_existentes.confirmar()
+    meta.actualizar(nuevos)
     return len(nuevos)
 
 # ============== Scraper ==============
@@ -192,8 +234,15 @@ def ir_a_mes(page, mes_deseado, anio_deseado):
             raise Exception(f"❌ Error al intentar navegar al mes: {e}")
     raise Exception("❌ No se alcanzó el mes solicitado (exceso de pasos).")
 
-def scrape_audiencias_mes(page, mes: int, anio: int):
+def scrape_audiencias_mes(page, mes: int, anio: int, api: AudienciasAPI = None):
     print(f"📅 Revisando {mes:02d}-{anio}")
+
+    # Consulta directa al endpoint REST del calendario (un request por mes)
+    if api is not None:
+        filas = api.audiencias_mes(mes, anio)
+        if filas is not None:
+            return filas
+
     ir_a_mes(page, mes, anio)
 
     audiencias_totales = []
@@ -232,14 +281,14 @@ def scrape_audiencias_mes(page, mes: int, anio: int):
 
     return audiencias_totales
 
-def scrape_todos_los_meses_hacia_adelante():
+def scrape_todos_los_meses_hacia_adelante(upsert=True):
     keys_existentes = cargar_keys_existentes(CSV_PATH)
 
     with sync_playwright() as p:
-        browser = p.chromium.launch(headless=False)
+        browser = p.chromium.launch(headless=HEADLESS_FORZADO)
         page = browser.new_page()
-        page.goto(URL)
-        page.wait_for_load_state("domcontentloaded")
+        api = AudienciasAPI(page, URL)
+        api.descubrir()
 
         # Desde el mes actual en adelante
         dt = datetime.today().replace(day=1)
@@ -248,11 +297,11 @@ def scrape_todos_los_meses_hacia_adelante():
 
         pasos = 0  # límite de seguridad opcional
         while meses_sin_resultados < MESES_SIN_RESULTADOS_LIMITE and pasos < 60:
-            filas_mes = scrape_audiencias_mes(page, mes_actual, anio_actual)
+            filas_mes = scrape_audiencias_mes(page, mes_actual, anio_actual, api)
 
             if filas_mes:
                 # append inmediato (mes a mes) con dedupe
-                nuevas = append_mes(CSV_PATH, filas_mes, keys_existentes)
+                nuevas = append_mes(CSV_PATH, filas_mes, keys_existentes, upsert=upsert)
                 print(f"✅ {len(filas_mes)} filas encontradas, {nuevas} nuevas agregadas en {mes_actual:02d}-{anio_actual}")
                 meses_sin_resultados = 0
             else:
@@ -269,4 +318,9 @@ def scrape_todos_los_meses_hacia_adelante():
     print("🏁 Proceso finalizado.")
 
 if __name__ == "__main__":
-    scrape_todos_los_meses_hacia_adelante()
+    # Las notificaciones se envían en segundo plano mientras avanza el scraping
+    despachador = Despachador().iniciar()
+    try:
+        scrape_todos_los_meses_hacia_adelante()
+    finally:
+        despachador.detener()
@@ -15,7 +15,12 @@ import requests
 import pytz
 import os
 import re
-from backend.src.notification_module.email_notifier import enviar_aviso_nuevo_documento, enviar_resumen_diario
+from backend.src.notification_module.outbox import Despachador, encolar_eventos
+from backend.src.scraping_module.http_cache import HttpCache
+from backend.src.storage_module.catalogo_causas import CatalogoCausas
+from backend.src.storage_module.detalle_index import DetalleIndex
+from backend.src.storage_module.atomic_io import guardar_df_atomico
+from backend.src.storage_module.estado_diario_snapshot import guardar_causas_del_dia, guardar_tramites_del_dia
 
 # --- CONFIGURACIÓN ---
 WAIT = 60_000
@@ -252,6 +257,8 @@ class EstadoDiarioScraper:
         with sync_playwright() as p:
             browser = p.chromium.launch(headless=False)
             context = browser.new_context()
+            cache = HttpCache.compartida()
+            cache.instalar(context)
             page = context.new_page()
             page.goto(self.url, timeout=60000)
 
@@ -317,7 +324,7 @@ class EstadoDiarioScraper:
 
             if self.estado_diario_id:
                 try:
-                    response = page.request.get(self.api_base + self.estado_diario_id)
+                    response = cache.get(page.request, self.api_base + self.estado_diario_id)
                     data = response.json()
 
                     for causa in data:
@@ -339,8 +346,7 @@ class EstadoDiarioScraper:
             # --- NUEVA LÓGICA: Guardar los resultados en un CSV temporal ---
             df_resultados = pd.DataFrame(self.resultados)
             if not df_resultados.empty:
-                os.makedirs(os.path.dirname(ESTADO_DIARIO_TMP_CSV), exist_ok=True)
-                df_resultados.to_csv(ESTADO_DIARIO_TMP_CSV, index=False, encoding="utf-8-sig")
+                guardar_causas_del_dia(ESTADO_DIARIO_TMP_CSV, self.resultados)
                 print(f"✅ Se guardaron los resultados del estado diario en {ESTADO_DIARIO_TMP_CSV}")
             else:
                 print("⚠️ No se encontraron resultados del estado diario para guardar.")
@@ -364,11 +370,9 @@ class EstadoDiarioScraper:
             print(f"❌ Error al leer el archivo {ESTADO_DIARIO_TMP_CSV}: {e}")
             return
 
-        # 2. Cargar el archivo de detalle histórico para detectar nuevas causas
-        if os.path.exists(DETALLE_CSV):
-            df_detalle = pd.read_csv(DETALLE_CSV, dtype=str)
-        else:
-            df_detalle = pd.DataFrame(columns=FIELDNAMES)
+        # 2. Índice del detalle histórico para detectar nuevas causas en O(1)
+        indice_detalle = DetalleIndex.cargar(DETALLE_CSV)
+        catalogo = CatalogoCausas.cargar()
 
         nuevas_causas_a_agregar = []
         self.todos_los_tramites = []
@@ -379,6 +383,7 @@ class EstadoDiarioScraper:
         with sync_playwright() as p:
             browser = p.chromium.launch(headless=True)
             page = browser.new_page()
+            HttpCache.compartida().instalar(page)
 
             # 4. Iterar sobre cada causa del estado diario
             for index, row in df_causas_del_dia.iterrows():
@@ -392,7 +397,7 @@ class EstadoDiarioScraper:
                 print(f"🔎 Analizando expediente {rol}...")
                 
                 # Detectar si es una nueva causa
-                if rol not in df_detalle["rol"].values:
+                if not indice_detalle.contiene_rol(rol):
                     print(f"✨ ¡Nueva causa detectada! {rol}")
                     
                     nuevo_registro = {
@@ -411,7 +416,8 @@ class EstadoDiarioScraper:
                     eventos_del_dia.append({
                         "tipo": "Nueva Causa",
                         "rol": rol,
-                        "descripcion": row.get("descripcion", "")
+                        "descripcion": row.get("descripcion", ""),
+                        **catalogo.campos_evento(rol, row.get("idCausa", "")),
                     })
                 
                 # 5. Extraer los trámites del expediente usando la función de scraping
@@ -438,37 +444,39 @@ class EstadoDiarioScraper:
 
         # 7. Guardar los datos procesados y enviar el resumen
         if nuevas_causas_a_agregar:
+            if os.path.exists(DETALLE_CSV):
+                df_detalle = pd.read_csv(DETALLE_CSV, dtype=str)
+            else:
+                df_detalle = pd.DataFrame(columns=FIELDNAMES)
             df_nuevos = pd.DataFrame(nuevas_causas_a_agregar)
             df_detalle = pd.concat([df_detalle, df_nuevos], ignore_index=True)
-            df_detalle.to_csv(DETALLE_CSV, index=False, encoding="utf-8-sig")
+            guardar_df_atomico(df_detalle, DETALLE_CSV)
+            for registro in nuevas_causas_a_agregar:
+                indice_detalle.agregar(registro)
+            indice_detalle.guardar()
             print(f"✅ Se guardaron los cambios en {DETALLE_CSV}.")
 
         if self.todos_los_tramites:
-            df_tramites = pd.DataFrame(self.todos_los_tramites)
-            os.makedirs(os.path.dirname(DETALLE_ESTADO_DIARIO_TMP_CSV), exist_ok=True)
-            df_tramites.to_csv(DETALLE_ESTADO_DIARIO_TMP_CSV, index=False, encoding="utf-8-sig")
+            guardar_tramites_del_dia(DETALLE_ESTADO_DIARIO_TMP_CSV, self.todos_los_tramites)
             print(f"✅ Se guardó el detalle de los trámites en {DETALLE_ESTADO_DIARIO_TMP_CSV}")
         else:
             print("ℹ️ No se encontraron trámites para guardar en el detalle.")
 
-        listado_tramites = self.todos_los_tramites
-        
         print(f"\n--- Resumen del Día ---")
         print(f"Total de expedientes analizados: {len(df_causas_del_dia)}")
         print(f"Total de trámites encontrados: {tramites_encontrados}")
         print(f"Total de eventos importantes detectados: {len(eventos_del_dia)}")
         print(f"-----------------------\n")
         
-        enviar_resumen_diario(
-            fecha=self.fecha,
-            total_tramites=tramites_encontrados,
-            eventos_del_dia=eventos_del_dia,
-            listado_tramites=listado_tramites
-        )        
+        encolar_eventos(eventos_del_dia)
         
 if __name__ == "__main__":
     from datetime import datetime, timedelta
 
-    scraper = EstadoDiarioScraper()
-    scraper.extraer_estado_diario()
-    scraper.analizar_nuevos_fallos()
\ No newline at end of file
+    despachador = Despachador().iniciar()
+    try:
+        scraper = EstadoDiarioScraper()
+        scraper.extraer_estado_diario()
+        scraper.analizar_nuevos_fallos()
+    finally:
+        despachador.detener()
\ No newline at end of file
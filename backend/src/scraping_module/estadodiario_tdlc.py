@@ -15,13 +15,29 @@ import requests
 import pytz
 import os
 import re
-from backend.src.notification_module.email_notifier import enviar_correo_resumen_diario, enviar_resumen_diario
+import argparse
+import queue
+import threading
+from backend.src.notification_module.outbox import Despachador, encolar_eventos, encolar_resumen_diario
+from backend.src.scraping_module.tramites_api import TramitesAPI
+from backend.src.scraping_module.http_cache import HttpCache
+from backend.src.scraping_module.instrumentacion import contar, iniciar_corrida, metricas, tramo
+from backend.src.scraping_module.sitios import CONSULTAS_URL
+from backend.src.storage_module.catalogo_causas import CatalogoCausas
+from backend.src.storage_module.detalle_index import DetalleIndex
+from backend.src.storage_module.atomic_io import guardar_df_atomico
+from backend.src.storage_module.estado_diario_snapshot import (
+    guardar_causas_del_dia, guardar_tramites_del_dia, guardar_historial, particion_completa
+)
 
 # --- CONFIGURACIÓN ---
 WAIT = 30_000
-BASE = "https://consultas.tdlc.cl"
+BASE = CONSULTAS_URL
 DETALLE_CSV = "backend/data/historic_data/rol_idcausa_detalle_actualizado.csv"
 ESTADO_DIARIO_TMP_CSV = "backend/data/estado_diario/estado_diario_tmp.csv"
+ESTADO_DIARIO_DIR = "backend/data/estado_diario"
+# Intentos por expediente en el backfill antes de dejar sus días para la próxima corrida
+INTENTOS_TRAMITES = 2
 
 # --- NUEVO: Archivo para guardar el detalle de los trámites de cada expediente del día ---
 DETALLE_ESTADO_DIARIO_TMP_CSV = "backend/data/estado_diario/estado_diario_detalle_tmp.csv"
@@ -34,20 +50,46 @@ FIELDNAMES = [
     "reclamo_detectado", "fecha_reclamo", "link_reclamo"
 ]
 
-def extraer_tramites_del_dia(page, idCausa: str, rol: str, fecha_estado_diario: str):
+def extraer_tramites_del_dia(page, idCausa: str, rol: str, fecha_estado_diario):
+    """
+    Trámites del expediente publicados en `fecha_estado_diario` (dd-mm-yyyy).
+    Acepta también un conjunto de fechas, para que el backfill visite cada
+    causa una sola vez aunque aparezca en varios estados diarios del rango.
+
+    Devuelve None si el expediente no se pudo leer (no cargó, no mostró sus
+    cuadernos o falló el recorrido); `[]` sólo cuando se leyó y no hubo
+    trámites en esas fechas.
+    """
+    fechas = {fecha_estado_diario} if isinstance(fecha_estado_diario, str) else set(fecha_estado_diario)
     url = f"{BASE}/estadoDiario?idCausa={idCausa}"
+
+    # Primero vía REST: todos los cuadernos en un lote paralelo
+    try:
+        with tramo("tramites_api"):
+            tramites = TramitesAPI(page).tramites_causa(url, idCausa, rol, timeout=WAIT)
+    except Exception as e:
+        print(f"⚠️ Error consultando trámites de {rol} por API: {e}")
+        tramites = None
+    if tramites is not None:
+        return [t for t in tramites if t["Fecha"] in fechas]
+    print(f"ℹ️ Endpoint de trámites no disponible para {rol}; se recorren los cuadernos en la página")
+    contar("tramites_fallback_ui")
     
     try:
-        page.goto(url, wait_until="load", timeout=WAIT)
-        page.wait_for_load_state("networkidle", timeout=WAIT)
+        with tramo("navegacion"):
+            page.goto(url, wait_until="load", timeout=WAIT)
+            page.wait_for_load_state("networkidle", timeout=WAIT)
     except TimeoutError:
         print(f"⚠️ Primer intento fallido. Reintentando cargar {rol}")
+        contar("reintentos")
         try:
-            page.goto(url, wait_until="load", timeout=WAIT)
-            page.wait_for_load_state("networkidle", timeout=WAIT)
+            with tramo("navegacion"):
+                page.goto(url, wait_until="load", timeout=WAIT)
+                page.wait_for_load_state("networkidle", timeout=WAIT)
         except TimeoutError:
             print(f"❌ Fallo al cargar trámites para {rol}")
-            return []
+            contar("errores")
+            return None
 
     tramites_todos_los_cuadernos = []
 
@@ -56,7 +98,7 @@ def extraer_tramites_del_dia(page, idCausa: str, rol: str, fecha_estado_diario:
         opciones = select.query_selector_all("option") if select else []
         if not opciones:
             print(f"⚠️ No se encontraron opciones de cuadernos en {rol}")
-            return []
+            return None
 
         for opcion in opciones:
             nombre_cuaderno = opcion.inner_text().strip()
@@ -69,11 +111,12 @@ def extraer_tramites_del_dia(page, idCausa: str, rol: str, fecha_estado_diario:
             page.get_by_role("option", name=nombre_cuaderno).click()
 
             # Esperar a que se actualice la tabla
-            page.wait_for_timeout(1500)
-            page.wait_for_load_state("networkidle", timeout=WAIT)
+            with tramo("espera"):
+                page.wait_for_timeout(1500)
+                page.wait_for_load_state("networkidle", timeout=WAIT)
 
-            page.wait_for_timeout(1000)  # Esperar a que cambie el contenido
-            page.wait_for_load_state("networkidle", timeout=WAIT)
+                page.wait_for_timeout(1000)  # Esperar a que cambie el contenido
+                page.wait_for_load_state("networkidle", timeout=WAIT)
 
             # Volver a capturar filas de tabla
             rows = page.query_selector_all("table tbody tr")
@@ -83,7 +126,7 @@ def extraer_tramites_del_dia(page, idCausa: str, rol: str, fecha_estado_diario:
                     fecha_elem = row.query_selector("span[data-bind*='formatearFecha(fecha())']")
                     fecha_tramite_txt = fecha_elem.inner_text().strip() if fecha_elem else None
 
-                    if not fecha_tramite_txt or fecha_tramite_txt != fecha_estado_diario:
+                    if not fecha_tramite_txt or fecha_tramite_txt not in fechas:
                         continue
 
                     tipo_tramite_elem = row.query_selector("span[data-bind*='tipoTramite']")
@@ -98,10 +141,11 @@ def extraer_tramites_del_dia(page, idCausa: str, rol: str, fecha_estado_diario:
                     if tiene_descarga:
                         try:
                             link_elem = row.query_selector("span[title='Descargar Documento']")
-                            with page.expect_download(timeout=5000) as download_info:
+                            with tramo("descarga"), page.expect_download(timeout=5000) as download_info:
                                 page.evaluate("el => el.click()", link_elem)
                             download = download_info.value
                             link_url = download.url
+                            contar("descargas")
                         except TimeoutError:
                             print(f"⚠️ Link descarga fallido para trámite en {rol} - cuaderno {value}")
 
@@ -126,14 +170,15 @@ def extraer_tramites_del_dia(page, idCausa: str, rol: str, fecha_estado_diario:
 
     except Exception as e:
         print(f"❌ Error al intentar recorrer cuadernos de {rol}: {e}")
-        return []
+        return None
 
     return tramites_todos_los_cuadernos
 
 def analizar_expediente(page, idCausa: str):
     url = f"{BASE}/estadoDiario?idCausa={idCausa}"
-    page.goto(url, wait_until="load")
-    page.wait_for_load_state("networkidle", timeout=WAIT)
+    with tramo("navegacion"):
+        page.goto(url, wait_until="load")
+        page.wait_for_load_state("networkidle", timeout=WAIT)
 
     try:
         rows = page.query_selector_all("table tbody tr")
@@ -188,7 +233,7 @@ def analizar_expediente(page, idCausa: str):
                     span = row.query_selector("span[title='Descargar Documento']")
                     if span:
                         page.evaluate("span => span.click()", span)
-                        with page.expect_download(timeout=5000) as download_info:
+                        with tramo("descarga"), page.expect_download(timeout=5000) as download_info:
                             download = download_info.value
                             fallo_link = download.url
                 except:
@@ -202,7 +247,7 @@ def analizar_expediente(page, idCausa: str):
                     span = row.query_selector("span[title='Descargar Documento']")
                     if span:
                         page.evaluate("span => span.click()", span)
-                        with page.expect_download(timeout=5000) as download_info:
+                        with tramo("descarga"), page.expect_download(timeout=5000) as download_info:
                             download = download_info.value
                             reclamo_link = download.url
                 except:
@@ -235,8 +280,8 @@ def set_date_input(page, selector: str, valor_dd_mm_yyyy: str):
 
 class EstadoDiarioScraper:
     def __init__(self, fecha_personalizada=None):
-        self.url = "https://consultas.tdlc.cl/estadoDiario"
-        self.api_base = "https://consultas.tdlc.cl/rest/causa/byestadodiario/"
+        self.url = f"{BASE}/estadoDiario"
+        self.api_base = f"{BASE}/rest/causa/byestadodiario/"
         self.link_base = "https://consultas.tdlc.cl/estadoDiario?idCausa="
         self.resultados = []
         self.estado_diario_id = None
@@ -247,8 +292,12 @@ class EstadoDiarioScraper:
         with sync_playwright() as p:
             browser = p.chromium.launch(headless=True)
             context = browser.new_context()
+            cache = HttpCache.compartida()
+            cache.instalar(context)
+            metricas().instrumentar(context)
             page = context.new_page()
-            page.goto(self.url, timeout=60000)
+            with tramo("navegacion"):
+                page.goto(self.url, timeout=60000)
 
             if self.fecha:
                 try:
@@ -264,8 +313,9 @@ class EstadoDiarioScraper:
                     buscar_btn = page.locator("form[role='form'] button")
                     buscar_btn.click()
 
-                    page.wait_for_load_state("networkidle", timeout=15000)
-                    page.wait_for_selector("tbody[data-bind='foreach: estadoDiarios()'] tr", timeout=15000)
+                    with tramo("espera"):
+                        page.wait_for_load_state("networkidle", timeout=15000)
+                        page.wait_for_selector("tbody[data-bind='foreach: estadoDiarios()'] tr", timeout=15000)
 
                 except Exception as e:
                     print(f"❌ Error seleccionando fechas o cargando causas: {e}")
@@ -312,17 +362,18 @@ class EstadoDiarioScraper:
 
             if self.estado_diario_id:
                 try:
-                    response = page.request.get(self.api_base + self.estado_diario_id)
-                    data = response.json()
-
-                    for causa in data:
-                        self.resultados.append({
-                            "fecha_estado_diario": self.fecha,
-                            "rol": causa.get("rol", "").strip(),
-                            "descripcion": causa.get("descripcion", "").strip(),
-                            "tramites": causa.get("tramites", 0),
-                            "link": self.link_base + str(causa["id"])
-                        })
+                    with tramo("extraccion"):
+                        response = cache.get(page.request, self.api_base + self.estado_diario_id)
+                        data = response.json()
+
+                        for causa in data:
+                            self.resultados.append({
+                                "fecha_estado_diario": self.fecha,
+                                "rol": causa.get("rol", "").strip(),
+                                "descripcion": causa.get("descripcion", "").strip(),
+                                "tramites": causa.get("tramites", 0),
+                                "link": self.link_base + str(causa["id"])
+                            })
 
                 except Exception as e:
                     print(f"❌ Error al obtener causas para id {self.estado_diario_id}: {e}")
@@ -333,8 +384,8 @@ class EstadoDiarioScraper:
 
             df_resultados = pd.DataFrame(self.resultados)
             if not df_resultados.empty:
-                os.makedirs(os.path.dirname(ESTADO_DIARIO_TMP_CSV), exist_ok=True)
-                df_resultados.to_csv(ESTADO_DIARIO_TMP_CSV, index=False, encoding="utf-8-sig")
+                with tramo("escritura_csv"):
+                    guardar_causas_del_dia(ESTADO_DIARIO_TMP_CSV, self.resultados)
                 print(f"✅ Se guardaron los resultados del estado diario en {ESTADO_DIARIO_TMP_CSV}")
             else:
                 print("⚠️ No se encontraron resultados del estado diario para guardar.")
@@ -346,11 +397,10 @@ class EstadoDiarioScraper:
             print("⚠️ No hay causas a analizar.")
             return
 
-        # Cargar el archivo de detalle histórico
-        if os.path.exists(DETALLE_CSV):
-            df_detalle = pd.read_csv(DETALLE_CSV, dtype=str)
-        else:
-            df_detalle = pd.DataFrame(columns=FIELDNAMES)
+        # Índice (rol, idCausa[, fecha_fallo]) del detalle histórico para búsquedas O(1)
+        indice_detalle = DetalleIndex.cargar(DETALLE_CSV)
+        # Procedimiento de cada causa según el catálogo, para filtrar suscripciones
+        catalogo = CatalogoCausas.cargar()
         
         nuevas_causas_a_agregar = []
         eventos_del_dia = []
@@ -359,14 +409,18 @@ class EstadoDiarioScraper:
         with sync_playwright() as p:
             browser = p.chromium.launch(headless=True)
             page = browser.new_page()
+            HttpCache.compartida().instalar(page)
+            metricas().instrumentar(page)
             
             tramites_encontrados = 0
             for causa in self.resultados:
                 rol = causa["rol"]
                 idCausa = causa["link"].split("idCausa=")[-1]
+                procedimiento = catalogo.campos_evento(rol, idCausa)
+                contar("causas")
 
                 # --- Notificación de NUEVA CAUSA ---
-                if rol not in df_detalle["rol"].values:
+                if not indice_detalle.contiene_rol(rol):
                     print(f"✨ ¡Nueva causa detectada! {rol}")
                     
                     detalle_expediente = analizar_expediente(page, idCausa)
@@ -392,7 +446,8 @@ class EstadoDiarioScraper:
                         "link": f"{self.link_base}{idCausa}",
                         "fecha": fecha_primer_tramite,
                         "rol": rol,
-                        "id_causa": idCausa
+                        "id_causa": idCausa,
+                        **procedimiento,
                     }
                     eventos_del_dia.append(evento)
 
@@ -400,12 +455,16 @@ class EstadoDiarioScraper:
                 
                 # Obtener los trámites del día y guardarlos en la lista general
                 try:
-                    tramites = extraer_tramites_del_dia(page, idCausa, rol, self.fecha)
+                    with tramo("tramites_causa"):
+                        # El día se procesa igual sin los trámites de un expediente que no cargó
+                        tramites = extraer_tramites_del_dia(page, idCausa, rol, self.fecha) or []
                     self.todos_los_tramites.extend(tramites)
                     print(f"✅ Se encontraron {len(tramites)} trámites para este expediente.")
                     tramites_encontrados += len(tramites)
+                    contar("tramites", len(tramites))
                 except Exception as e:
                     print(f"❌ Error al intentar extraer trámites de {rol} ({idCausa}): {e}")
+                    contar("errores")
                     continue
 
                 for tramite in tramites:
@@ -415,9 +474,7 @@ class EstadoDiarioScraper:
                     if "conciliación" in referencia or "bases de conciliación" in referencia:
                         print(f"⚖️ ¡Nueva conciliación detectada en el expediente {rol}!")
                         
-                        indice = df_detalle[(df_detalle["rol"] == rol) & (df_detalle["idCausa"] == idCausa)].index
-                        
-                        if not indice.empty:
+                        if indice_detalle.contiene(rol, idCausa):
                             #df_detalle.loc[indice, "fallo_detectado"] = True
                             #df_detalle.loc[indice, "fecha_fallo"] = tramite.get("Fecha", "")
                             #df_detalle.loc[indice, "referencia_fallo"] = "Conciliación"
@@ -430,7 +487,8 @@ class EstadoDiarioScraper:
                                 "link": f"{self.link_base}{idCausa}",
                                 "fecha": tramite.get("Fecha", ""),
                                 "rol": rol,
-                                "id_causa": idCausa
+                                "id_causa": idCausa,
+                                **procedimiento,
                             }
                             eventos_del_dia.append(evento)
                         else:
@@ -446,9 +504,7 @@ class EstadoDiarioScraper:
                     if any(keyword in referencia for keyword in keywords_reclamacion):
                         print(f"🚨 ¡Reclamación elevada al CS detectada en el expediente {rol}!")
                         
-                        indice = df_detalle[(df_detalle["rol"] == rol) & (df_detalle["idCausa"] == idCausa)].index
-                        
-                        if not indice.empty:
+                        if indice_detalle.contiene(rol, idCausa):
                             #df_detalle.loc[indice, "reclamo_detectado"] = True
                             #df_detalle.loc[indice, "fecha_reclamo"] = tramite.get("Fecha", "")
                             #df_detalle.loc[indice, "link_reclamo"] = tramite.get("Link_Descarga", "")
@@ -461,7 +517,8 @@ class EstadoDiarioScraper:
                                 "link": f"{self.link_base}{idCausa}",
                                 "fecha": tramite.get("Fecha", ""),
                                 "rol": rol,
-                                "id_causa": idCausa
+                                "id_causa": idCausa,
+                                **procedimiento,
                             }
                             eventos_del_dia.append(evento)
                         else:
@@ -472,11 +529,7 @@ class EstadoDiarioScraper:
                 if not detalle or not detalle["fallo_detectado"]:
                     continue
 
-                duplicado_exacto = (
-                    (df_detalle["rol"] == rol) &
-                    (df_detalle["idCausa"] == idCausa) &
-                    (df_detalle["fecha_fallo"] == detalle["fecha_fallo"])
-                ).any()
+                duplicado_exacto = indice_detalle.contiene_fallo(rol, idCausa, detalle["fecha_fallo"])
 
                 es_fallo_del_dia = detalle["fecha_fallo"] == self.fecha
                 es_conciliacion = "conciliación" in detalle.get("referencia_fallo", "").lower()
@@ -497,7 +550,8 @@ class EstadoDiarioScraper:
                         "link": f"{self.link_base}{idCausa}",
                         "fecha": detalle["fecha_fallo"],
                         "rol": rol,
-                        "id_causa": idCausa
+                        "id_causa": idCausa,
+                        **procedimiento,
                     }
                     eventos_del_dia.append(evento)
                     
@@ -505,19 +559,26 @@ class EstadoDiarioScraper:
             
             # --- Guardar datos y resumen ---
             if nuevas_causas_a_agregar:
+                if os.path.exists(DETALLE_CSV):
+                    df_detalle = pd.read_csv(DETALLE_CSV, dtype=str)
+                else:
+                    df_detalle = pd.DataFrame(columns=FIELDNAMES)
                 df_nuevos = pd.DataFrame(nuevas_causas_a_agregar)
                 df_detalle = pd.concat([df_detalle, df_nuevos], ignore_index=True)
                 actualizado_df_detalle = True
             
             if actualizado_df_detalle:
-                df_detalle.to_csv(DETALLE_CSV, index=False, encoding="utf-8-sig")
+                with tramo("escritura_csv"):
+                    guardar_df_atomico(df_detalle, DETALLE_CSV)
+                    for registro in nuevas_causas_a_agregar:
+                        indice_detalle.agregar(registro)
+                    indice_detalle.guardar()
                 print(f"✅ Se guardaron los cambios en {DETALLE_CSV}.")
             
             # Guardar la lista de trámites del día
             if self.todos_los_tramites:
-                df_tramites = pd.DataFrame(self.todos_los_tramites)
-                os.makedirs(os.path.dirname(DETALLE_ESTADO_DIARIO_TMP_CSV), exist_ok=True)
-                df_tramites.to_csv(DETALLE_ESTADO_DIARIO_TMP_CSV, index=False, encoding="utf-8-sig")
+                with tramo("escritura_csv"):
+                    guardar_tramites_del_dia(DETALLE_ESTADO_DIARIO_TMP_CSV, self.todos_los_tramites)
                 print(f"✅ Se guardó el detalle de los trámites en {DETALLE_ESTADO_DIARIO_TMP_CSV}")
             else:
                 print("ℹ️ No se encontraron trámites para guardar en el detalle.")
@@ -540,15 +601,9 @@ class EstadoDiarioScraper:
             print(f"Total de eventos importantes detectados: {len(eventos_del_dia)}")
             print(f"-----------------------\n")
             
-            # --- Llamada a la función de resumen diario ---
-            enviar_resumen_diario(
-                fecha=self.fecha,
-                total_tramites=tramites_encontrados,
-                eventos_del_dia=eventos_del_dia,
-                listado_tramites=listado_tramites
-            )
-            
-            enviar_correo_resumen_diario(
+            # --- Notificaciones del día: quedan en el outbox y las envía el despachador ---
+            encolar_eventos(eventos_del_dia)
+            encolar_resumen_diario(
                 fecha=self.fecha,
                 total_tramites=tramites_encontrados,
                 listado_tramites=listado_tramites
@@ -556,16 +611,267 @@ class EstadoDiarioScraper:
             
         # Guardar la lista de trámites del día
         if self.todos_los_tramites:
-            df_tramites = pd.DataFrame(self.todos_los_tramites)
-            os.makedirs(os.path.dirname(DETALLE_ESTADO_DIARIO_TMP_CSV), exist_ok=True)
-            df_tramites.to_csv(DETALLE_ESTADO_DIARIO_TMP_CSV, index=False, encoding="utf-8-sig")
+            guardar_tramites_del_dia(DETALLE_ESTADO_DIARIO_TMP_CSV, self.todos_los_tramites)
             print(f"✅ Se guardó el detalle de los trámites en {DETALLE_ESTADO_DIARIO_TMP_CSV}")
         else:
             print("ℹ️ No se encontraron trámites para guardar en el detalle.")       
                  
-if __name__ == "__main__":
-    from datetime import datetime, timedelta
+def _fecha_estado_diario(valor) -> str:
+    """Normaliza la fecha de un estado diario del JSON (epoch ms, ISO o dd-mm-yyyy) a dd-mm-yyyy."""
+    if isinstance(valor, (int, float)):
+        return datetime.fromtimestamp(valor / 1000).strftime("%d-%m-%Y")
+    texto = str(valor or "").strip()
+    for fmt in ("%d-%m-%Y", "%Y-%m-%d", "%d/%m/%Y"):
+        try:
+            return datetime.strptime(texto[:10], fmt).strftime("%d-%m-%Y")
+        except ValueError:
+            continue
+    return ""
+
+
+class EstadoDiarioBackfill:
+    """
+    Reconstruye el historial del estado diario para un rango de fechas en un
+    solo proceso: pide el listado `byrango` una vez, obtiene las causas de
+    cada estado diario con la misma sesión y reparte los expedientes entre
+    `workers` navegadores. Cada causa se visita una vez aunque aparezca en
+    varios días, y cada día se escribe en su partición apenas terminan todas
+    sus causas, así un corte no pierde los días ya completos.
+    """
+
+    def __init__(self, desde: str, hasta: str, workers: int = 4, headless: bool = True, sobrescribir: bool = False):
+        self.url = f"{BASE}/estadoDiario"
+        self.api_base = f"{BASE}/rest/causa/byestadodiario/"
+        self.link_base = "https://consultas.tdlc.cl/estadoDiario?idCausa="
+        self.desde = desde  # dd-mm-yyyy
+        self.hasta = hasta
+        self.workers = workers
+        self.headless = headless
+        self.sobrescribir = sobrescribir
+        self._lock = threading.Lock()
+        self.causas_por_dia = {}      # fecha -> causas del estado diario
+        self.pendientes_por_dia = {}  # fecha -> idCausa aún sin procesar
+        self.tramites_por_dia = {}    # fecha -> trámites ya extraídos
+        self.fallidos_por_dia = {}    # fecha -> roles cuyos trámites no se pudieron extraer
+
+    # ============== Listado del rango ==============
+    def listar_estados_diarios(self, page) -> list[tuple[str, str]]:
+        """(id, fecha) de cada estado diario publicado en el rango."""
+        capturas = []
+
+        def on_response(response):
+            if "estadodiario/byrango" in response.url.lower():
+                capturas.append(response)
+
+        page.on("response", on_response)
+        page.goto(self.url, timeout=60000)
+        set_date_input(page, "#datetimepicker1 input", self.desde)
+        set_date_input(page, "#datetimepicker2 input", self.hasta)
+        page.locator("form[role='form'] button").click()
+        page.wait_for_load_state("networkidle", timeout=15000)
+        page.remove_listener("response", on_response)
+
+        for response in reversed(capturas):
+            try:
+                data = response.json()
+            except Exception:
+                continue
+            estados = [(str(e["id"]), _fecha_estado_diario(e.get("fecha") or e.get("fechaEstadoDiario")))
+                       for e in data if isinstance(e, dict) and e.get("id") is not None]
+            if estados:
+                return [(i, f) for i, f in estados if f]
+
+        print("⚠️ No se interceptó el listado byrango; se leerán los ids fila por fila.")
+        return self._listar_por_filas(page)
+
+    def _listar_por_filas(self, page) -> list[tuple[str, str]]:
+        estados = []
+        ids = []
+
+        def on_request(request):
+            match = re.search(r"byestadodiario/(\d+)", request.url)
+            if match:
+                ids.append(match.group(1))
+
+        page.on("request", on_request)
+        try:
+            filas = page.query_selector_all("tbody[data-bind='foreach: estadoDiarios()'] tr")
+            for fila in filas:
+                columnas = fila.query_selector_all("td")
+                btn = fila.query_selector("span.glyphicon")
+                if len(columnas) != 4 or not btn:
+                    continue
+                antes = len(ids)
+                btn.scroll_into_view_if_needed()
+                btn.click()
+                page.wait_for_timeout(1000)
+                try:
+                    page.click("button[data-dismiss='modal']", timeout=2000)
+                except Exception:
+                    pass
+                if len(ids) > antes:
+                    estados.append((ids[-1], columnas[0].inner_text().strip()))
+        finally:
+            page.remove_listener("request", on_request)
+        return estados
+
+    def causas_de(self, page, estado_id: str, fecha: str) -> list[dict]:
+        response = HttpCache.compartida().get(page.request, self.api_base + estado_id)
+        return [{
+            "fecha_estado_diario": fecha,
+            "rol": causa.get("rol", "").strip(),
+            "descripcion": causa.get("descripcion", "").strip(),
+            "tramites": causa.get("tramites", 0),
+            "link": self.link_base + str(causa["id"])
+        } for causa in response.json()]
+
+    # ============== Extracción de trámites ==============
+    def _worker(self, cola: queue.Queue, fechas_por_causa: dict):
+        with sync_playwright() as p:
+            browser = p.chromium.launch(headless=self.headless)
+            page = browser.new_page()
+            HttpCache.compartida().instalar(page)
+            metricas().instrumentar(page)
+            while True:
+                try:
+                    idCausa, rol = cola.get_nowait()
+                except queue.Empty:
+                    break
+                contar("causas")
+                tramites = None
+                for intento in range(1, INTENTOS_TRAMITES + 1):
+                    try:
+                        with tramo("tramites_causa"):
+                            tramites = extraer_tramites_del_dia(page, idCausa, rol, fechas_por_causa[idCausa])
+                    except Exception as e:
+                        print(f"❌ Error extrayendo trámites de {rol} (intento {intento}/{INTENTOS_TRAMITES}): {e}")
+                        contar("errores")
+                        continue
+                    if tramites is not None:
+                        contar("tramites", len(tramites))
+                        break
+                    print(f"❌ No se pudo leer el expediente {rol} (intento {intento}/{INTENTOS_TRAMITES})")
+                self._registrar(idCausa, rol, fechas_por_causa[idCausa], tramites)
+            browser.close()
 
-    scraper = EstadoDiarioScraper()
-    scraper.extraer_estado_diario()
-    scraper.analizar_nuevos_fallos()
\ No newline at end of file
+    def _registrar(self, idCausa: str, rol: str, fechas: set, tramites: list[dict] | None):
+        """
+        `tramites=None` significa que la causa falló: sus días no se escriben,
+        así quedan sin partición completa y la próxima corrida los retoma.
+        """
+        with self._lock:
+            for tramite in tramites or []:
+                self.tramites_por_dia.setdefault(tramite["Fecha"], []).append(tramite)
+            for fecha in fechas:
+                if tramites is None:
+                    self.fallidos_por_dia.setdefault(fecha, set()).add(rol)
+                pendientes = self.pendientes_por_dia[fecha]
+                pendientes.discard(idCausa)
+                if pendientes:
+                    continue
+                if fecha in self.fallidos_por_dia:
+                    self.tramites_por_dia.pop(fecha, None)
+                    print(f"⚠️ {fecha}: no se guarda, faltan trámites de {', '.join(sorted(self.fallidos_por_dia[fecha]))}")
+                else:
+                    self._guardar_dia(fecha)
+
+    def _guardar_dia(self, fecha: str):
+        tramites = self.tramites_por_dia.pop(fecha, [])
+        with tramo("escritura_csv"):
+            guardar_historial(ESTADO_DIARIO_DIR, self.causas_por_dia[fecha], tramites)
+        contar("dias_guardados")
+        print(f"💾 {fecha}: {len(self.causas_por_dia[fecha])} causas, {len(tramites)} trámites")
+
+    def run(self):
+        with sync_playwright() as p:
+            browser = p.chromium.launch(headless=self.headless)
+            context = browser.new_context()
+            HttpCache.compartida().instalar(context)
+            metricas().instrumentar(context)
+            page = context.new_page()
+            with tramo("listado_estado_diario"):
+                estados = self.listar_estados_diarios(page)
+            print(f"📅 {len(estados)} estado(s) diario(s) entre {self.desde} y {self.hasta}")
+
+            for estado_id, fecha in estados:
+                if not self.sobrescribir and particion_completa(ESTADO_DIARIO_DIR, fecha):
+                    continue
+                try:
+                    with tramo("extraccion"):
+                        self.causas_por_dia.setdefault(fecha, []).extend(self.causas_de(page, estado_id, fecha))
+                except Exception as e:
+                    print(f"❌ Error al obtener causas del estado diario {estado_id} ({fecha}): {e}")
+            browser.close()
+
+        # Cada expediente se visita una vez con todas las fechas en que aparece
+        fechas_por_causa, roles = {}, {}
+        for fecha, causas in self.causas_por_dia.items():
+            self.pendientes_por_dia[fecha] = set()
+            for causa in causas:
+                idCausa = causa["link"].split("idCausa=")[-1]
+                fechas_por_causa.setdefault(idCausa, set()).add(fecha)
+                roles[idCausa] = causa["rol"]
+                self.pendientes_por_dia[fecha].add(idCausa)
+
+        for fecha, pendientes in self.pendientes_por_dia.items():
+            if not pendientes:
+                self._guardar_dia(fecha)
+        if not fechas_por_causa:
+            print("✅ No hay días pendientes en el rango.")
+            return
+
+        print(f"🔎 {len(fechas_por_causa)} expediente(s) únicos en {len(self.causas_por_dia)} día(s)")
+        cola = queue.Queue()
+        for idCausa in fechas_por_causa:
+            cola.put((idCausa, roles[idCausa]))
+
+        hilos = [threading.Thread(target=self._worker, args=(cola, fechas_por_causa), daemon=True)
+                 for _ in range(max(1, min(self.workers, len(fechas_por_causa))))]
+        for h in hilos:
+            h.start()
+        for h in hilos:
+            h.join()
+
+        if self.fallidos_por_dia:
+            fallidos = {fecha: sorted(roles) for fecha, roles in sorted(self.fallidos_por_dia.items())}
+            metricas().anotar("dias_fallidos", fallidos)
+            contar("dias_fallidos", len(fallidos))
+            print(f"⚠️ {len(fallidos)} día(s) quedaron sin guardar y se reintentarán en la próxima corrida:")
+            for fecha, roles_fallidos in fallidos.items():
+                print(f"   {fecha}: {', '.join(roles_fallidos)}")
+        print(f"✅ Backfill del estado diario {self.desde} → {self.hasta} terminado ({HttpCache.compartida().resumen()})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scraper del estado diario del TDLC")
+    parser.add_argument("--fecha", help="Procesa un solo día (dd-mm-yyyy) con notificaciones")
+    parser.add_argument("--desde", help="Inicio del backfill por rango (dd-mm-yyyy)")
+    parser.add_argument("--hasta", help="Fin del backfill por rango (dd-mm-yyyy, por defecto hoy)")
+    parser.add_argument("--workers", type=int, default=4, help="Navegadores en paralelo para el backfill")
+    parser.add_argument("--sobrescribir", action="store_true", help="Vuelve a bajar días que ya tienen partición")
+    args = parser.parse_args()
+
+    if args.desde:
+        hasta = args.hasta or datetime.now().strftime("%d-%m-%Y")
+        corrida = iniciar_corrida("estado_diario_backfill")
+        corrida.anotar("rango", [args.desde, hasta])
+        corrida.anotar("workers", args.workers)
+        try:
+            EstadoDiarioBackfill(args.desde, hasta, workers=args.workers, sobrescribir=args.sobrescribir).run()
+        finally:
+            corrida.anotar("cache_http", HttpCache.compartida().resumen())
+            corrida.guardar()
+    else:
+        corrida = iniciar_corrida("estado_diario")
+        corrida.anotar("fecha", args.fecha)
+        despachador = Despachador().iniciar()
+        try:
+            scraper = EstadoDiarioScraper(fecha_personalizada=args.fecha)
+            with tramo("listado_estado_diario"):
+                scraper.extraer_estado_diario()
+            with tramo("analisis_causas"):
+                scraper.analizar_nuevos_fallos()
+        finally:
+            despachador.detener()
+            corrida.anotar("cache_http", HttpCache.compartida().resumen())
+            corrida.guardar()
@@ -0,0 +1,203 @@
+# http_cache.py
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+CACHE_PATH = "backend/data/cache/http_cache.sqlite"
+
+# (patrón de URL, segundos en que la respuesta se sirve sin consultar al servidor).
+# Pasado ese tiempo se revalida con If-None-Match / If-Modified-Since.
+POLITICAS_TTL = [
+    (r"/rest/causa/byestadodiario/", 7 * 24 * 3600),  # un estado diario publicado no cambia
+    (r"/rest/estadodiario/byrango", 10 * 60),
+    (r"/rest/.*tramite", 60 * 60),
+    (r"/rest/.*audiencia", 60 * 60),
+    (r"/rest/", 15 * 60),
+]
+
+# Headers que no se pueden reenviar tal cual con el body ya decodificado
+HEADERS_EXCLUIDOS = {"content-encoding", "content-length", "transfer-encoding", "connection"}
+
+
+def ttl_para(url: str, politicas=POLITICAS_TTL) -> int:
+    for patron, ttl in politicas:
+        if re.search(patron, url, re.IGNORECASE):
+            return ttl
+    return 0
+
+
+class RespuestaCacheada:
+    """Respuesta mínima con la misma interfaz que usan los scrapers de una APIResponse."""
+
+    def __init__(self, url: str, status: int, headers: dict, cuerpo: bytes, desde_cache: bool):
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self.cuerpo = cuerpo
+        self.desde_cache = desde_cache
+
+    @property
+    def ok(self) -> bool:
+        return 200 <= self.status < 300
+
+    def body(self) -> bytes:
+        return self.cuerpo
+
+    def text(self) -> str:
+        return self.cuerpo.decode("utf-8", errors="replace")
+
+    def json(self):
+        return json.loads(self.cuerpo)
+
+
+class HttpCache:
+    """
+    Caché HTTP en disco (SQLite) para las consultas a consultas.tdlc.cl.
+
+    Guarda por método + URL el body, los headers, el ETag/Last-Modified y la
+    hora de la descarga. Mientras la respuesta esté dentro del TTL de su
+    endpoint se sirve desde disco sin tocar la red; después se revalida con un
+    request condicional y un 304 sólo renueva la hora.
+
+    Se engancha a Playwright de dos formas: `instalar(context)` intercepta los
+    requests REST que hace la propia página (Knockout), y `get(request, url)`
+    reemplaza las llamadas directas a `page.request.get`.
+    """
+
+    _compartidas = {}
+    _lock_compartidas = threading.Lock()
+
+    def __init__(self, path: str = CACHE_PATH, politicas=POLITICAS_TTL):
+        self.path = path
+        self.politicas = politicas
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.revalidados = 0
+        self.descargas = 0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # La usan varios hilos (cada uno con su navegador), siempre bajo el lock
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS respuestas ("
+            " clave TEXT PRIMARY KEY, url TEXT, status INTEGER, headers TEXT, body BLOB,"
+            " etag TEXT, last_modified TEXT, fecha REAL)"
+        )
+
+    @classmethod
+    def compartida(cls, path: str = CACHE_PATH) -> "HttpCache":
+        """Una instancia por archivo y proceso."""
+        with cls._lock_compartidas:
+            if path not in cls._compartidas:
+                cls._compartidas[path] = cls(path)
+            return cls._compartidas[path]
+
+    # ============== Almacenamiento ==============
+    @staticmethod
+    def clave(metodo: str, url: str) -> str:
+        return f"{metodo.upper()} {url}"
+
+    def leer(self, clave: str):
+        with self._lock:
+            fila = self._conn.execute(
+                "SELECT url, status, headers, body, etag, last_modified, fecha FROM respuestas WHERE clave = ?",
+                (clave,),
+            ).fetchone()
+        if not fila:
+            return None
+        url, status, headers, body, etag, last_modified, fecha = fila
+        return {"url": url, "status": status, "headers": json.loads(headers), "body": body,
+                "etag": etag, "last_modified": last_modified, "fecha": fecha}
+
+    def guardar(self, clave: str, url: str, status: int, headers: dict, body: bytes):
+        headers = {k: v for k, v in headers.items() if k.lower() not in HEADERS_EXCLUIDOS}
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO respuestas (clave, url, status, headers, body, etag, last_modified, fecha) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (clave, url, status, json.dumps(headers), body,
+                 headers.get("etag"), headers.get("last-modified"), time.time()),
+            )
+
+    def _renovar(self, clave: str):
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE respuestas SET fecha = ? WHERE clave = ?", (time.time(), clave))
+
+    def _contar(self, contador: str):
+        # Los hilos de los workers comparten la instancia (`compartida`)
+        with self._lock:
+            setattr(self, contador, getattr(self, contador) + 1)
+
+    def vigente(self, entrada: dict) -> bool:
+        return time.time() - entrada["fecha"] < ttl_para(entrada["url"], self.politicas)
+
+    @staticmethod
+    def headers_condicionales(entrada) -> dict:
+        headers = {}
+        if entrada and entrada["etag"]:
+            headers["If-None-Match"] = entrada["etag"]
+        if entrada and entrada["last_modified"]:
+            headers["If-Modified-Since"] = entrada["last_modified"]
+        return headers
+
+    # ============== Integración con Playwright ==============
+    def get(self, request_context, url: str) -> RespuestaCacheada:
+        """`request_context.get(url)` pasando por la caché (p. ej. `page.request`)."""
+        clave = self.clave("GET", url)
+        entrada = self.leer(clave)
+        if entrada and self.vigente(entrada):
+            self._contar("aciertos")
+            return RespuestaCacheada(url, entrada["status"], entrada["headers"], entrada["body"], True)
+
+        response = request_context.get(url, headers=self.headers_condicionales(entrada))
+        if response.status == 304 and entrada:
+            self._contar("revalidados")
+            self._renovar(clave)
+            return RespuestaCacheada(url, entrada["status"], entrada["headers"], entrada["body"], True)
+
+        self._contar("descargas")
+        body = response.body()
+        if response.ok:
+            self.guardar(clave, url, response.status, response.headers, body)
+        return RespuestaCacheada(url, response.status, response.headers, body, False)
+
+    def instalar(self, context, patron: str = "**/rest/**"):
+        """Intercepta los GET REST de las páginas del contexto (o de una página)."""
+        context.route(patron, self._manejar_ruta)
+
+    def _manejar_ruta(self, route):
+        request = route.request
+        if request.method != "GET":
+            return route.continue_()
+
+        clave = self.clave("GET", request.url)
+        entrada = self.leer(clave)
+        if entrada and self.vigente(entrada):
+            self._contar("aciertos")
+            return route.fulfill(status=entrada["status"], headers=entrada["headers"], body=entrada["body"])
+
+        try:
+            response = route.fetch(headers={**request.headers, **self.headers_condicionales(entrada)})
+        except Exception:
+            return route.continue_()
+
+        if response.status == 304 and entrada:
+            self._contar("revalidados")
+            self._renovar(clave)
+            return route.fulfill(status=entrada["status"], headers=entrada["headers"], body=entrada["body"])
+
+        self._contar("descargas")
+        body = response.body()
+        headers = {k: v for k, v in response.headers.items() if k.lower() not in HEADERS_EXCLUIDOS}
+        if response.ok:
+            self.guardar(clave, request.url, response.status, headers, body)
+        return route.fulfill(status=response.status, headers=headers, body=body)
+
+    def resumen(self) -> str:
+        return f"caché HTTP: {self.aciertos} desde disco, {self.revalidados} revalidadas (304), {self.descargas} descargas"
+
+    def cerrar(self):
+        with self._lock:
+            self._conn.close()
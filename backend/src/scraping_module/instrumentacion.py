@@ -0,0 +1,172 @@
+# instrumentacion.py
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+REPORTES_DIR = "backend/data/metrics"
+
+
+def percentil(ordenados: list, p: float) -> float:
+    """Percentil por rango más cercano sobre una lista ya ordenada."""
+    if not ordenados:
+        return 0.0
+    k = max(0, min(len(ordenados) - 1, math.ceil(p / 100 * len(ordenados)) - 1))
+    return ordenados[k]
+
+
+class Metricas:
+    """
+    Tiempos y contadores de una corrida de scraping.
+
+    - `tramo(etapa)`: context manager que mide cuánto tarda una etapa
+      (navegación, esperas, extracción, descargas, escritura de CSV...) y
+      guarda cada duración para sacar p50/p95 al final.
+    - `contar(nombre, n)`: contadores (páginas, bytes, reintentos, errores).
+    - `observar(nombre, valor)`: muestras sueltas que no son tiempos.
+    - `instrumentar(page|context)`: cuenta solo las respuestas de Playwright.
+
+    Es segura entre hilos. Entre procesos cada worker arma la suya y el padre
+    junta lo que devuelve `exportar()` con `combinar()`.
+    """
+
+    def __init__(self, nombre: str):
+        self.nombre = nombre
+        self.inicio = time.time()
+        self._t0 = time.perf_counter()
+        self._lock = threading.Lock()
+        self.contadores = {}
+        self.muestras = {}
+        self.tiempos = {}
+        self.datos = {}
+
+    # ============== Registro ==============
+    @contextmanager
+    def tramo(self, etapa: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            duracion = time.perf_counter() - t0
+            with self._lock:
+                self.tiempos.setdefault(etapa, []).append(duracion)
+
+    def contar(self, nombre: str, n: int = 1):
+        with self._lock:
+            self.contadores[nombre] = self.contadores.get(nombre, 0) + n
+
+    def observar(self, nombre: str, valor: float):
+        with self._lock:
+            self.muestras.setdefault(nombre, []).append(valor)
+
+    def anotar(self, clave: str, valor):
+        """Dato suelto que va tal cual al reporte (parámetros de la corrida, resumen de caché...)."""
+        with self._lock:
+            self.datos[clave] = valor
+
+    def instrumentar(self, objetivo):
+        """Cuenta respuestas, páginas, bytes y requests fallidos de una página o contexto."""
+        def on_response(response):
+            self.contar("respuestas")
+            if response.request.resource_type == "document":
+                self.contar("paginas_cargadas")
+            if response.status >= 400:
+                self.contar("respuestas_error")
+            largo = response.headers.get("content-length", "")
+            if largo.isdigit():
+                self.contar("bytes", int(largo))
+
+        def on_requestfailed(request):
+            self.contar("requests_fallidos")
+
+        objetivo.on("response", on_response)
+        objetivo.on("requestfailed", on_requestfailed)
+        return objetivo
+
+    # ============== Entre procesos ==============
+    def exportar(self) -> dict:
+        with self._lock:
+            return {
+                "contadores": dict(self.contadores),
+                "tiempos": {k: list(v) for k, v in self.tiempos.items()},
+                "muestras": {k: list(v) for k, v in self.muestras.items()},
+            }
+
+    def combinar(self, exportado: dict):
+        with self._lock:
+            for k, n in exportado.get("contadores", {}).items():
+                self.contadores[k] = self.contadores.get(k, 0) + n
+            for destino, origen in ((self.tiempos, "tiempos"), (self.muestras, "muestras")):
+                for k, valores in exportado.get(origen, {}).items():
+                    destino.setdefault(k, []).extend(valores)
+
+    # ============== Reporte ==============
+    @staticmethod
+    def _resumir(valores: list) -> dict:
+        ordenados = sorted(valores)
+        return {
+            "n": len(ordenados),
+            "total": round(sum(ordenados), 3),
+            "media": round(sum(ordenados) / len(ordenados), 3) if ordenados else 0.0,
+            "p50": round(percentil(ordenados, 50), 3),
+            "p95": round(percentil(ordenados, 95), 3),
+            "max": round(ordenados[-1], 3) if ordenados else 0.0,
+        }
+
+    def reporte(self) -> dict:
+        duracion = time.perf_counter() - self._t0
+        with self._lock:
+            etapas = {k: self._resumir(v) for k, v in self.tiempos.items()}
+            return {
+                "corrida": self.nombre,
+                "inicio": datetime.fromtimestamp(self.inicio).isoformat(timespec="seconds"),
+                "duracion_s": round(duracion, 3),
+                "contadores": dict(sorted(self.contadores.items())),
+                # Tiempos en segundos; "total" suma el tiempo de todos los hilos
+                "etapas_s": dict(sorted(etapas.items(), key=lambda kv: -kv[1]["total"])),
+                "muestras": {k: self._resumir(v) for k, v in self.muestras.items()},
+                "datos": dict(self.datos),
+            }
+
+    def guardar(self, directorio: str = REPORTES_DIR) -> str:
+        """Escribe el reporte JSON de la corrida y muestra las etapas más pesadas."""
+        reporte = self.reporte()
+        os.makedirs(directorio, exist_ok=True)
+        path = os.path.join(directorio, f"{self.nombre}_{datetime.fromtimestamp(self.inicio):%Y%m%d_%H%M%S}.json")
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(reporte, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, path)
+
+        print(f"⏱️ {self.nombre}: {reporte['duracion_s']:.1f}s — reporte en {path}")
+        for etapa, r in list(reporte["etapas_s"].items())[:6]:
+            print(f"   {etapa:<22} n={r['n']:<6} total={r['total']:>9.2f}s  p50={r['p50']:.3f}s  p95={r['p95']:.3f}s")
+        return path
+
+
+# Corrida activa del proceso: las funciones sueltas de los scrapers registran
+# en ella sin tener que recibirla como parámetro
+_actual = Metricas("sin_corrida")
+_lock_actual = threading.Lock()
+
+
+def iniciar_corrida(nombre: str) -> Metricas:
+    global _actual
+    with _lock_actual:
+        _actual = Metricas(nombre)
+        return _actual
+
+
+def metricas() -> Metricas:
+    return _actual
+
+
+def tramo(etapa: str):
+    return _actual.tramo(etapa)
+
+
+def contar(nombre: str, n: int = 1):
+    _actual.contar(nombre, n)
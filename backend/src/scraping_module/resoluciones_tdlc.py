@@ -1,14 +1,19 @@
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
 import csv
-import os
 import re
 import time
 from datetime import datetime
 from tqdm import tqdm
 from playwright.sync_api import sync_playwright
 from bs4 import BeautifulSoup
+from storage_module.atomic_io import append_csv_atomico, escribir_csv_atomico
+from scraping_module.instrumentacion import contar, iniciar_corrida, metricas, tramo
+from scraping_module.sitios import WEB_URL
 
 class ResolucionesTDLC:
-    BASE_URL = "https://www.tdlc.cl/?page_id=38816&sort_order=_sfm_orden+desc+num"
+    BASE_URL = f"{WEB_URL}/?page_id=38816&sort_order=_sfm_orden+desc+num"
     LISTADO_CSV = "backend/data/resoluciones_listado.csv"
     DETALLE_CSV = "backend/data/resoluciones_detalle.csv"
     N_PAGINAS = 8  # ajusta si cambia
@@ -38,15 +43,19 @@ class ResolucionesTDLC:
         resultados = []
         ultimo = self.obtener_ultimo_numero_resolucion()  # ✅ se mueve aquí
         with sync_playwright() as p:
-            browser = p.chromium.launch(headless=True)
-            page = browser.new_page()
+            with tramo("navegador"):
+                browser = p.chromium.launch(headless=True)
+                page = metricas().instrumentar(browser.new_page())
 
             for i in range(1, self.N_PAGINAS + 1):
                 print(f"🔍 Página {i}...")
                 url = f"{self.BASE_URL}&sf_paged={i}"
-                page.goto(url, timeout=60000)
-                page.wait_for_selector("article.tdlc-resoluciones", timeout=15000)
+                with tramo("navegacion"):
+                    page.goto(url, timeout=60000)
+                with tramo("espera"):
+                    page.wait_for_selector("article.tdlc-resoluciones", timeout=15000)
                 articulos = page.query_selector_all("article.tdlc-resoluciones")
+                contar("paginas_listado")
 
                 for art in articulos:
                     try:
@@ -146,28 +155,34 @@ class ResolucionesTDLC:
     def extraer_detalle_resolucion(self, url):
         print(f"📝 Detalle: {url}")
         with sync_playwright() as p:
-            browser = p.chromium.launch(headless=True)
-            page = browser.new_page()
+            with tramo("navegador"):
+                browser = p.chromium.launch(headless=True)
+                page = metricas().instrumentar(browser.new_page())
             try:
-                page.goto(url, timeout=60000)
-                page.wait_for_selector(".elementor-section", timeout=15000)
-                time.sleep(1)
-                html = page.content()
-                data = self.extraer_campos_detalle(html)
+                with tramo("navegacion"):
+                    page.goto(url, timeout=60000)
+                with tramo("espera"):
+                    page.wait_for_selector(".elementor-section", timeout=15000)
+                    time.sleep(1)
+                with tramo("extraccion"):
+                    html = page.content()
+                    data = self.extraer_campos_detalle(html)
                 data["url"] = url
+                contar("detalles")
                 return data
             except Exception as e:
+                contar("errores")
                 print(f"❌ Error detalle {url}: {e}")
                 return {"url": url}
             finally:
                 browser.close()
 
     def guardar_listado(self, nuevas, modo="w"):
-        with open(self.LISTADO_CSV, modo, newline="", encoding="utf-8") as f:
-            writer = csv.DictWriter(f, fieldnames=["fecha", "numero_resolucion", "codigo", "descripcion", "url_ficha"])
-            if modo == "w":
-                writer.writeheader()
-            writer.writerows(nuevas)
+        campos = ["fecha", "numero_resolucion", "codigo", "descripcion", "url_ficha"]
+        if modo == "w":
+            escribir_csv_atomico(self.LISTADO_CSV, campos, nuevas)
+        else:
+            append_csv_atomico(self.LISTADO_CSV, campos, nuevas)
 
     def guardar_detalles(self, detalles):
         campos = [
@@ -176,16 +191,13 @@ class ResolucionesTDLC:
             "resultado_tdlc", "voto_en_contra", "voto_prevencion", "resolucion_corte_suprema",
             "link_resolucion_corte_suprema", "url"
         ]
-        with open(self.DETALLE_CSV, "a", newline="", encoding="utf-8") as f:
-            writer = csv.DictWriter(f, fieldnames=campos)
-            if not os.path.exists(self.DETALLE_CSV):
-                writer.writeheader()
-            writer.writerows(detalles)
+        append_csv_atomico(self.DETALLE_CSV, campos, detalles)
 
     def actualizar_si_hay_nuevas(self):
         print("🚀 Iniciando verificación de nuevas resoluciones...")
         ultimo_guardado = self.obtener_ultimo_numero_resolucion()
-        listado = self.scrapear_listado()
+        with tramo("listado"):
+            listado = self.scrapear_listado()
 
         nuevas = []
         for r in listado:
@@ -201,18 +213,25 @@ class ResolucionesTDLC:
             return
 
         print(f"📈 Se detectaron {len(nuevas)} nueva(s) resolución(es) con número mayor a {ultimo_guardado}")
-        self.guardar_listado(nuevas, modo="a")
+        with tramo("escritura_csv"):
+            self.guardar_listado(nuevas, modo="a")
         print("💾 Nuevas resoluciones agregadas al listado.")
 
         detalles = []
         for r in tqdm(nuevas, desc="📘 Detalles"):
-            detalle = self.extraer_detalle_resolucion(r["url_ficha"])
+            with tramo("detalle"):
+                detalle = self.extraer_detalle_resolucion(r["url_ficha"])
             detalles.append(detalle)
 
-        self.guardar_detalles(detalles)
+        with tramo("escritura_csv"):
+            self.guardar_detalles(detalles)
         print("✅ Detalles guardados con éxito.")
 
 
 
 if __name__ == "__main__":
-    ResolucionesTDLC().actualizar_si_hay_nuevas()
+    corrida = iniciar_corrida("resoluciones")
+    try:
+        ResolucionesTDLC().actualizar_si_hay_nuevas()
+    finally:
+        corrida.guardar()
@@ -10,11 +10,14 @@ import time
 from datetime import datetime
 from tqdm import tqdm
 from notification_module.email_notifier import enviar_aviso_nuevo_documento
+from storage_module.atomic_io import append_csv_atomico, escribir_csv_atomico
+from scraping_module.instrumentacion import contar, iniciar_corrida, metricas, tramo
+from scraping_module.sitios import WEB_URL
 
 
 class SentenciasTDLC:
 
-    BASE_URL = "https://www.tdlc.cl/sentencia/"
+    BASE_URL = f"{WEB_URL}/sentencia/"
     LISTADO_CSV = "backend/data/sentencias_listado.csv"
     DETALLE_CSV = "backend/data/sentencias_detalle.csv"
 
@@ -35,10 +38,13 @@ class SentenciasTDLC:
     def scrapear_primera_pagina_listado(self):
         print("🔍 Cargando primera página de sentencias...")
         with sync_playwright() as p:
-            browser = p.chromium.launch(headless=True)
-            page = browser.new_page()
-            page.goto(self.BASE_URL, timeout=60000)
-            page.wait_for_selector("article.tdlc-sentencias", timeout=15000)
+            with tramo("navegador"):
+                browser = p.chromium.launch(headless=True)
+                page = metricas().instrumentar(browser.new_page())
+            with tramo("navegacion"):
+                page.goto(self.BASE_URL, timeout=60000)
+            with tramo("espera"):
+                page.wait_for_selector("article.tdlc-sentencias", timeout=15000)
             articulos = page.query_selector_all("article.tdlc-sentencias")
             resultados = []
 
@@ -142,47 +148,48 @@ class SentenciasTDLC:
     def extraer_detalle_sentencia(self, url):
         print(f"📝 Extrayendo detalle de: {url}")
         with sync_playwright() as p:
-            browser = p.chromium.launch(headless=True)
-            page = browser.new_page()
+            with tramo("navegador"):
+                browser = p.chromium.launch(headless=True)
+                page = metricas().instrumentar(browser.new_page())
             try:
-                page.goto(url, timeout=60000)
-                page.wait_for_selector(".elementor-section", timeout=15000)
-                time.sleep(1)
-                html = page.content()
-                data = self.extraer_campos_detalle(html)
+                with tramo("navegacion"):
+                    page.goto(url, timeout=60000)
+                with tramo("espera"):
+                    page.wait_for_selector(".elementor-section", timeout=15000)
+                    time.sleep(1)
+                with tramo("extraccion"):
+                    html = page.content()
+                    data = self.extraer_campos_detalle(html)
                 data["url"] = url
+                contar("detalles")
                 return data
             except Exception as e:
+                contar("errores")
                 print(f"❌ Error al extraer detalle: {e}")
                 return {"url": url}
             finally:
                 browser.close()
 
     def guardar_sentencias_listado(self, nuevas, modo="a"):
-        existe = os.path.exists(self.LISTADO_CSV)
-        with open(self.LISTADO_CSV, modo, newline="", encoding="utf-8") as f:
-            writer = csv.DictWriter(f, fieldnames=["fecha", "numero_sentencia", "codigo", "descripcion", "url_ficha"])
-            if not existe or modo == "w":
-                writer.writeheader()
-            writer.writerows(nuevas)
+        campos = ["fecha", "numero_sentencia", "codigo", "descripcion", "url_ficha"]
+        if modo == "w":
+            escribir_csv_atomico(self.LISTADO_CSV, campos, nuevas)
+        else:
+            append_csv_atomico(self.LISTADO_CSV, campos, nuevas)
 
     def guardar_sentencias_detalle(self, nuevas_detalles):
-        existe = os.path.exists(self.DETALLE_CSV)
-        with open(self.DETALLE_CSV, "a", newline="", encoding="utf-8") as f:
-            campos = [
-                "fecha_dictacion", "caratula", "rol_causa", "procedimiento", "partes", "ministros_concuerdan",
-                "ministro_redactor", "conducta", "industria", "articulo_norma", "resumen_controversia",
-                "resultado_tdlc", "voto_en_contra", "voto_prevencion", "temas_tratados", "url"
-            ]
-            writer = csv.DictWriter(f, fieldnames=campos)
-            if not existe:
-                writer.writeheader()
-            writer.writerows(nuevas_detalles)
+        campos = [
+            "fecha_dictacion", "caratula", "rol_causa", "procedimiento", "partes", "ministros_concuerdan",
+            "ministro_redactor", "conducta", "industria", "articulo_norma", "resumen_controversia",
+            "resultado_tdlc", "voto_en_contra", "voto_prevencion", "temas_tratados", "url"
+        ]
+        append_csv_atomico(self.DETALLE_CSV, campos, nuevas_detalles)
 
     def actualizar_si_hay_nuevas(self):
         print("🚀 Iniciando verificación de nuevas sentencias...")
         ultimo_guardado = self.obtener_ultimo_numero_sentencia()
-        primera_pagina = self.scrapear_primera_pagina_listado()
+        with tramo("listado"):
+            primera_pagina = self.scrapear_primera_pagina_listado()
 
         nuevas = []
         for sentencia in primera_pagina:
@@ -198,12 +205,14 @@ class SentenciasTDLC:
             return
 
         print(f"📈 Se detectaron {len(nuevas)} nueva(s) sentencia(s) con número mayor a {ultimo_guardado}")
-        self.guardar_sentencias_listado(nuevas)
+        with tramo("escritura_csv"):
+            self.guardar_sentencias_listado(nuevas)
         print("💾 Nuevas sentencias agregadas al listado.")
 
         detalles = []
         for row in tqdm(nuevas, desc="📘 Detalles"):
-            detalle = self.extraer_detalle_sentencia(row["url_ficha"])
+            with tramo("detalle"):
+                detalle = self.extraer_detalle_sentencia(row["url_ficha"])
             detalles.append(detalle)
             # Enviar notificación por correo
             try:
@@ -215,8 +224,13 @@ class SentenciasTDLC:
                 )
             except Exception as e:
                 print(f"❌ Error al enviar correo de notificación: {e}")
-        self.guardar_sentencias_detalle(detalles)
+        with tramo("escritura_csv"):
+            self.guardar_sentencias_detalle(detalles)
         print("✅ Detalles guardados con éxito.")
 
 if __name__ == "__main__":
-    SentenciasTDLC().actualizar_si_hay_nuevas()
+    corrida = iniciar_corrida("sentencias")
+    try:
+        SentenciasTDLC().actualizar_si_hay_nuevas()
+    finally:
+        corrida.guardar()
@@ -0,0 +1,10 @@
+# sitios.py
+import os
+
+# URLs base de los sitios del tribunal. Por variable de entorno se pueden
+# apuntar a otro servidor, p. ej. el de fixtures grabados de bench_scrapers.py
+CONSULTAS_URL = os.getenv("TDLC_CONSULTAS_URL", "https://consultas.tdlc.cl").rstrip("/")
+WEB_URL = os.getenv("TDLC_WEB_URL", "https://www.tdlc.cl").rstrip("/")
+
+# Los scrapers con navegador visible lo abren sin ventana con SCRAPER_HEADLESS=1
+HEADLESS_FORZADO = os.getenv("SCRAPER_HEADLESS") == "1"
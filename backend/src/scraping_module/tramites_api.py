@@ -0,0 +1,136 @@
+# tramites_api.py
+from .audiencias_api import _extraer_lista, _parse_fecha_hora, _texto
+
+# Nombres posibles de cada campo en el JSON de un trámite
+CAMPOS_TRAMITE = {
+    "TipoTramite": ["tipoTramite", "tipo", "descripcionTipoTramite"],
+    "Fecha": ["fecha", "fechaTramite", "fechaActuacion"],
+    "Referencia": ["referencia", "sumilla", "descripcion"],
+    "Foja": ["foja", "fojas"],
+    "Link_Descarga": ["urlDocumento", "linkDocumento", "urlDescarga", "link"],
+}
+CAMPOS_DETALLES = ["detalles", "tieneDetalles", "detalle"]
+CAMPOS_FIRMANTES = ["firmantes", "tieneFirmantes"]
+
+# Lee de cada <option> del select el id del cuaderno que Knockout guarda detrás
+JS_CUADERNOS = """
+() => {
+  const select = document.querySelector("select[name='selectCuaderno']");
+  if (!select) return [];
+  return Array.from(select.options).map(o => {
+    let valor = (window.ko && ko.selectExtensions) ? ko.selectExtensions.readValue(o) : o.value;
+    if (valor && typeof valor === 'object') {
+      const js = ko.toJS(valor);
+      valor = js.id ?? js.idCuaderno ?? js.codigo;
+    }
+    return {id: valor == null ? '' : String(valor), nombre: o.textContent.trim(), seleccionado: o.selected};
+  });
+}
+"""
+
+# Pide todas las URLs en paralelo desde la página (misma sesión y cookies)
+JS_FETCH_TODOS = """
+async (urls) => Promise.all(urls.map(u =>
+  fetch(u, {credentials: 'same-origin', headers: {'Accept': 'application/json'}})
+    .then(r => r.ok ? r.json() : null)
+    .catch(() => null)
+))
+"""
+
+
+def _es_verdadero(item: dict, candidatos: list[str]) -> bool:
+    for c in candidatos:
+        valor = item.get(c)
+        if isinstance(valor, (list, dict)):
+            if valor:
+                return True
+        elif valor not in (None, "", False, 0):
+            return True
+    return False
+
+
+def normalizar_tramite_json(item: dict, idCausa: str, rol: str, cuaderno: str) -> dict:
+    """Convierte un trámite del JSON al esquema de filas del estado diario."""
+    fila = {"idCausa": idCausa, "rol": rol}
+    for campo, candidatos in CAMPOS_TRAMITE.items():
+        fila[campo] = next((item[c] for c in candidatos if c in item and item[c] not in (None, "")), "")
+    fila["Fecha"] = _parse_fecha_hora(fila["Fecha"])[0]
+    for campo in ("TipoTramite", "Referencia", "Foja", "Link_Descarga"):
+        fila[campo] = _texto(fila[campo])
+    fila["Tiene_Detalles"] = _es_verdadero(item, CAMPOS_DETALLES)
+    fila["Tiene_Firmantes"] = _es_verdadero(item, CAMPOS_FIRMANTES)
+    fila["Cuaderno"] = cuaderno
+    return fila
+
+
+def _plantilla_cuaderno(url: str, id_cuaderno: str):
+    """Reemplaza el id del cuaderno en la URL (segmento de path o valor de query) por un marcador."""
+    for patron in (f"/{id_cuaderno}/", f"={id_cuaderno}&"):
+        if patron in url:
+            return url.replace(patron, patron.replace(id_cuaderno, "__CUADERNO__"), 1)
+    for patron in (f"/{id_cuaderno}", f"={id_cuaderno}"):
+        if url.endswith(patron):
+            return url[: -len(id_cuaderno)] + "__CUADERNO__"
+    return None
+
+
+class TramitesAPI:
+    """
+    Trámites de todos los cuadernos de una causa usando el endpoint REST que
+    la página del expediente llama al cambiar de cuaderno. La URL se descubre
+    del request del cuaderno que la página carga por defecto, y el resto de
+    los cuadernos se piden en un solo lote paralelo desde el navegador, en
+    lugar de seleccionar cada opción y esperar a que la tabla se actualice.
+    """
+
+    def __init__(self, page):
+        self.page = page
+
+    def tramites_causa(self, url: str, idCausa: str, rol: str, timeout=30_000):
+        """Lista de trámites de todos los cuadernos, o None si no se pudo usar el endpoint."""
+        capturas = []
+
+        def on_response(response):
+            if "/rest/" in response.url and "tramite" in response.url.lower():
+                capturas.append(response)
+
+        self.page.on("response", on_response)
+        try:
+            self.page.goto(url, wait_until="load", timeout=timeout)
+            self.page.wait_for_load_state("networkidle", timeout=timeout)
+        finally:
+            self.page.remove_listener("response", on_response)
+
+        cuadernos = self.page.evaluate(JS_CUADERNOS)
+        if not cuadernos or not capturas:
+            return None
+        actual = next((c for c in cuadernos if c["seleccionado"]), cuadernos[0])
+        if not actual["id"]:
+            return None
+
+        plantilla = None
+        datos_actual = None
+        for response in capturas:
+            plantilla = _plantilla_cuaderno(response.url, actual["id"])
+            if plantilla:
+                try:
+                    datos_actual = _extraer_lista(response.json())
+                except Exception:
+                    datos_actual = None
+                break
+        if not plantilla or datos_actual is None:
+            return None
+
+        otros = [c for c in cuadernos if c is not actual and c["id"]]
+        respuestas = self.page.evaluate(JS_FETCH_TODOS, [plantilla.replace("__CUADERNO__", c["id"]) for c in otros])
+
+        tramites = [normalizar_tramite_json(item, idCausa, rol, actual["nombre"])
+                    for item in datos_actual if isinstance(item, dict)]
+        for cuaderno, data in zip(otros, respuestas):
+            items = _extraer_lista(data)
+            if items is None:
+                print(f"⚠️ No se pudo leer el cuaderno '{cuaderno['nombre']}' de {rol} por API")
+                return None
+            tramites.extend(normalizar_tramite_json(item, idCausa, rol, cuaderno["nombre"])
+                            for item in items if isinstance(item, dict))
+        return tramites
@@ -0,0 +1,173 @@
+import csv
+import glob
+import io
+import os
+import shutil
+import threading
+from contextlib import contextmanager
+
+
+def _fsync_directorio(path: str):
+    """Asegura que el rename quede persistido (no disponible en Windows)."""
+    try:
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+@contextmanager
+def archivo_atomico(path: str, encoding: str = "utf-8", newline: str = ""):
+    """
+    Abre un temporal junto a `path` para escritura; al salir sin errores hace
+    fsync y lo reemplaza con `os.replace`. Un lector concurrente ve siempre
+    el archivo anterior completo o el nuevo completo, nunca uno a medias.
+    """
+    directorio = os.path.dirname(path)
+    if directorio:
+        os.makedirs(directorio, exist_ok=True)
+    # Único por proceso e hilo: dos hilos escribiendo el mismo path no comparten temporal
+    tmp_path = f"{path}.tmp.{os.getpid()}.{threading.get_ident()}"
+    try:
+        with open(tmp_path, "w", encoding=encoding, newline=newline) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        _fsync_directorio(path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def guardar_df_atomico(df, path: str, encoding: str = "utf-8-sig", **to_csv_kwargs):
+    """`df.to_csv` con escritura atómica."""
+    to_csv_kwargs.setdefault("index", False)
+    with archivo_atomico(path, encoding=encoding) as f:
+        df.to_csv(f, **to_csv_kwargs)
+
+
+def escribir_csv_atomico(path: str, fieldnames: list[str], filas: list[dict], encoding: str = "utf-8"):
+    with archivo_atomico(path, encoding=encoding) as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(filas)
+
+
+def append_csv_atomico(path: str, fieldnames: list[str], filas: list[dict], encoding: str = "utf-8") -> int:
+    """
+    Agrega filas a un CSV copiando el archivo actual a un temporal y
+    reemplazándolo (copy-on-write). Crea el header si el archivo no existe.
+    """
+    if not filas:
+        return 0
+    existe = os.path.exists(path)
+    with archivo_atomico(path, encoding=encoding) as f:
+        if existe:
+            with open(path, "r", encoding=encoding, newline="") as original:
+                shutil.copyfileobj(original, f)
+        writer = csv.DictWriter(f, fieldnames=fieldnames, extrasaction="ignore")
+        if not existe:
+            writer.writeheader()
+        writer.writerows(filas)
+    return len(filas)
+
+
+def registros_completos(contenido: str) -> str:
+    """
+    Texto CSV hasta el último registro completo. Un salto de línea dentro de
+    un campo entre comillas no cierra el registro, así una carátula de varias
+    líneas no se corta; lo que queda después (una escritura truncada) se descarta.
+    """
+    fin = inicio = 0
+    while (salto := contenido.find("\n", inicio)) >= 0:
+        inicio = salto + 1
+        # Con las comillas balanceadas el salto está fuera de todo campo
+        if contenido.count('"', fin, inicio) % 2 == 0:
+            fin = inicio
+    return contenido[:fin]
+
+
+class CsvAppendJournal:
+    """
+    Appends frecuentes sin tocar el CSV principal: las filas van a
+    `<csv>.journal` (con fsync) y cada `compactar_cada` filas, o al llamar
+    `compactar()`, se incorporan al CSV con un reemplazo atómico.
+
+    Si el proceso muere, el journal queda en disco y se compacta en la
+    siguiente apertura; una última línea truncada se descarta. Para compactar,
+    el journal primero se renombra a `<csv>.journal.<bytes del CSV>`: si el
+    proceso muere después de reemplazar el CSV pero antes de borrarlo, el CSV
+    ya no mide eso y la siguiente apertura sólo lo borra, sin duplicar filas.
+    """
+
+    def __init__(self, path: str, fieldnames: list[str], compactar_cada: int = 200, encoding: str = "utf-8"):
+        self.path = path
+        self.journal_path = f"{path}.journal"
+        self.fieldnames = fieldnames
+        self.compactar_cada = compactar_cada
+        self.encoding = encoding
+        self.pendientes = 0
+        self.compactar()
+
+    def append(self, filas: list[dict]) -> bool:
+        """Registra filas en el journal. Devuelve True si además se compactó."""
+        if not filas:
+            return False
+        buffer = io.StringIO()
+        csv.DictWriter(buffer, fieldnames=self.fieldnames, extrasaction="ignore").writerows(filas)
+        os.makedirs(os.path.dirname(self.journal_path) or ".", exist_ok=True)
+        with open(self.journal_path, "a", encoding=self.encoding, newline="") as f:
+            f.write(buffer.getvalue())
+            f.flush()
+            os.fsync(f.fileno())
+        self.pendientes += len(filas)
+        if self.pendientes >= self.compactar_cada:
+            self.compactar()
+            return True
+        return False
+
+    def _tamano_csv(self) -> int:
+        return os.path.getsize(self.path) if os.path.exists(self.path) else 0
+
+    def _marcados(self) -> list[str]:
+        """Journals renombrados que quedaron de una compactación interrumpida."""
+        marcados = {p for p in glob.glob(glob.escape(self.journal_path) + ".*") if p.rsplit(".", 1)[1].isdigit()}
+        return sorted(marcados, key=lambda p: int(p.rsplit(".", 1)[1]))
+
+    def compactar(self) -> int:
+        """Incorpora el journal al CSV principal de forma atómica y lo elimina."""
+        # Primero los que quedaron a medio compactar de un corte previo; recién
+        # después se renombra el journal vivo, con el tamaño que el CSV tiene ahora
+        n = sum(self._incorporar(marcado) for marcado in self._marcados())
+        if os.path.exists(self.journal_path):
+            marcado = f"{self.journal_path}.{self._tamano_csv()}"
+            os.replace(self.journal_path, marcado)
+            _fsync_directorio(marcado)
+            n += self._incorporar(marcado)
+        self.pendientes = 0
+        return n
+
+    def _incorporar(self, marcado: str) -> int:
+        """Agrega un journal renombrado al CSV, salvo que el CSV ya no tenga el tamaño que marca (ya se agregó)."""
+        n = 0
+        if self._tamano_csv() == int(marcado.rsplit(".", 1)[1]):
+            with open(marcado, "r", encoding=self.encoding, newline="") as f:
+                contenido = registros_completos(f.read())
+            if contenido:
+                existe = os.path.exists(self.path)
+                with archivo_atomico(self.path, encoding=self.encoding) as f:
+                    if existe:
+                        with open(self.path, "r", encoding=self.encoding, newline="") as original:
+                            shutil.copyfileobj(original, f)
+                    else:
+                        csv.DictWriter(f, fieldnames=self.fieldnames).writeheader()
+                    f.write(contenido)
+                n = sum(1 for _ in csv.reader(io.StringIO(contenido, newline="")))
+        os.remove(marcado)
+        return n
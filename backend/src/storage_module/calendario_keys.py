@@ -0,0 +1,134 @@
+import csv
+import os
+import sqlite3
+
+from .calendario_meta import hash_key
+
+
+# Campos que pueden cambiar para una misma audiencia (fecha, hora, rol)
+CAMPOS_FILA = ("caratula", "tipo_audiencia", "estado")
+
+SCHEMA_VERSION = 2
+
+
+def _a_int64(h: int) -> int:
+    """SQLite guarda enteros con signo de 64 bits."""
+    return h - (1 << 64) if h >= (1 << 63) else h
+
+
+def hash_fila(fila: dict) -> int:
+    """Hash de los campos mutables de una audiencia, para detectar cambios de estado."""
+    return _a_int64(hash_key(tuple(fila.get(c) or "" for c in CAMPOS_FILA)))
+
+
+class CalendarioKeyStore:
+    """
+    Conjunto persistente de keys (fecha, hora, rol) del calendario, guardado
+    como hashes de 64 bits en una tabla SQLite junto al CSV (`<csv>.keys.sqlite`).
+
+    Además de la key se guarda un hash de los campos mutables de la fila
+    (`hash_fila`), para que el modo upsert detecte audiencias que cambiaron
+    de estado sin tener que releer el CSV.
+
+    Se usa como reemplazo de un `set`: `key in store`, `store.add(key)`. Las
+    keys agregadas quedan pendientes en memoria hasta `confirmar()`, que se
+    llama después de escribir el CSV; así un corte a mitad de camino nunca deja
+    keys registradas de filas que no llegaron al archivo.
+
+    La base se abre recién en la primera consulta y sólo se reconstruye desde
+    el CSV si el tamaño del CSV no coincide con el registrado en la última
+    confirmación.
+    """
+
+    def __init__(self, csv_path: str):
+        self.csv_path = csv_path
+        self.db_path = f"{csv_path}.keys.sqlite"
+        self._conn = None
+        self._pendientes = {}  # hash key -> hash fila
+
+    # ============== Conexión/sincronización ==============
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            # Los scrapers en paralelo la usan desde varios hilos, siempre bajo un lock
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.execute("CREATE TABLE IF NOT EXISTS meta (k TEXT PRIMARY KEY, v INTEGER)")
+            version = self._leer_meta("schema")
+            if version != SCHEMA_VERSION:
+                with self._conn:
+                    self._conn.execute("DROP TABLE IF EXISTS keys")
+                    self._conn.execute("DELETE FROM meta")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS keys (h INTEGER PRIMARY KEY, fila INTEGER)")
+            self._sincronizar()
+        return self._conn
+
+    def _csv_size(self) -> int:
+        return os.path.getsize(self.csv_path) if os.path.exists(self.csv_path) else 0
+
+    def _leer_meta(self, clave):
+        fila = self._conn.execute("SELECT v FROM meta WHERE k = ?", (clave,)).fetchone()
+        return fila[0] if fila else None
+
+    def _sincronizar(self):
+        if self._leer_meta("csv_size") == self._csv_size():
+            return
+        print(f"🧮 Reconstruyendo índice de keys de {self.csv_path}...")
+        with self._conn:
+            self._conn.execute("DELETE FROM keys")
+            if os.path.exists(self.csv_path):
+                with open(self.csv_path, "r", encoding="utf-8") as f:
+                    self._conn.executemany(
+                        "INSERT OR REPLACE INTO keys (h, fila) VALUES (?, ?)",
+                        ((_a_int64(hash_key((r.get("fecha"), r.get("hora"), r.get("rol")))), hash_fila(r))
+                         for r in csv.DictReader(f)),
+                    )
+            self._guardar_meta()
+
+    def _guardar_meta(self):
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO meta (k, v) VALUES (?, ?)",
+            [("csv_size", self._csv_size()), ("schema", SCHEMA_VERSION)],
+        )
+
+    # ============== API tipo set ==============
+    def __contains__(self, key) -> bool:
+        h = _a_int64(hash_key(key))
+        if h in self._pendientes:
+            return True
+        return self.conn.execute("SELECT 1 FROM keys WHERE h = ?", (h,)).fetchone() is not None
+
+    def add(self, key, row_hash: int = None):
+        """Registra una key (o el nuevo hash de fila de una key existente) como pendiente."""
+        self.conn  # asegura que la base esté sincronizada antes de acumular pendientes
+        self._pendientes[_a_int64(hash_key(key))] = row_hash
+
+    def row_hash(self, key):
+        """Hash de fila registrado para la key, o None si no existe."""
+        h = _a_int64(hash_key(key))
+        if self._pendientes.get(h) is not None:
+            return self._pendientes[h]
+        fila = self.conn.execute("SELECT fila FROM keys WHERE h = ?", (h,)).fetchone()
+        return fila[0] if fila else None
+
+    def confirmar(self):
+        """Persiste las keys pendientes; llamar después de escribir las filas al CSV."""
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO keys (h, fila) VALUES (?, ?) "
+                "ON CONFLICT(h) DO UPDATE SET fila = COALESCE(excluded.fila, keys.fila)",
+                self._pendientes.items(),
+            )
+            self._guardar_meta()
+        self._pendientes.clear()
+
+    def descartar(self):
+        self._pendientes.clear()
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM keys").fetchone()[0] + len(self._pendientes)
+
+    def cerrar(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
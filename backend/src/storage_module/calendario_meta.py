@@ -0,0 +1,105 @@
+import csv
+import hashlib
+import json
+import os
+from datetime import datetime
+
+from .atomic_io import archivo_atomico
+
+MASK_64 = (1 << 64) - 1
+
+
+def hash_key(key: tuple) -> int:
+    """Hash estable de 64 bits de una key (fecha, hora, rol)."""
+    texto = "|".join((k or "").strip() for k in key)
+    return int.from_bytes(hashlib.blake2b(texto.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def _parse_fecha(fecha: str):
+    try:
+        return datetime.strptime((fecha or "").strip(), "%d-%m-%Y")
+    except ValueError:
+        return None
+
+
+class CalendarioMeta:
+    """
+    Metadatos del calendario_audiencias.csv guardados en `<csv>.meta.json`:
+    fecha mínima/máxima, número de filas y un digest del conjunto de keys
+    (suma de hashes de 64 bits, independiente del orden).
+
+    Se actualiza en cada append, así el punto de partida del scraper se lee
+    en O(1). Si el tamaño del CSV no coincide con el registrado (lo escribió
+    otro proceso) se reconstruye recorriendo el CSV una vez.
+    """
+
+    def __init__(self, csv_path: str):
+        self.csv_path = csv_path
+        self.meta_path = f"{csv_path}.meta.json"
+        self.min_fecha = None
+        self.max_fecha = None
+        self.filas = 0
+        self.digest = 0
+        self.csv_size = 0
+
+    @classmethod
+    def cargar(cls, csv_path: str) -> "CalendarioMeta":
+        meta = cls(csv_path)
+        if not os.path.exists(csv_path):
+            return meta
+        if not meta._leer() or meta.csv_size != os.path.getsize(csv_path):
+            meta.reconstruir()
+        return meta
+
+    def _leer(self) -> bool:
+        if not os.path.exists(self.meta_path):
+            return False
+        try:
+            with open(self.meta_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.min_fecha = _parse_fecha(data.get("min_fecha"))
+            self.max_fecha = _parse_fecha(data.get("max_fecha"))
+            self.filas = int(data["filas"])
+            self.digest = int(data["digest"], 16)
+            self.csv_size = int(data["csv_size"])
+            return True
+        except Exception:
+            return False
+
+    def reconstruir(self):
+        print(f"🧮 Reconstruyendo metadatos de {self.csv_path}...")
+        self.min_fecha = self.max_fecha = None
+        self.filas = self.digest = 0
+        with open(self.csv_path, "r", encoding="utf-8") as f:
+            self._acumular(csv.DictReader(f))
+        self.guardar()
+
+    def _acumular(self, filas):
+        for r in filas:
+            key = (r.get("fecha", ""), r.get("hora", ""), r.get("rol", ""))
+            if not any((k or "").strip() for k in key):
+                continue
+            self.filas += 1
+            self.digest = (self.digest + hash_key(key)) & MASK_64
+            fecha = _parse_fecha(r.get("fecha"))
+            if fecha:
+                if self.min_fecha is None or fecha < self.min_fecha:
+                    self.min_fecha = fecha
+                if self.max_fecha is None or fecha > self.max_fecha:
+                    self.max_fecha = fecha
+
+    def actualizar(self, nuevas: list[dict]):
+        """Incorpora filas recién apendeadas al CSV y persiste los metadatos."""
+        self._acumular(nuevas)
+        self.guardar()
+
+    def guardar(self):
+        self.csv_size = os.path.getsize(self.csv_path) if os.path.exists(self.csv_path) else 0
+        with archivo_atomico(self.meta_path) as f:
+            json.dump({
+                "min_fecha": self.min_fecha.strftime("%d-%m-%Y") if self.min_fecha else None,
+                "max_fecha": self.max_fecha.strftime("%d-%m-%Y") if self.max_fecha else None,
+                "filas": self.filas,
+                "digest": f"{self.digest:016x}",
+                "csv_size": self.csv_size,
+            }, f)
@@ -0,0 +1,43 @@
+import csv
+import os
+
+CATALOGO_CSV = "backend/data/historic_data/rol_idcausa.csv"
+
+
+class CatalogoCausas:
+    """
+    Procedimiento de cada causa según el catálogo rol_idcausa.csv (lo escribe
+    scraping_id_Causa.py), buscable por idCausa o por rol.
+    """
+
+    def __init__(self):
+        self.por_id = {}
+        self.por_rol = {}
+
+    @classmethod
+    def cargar(cls, path: str = CATALOGO_CSV) -> "CatalogoCausas":
+        catalogo = cls()
+        if not os.path.exists(path):
+            return catalogo
+        with open(path, "r", encoding="utf-8-sig", newline="") as f:
+            for row in csv.DictReader(f):
+                procedimiento = (row.get("procedimiento") or "").strip()
+                if not procedimiento:
+                    continue
+                id_causa = (row.get("idcausa") or row.get("idCausa") or "").strip()
+                rol = (row.get("rol") or "").strip().upper()
+                if id_causa:
+                    catalogo.por_id[id_causa] = procedimiento
+                if rol:
+                    catalogo.por_rol[rol] = procedimiento
+        return catalogo
+
+    def procedimiento(self, rol: str = "", id_causa: str = "") -> str:
+        """Procedimiento de la causa, o "" si no está en el catálogo."""
+        id_causa = str(id_causa or "").strip()
+        return self.por_id.get(id_causa) or self.por_rol.get(str(rol or "").strip().upper(), "")
+
+    def campos_evento(self, rol: str = "", id_causa: str = "") -> dict:
+        """`{"procedimiento": ...}` para sumar a un evento; vacío si no se conoce."""
+        procedimiento = self.procedimiento(rol, id_causa)
+        return {"procedimiento": procedimiento} if procedimiento else {}
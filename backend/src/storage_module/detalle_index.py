@@ -0,0 +1,103 @@
+import csv
+import json
+import os
+
+from .atomic_io import archivo_atomico
+
+
+class DetalleIndex:
+    """
+    Índice en memoria sobre rol_idcausa_detalle*.csv para búsquedas O(1):
+      - roles conocidos
+      - pares (rol, idCausa)
+      - tríos (rol, idCausa, fecha_fallo)
+
+    Se persiste en un archivo junto al CSV (`<csv>.idx.json`) con el mtime y
+    tamaño del CSV; mientras el CSV no cambie, cargar el índice no requiere
+    volver a parsear la tabla completa.
+    """
+
+    VERSION = 1
+
+    def __init__(self, csv_path: str, index_path: str = None):
+        self.csv_path = csv_path
+        self.index_path = index_path or f"{csv_path}.idx.json"
+        self.roles = set()
+        self.causas = set()
+        self.fallos = set()
+
+    # ============== Carga ==============
+    @classmethod
+    def cargar(cls, csv_path: str, index_path: str = None) -> "DetalleIndex":
+        indice = cls(csv_path, index_path)
+        if not os.path.exists(csv_path):
+            return indice
+        if not indice._leer_persistido():
+            indice._construir_desde_csv()
+            indice.guardar()
+        return indice
+
+    def _firma_csv(self):
+        st = os.stat(self.csv_path)
+        return {"mtime_ns": st.st_mtime_ns, "size": st.st_size}
+
+    def _leer_persistido(self) -> bool:
+        if not os.path.exists(self.index_path):
+            return False
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception:
+            return False
+        if data.get("version") != self.VERSION or data.get("csv") != self._firma_csv():
+            return False
+        self.causas = {tuple(k) for k in data["causas"]}
+        self.fallos = {tuple(k) for k in data["fallos"]}
+        self.roles = {rol for rol, _ in self.causas}
+        return True
+
+    def _construir_desde_csv(self):
+        with open(self.csv_path, "r", encoding="utf-8-sig", newline="") as f:
+            for row in csv.DictReader(f):
+                self.agregar(row)
+
+    def guardar(self):
+        """Persiste el índice, asociado al estado actual del CSV."""
+        if not os.path.exists(self.csv_path):
+            return
+        with archivo_atomico(self.index_path) as f:
+            json.dump({
+                "version": self.VERSION,
+                "csv": self._firma_csv(),
+                "causas": sorted(self.causas),
+                "fallos": sorted(self.fallos),
+            }, f, ensure_ascii=False)
+
+    # ============== Actualización/consulta ==============
+    @staticmethod
+    def _valor(row: dict, campo: str) -> str:
+        valor = row.get(campo)
+        return "" if valor is None else str(valor).strip()
+
+    def agregar(self, row: dict):
+        rol = self._valor(row, "rol")
+        id_causa = self._valor(row, "idCausa")
+        if not rol:
+            return
+        self.roles.add(rol)
+        self.causas.add((rol, id_causa))
+        fecha_fallo = self._valor(row, "fecha_fallo")
+        if fecha_fallo:
+            self.fallos.add((rol, id_causa, fecha_fallo))
+
+    def contiene_rol(self, rol: str) -> bool:
+        return rol.strip() in self.roles
+
+    def contiene(self, rol: str, id_causa: str) -> bool:
+        return (rol.strip(), str(id_causa).strip()) in self.causas
+
+    def contiene_fallo(self, rol: str, id_causa: str, fecha_fallo: str) -> bool:
+        return (rol.strip(), str(id_causa).strip(), fecha_fallo.strip()) in self.fallos
+
+    def __len__(self):
+        return len(self.causas)
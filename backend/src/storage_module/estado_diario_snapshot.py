@@ -0,0 +1,105 @@
+import json
+import math
+import os
+from datetime import datetime
+
+from .atomic_io import archivo_atomico, escribir_csv_atomico
+
+# Columnas de las causas publicadas en el estado diario
+COLUMNAS_CAUSAS = ["fecha_estado_diario", "rol", "descripcion", "tramites", "link"]
+
+# Columnas que expone el endpoint /estado-diario/tramites-del-dia
+COLUMNAS_TRAMITES = [
+    "idCausa", "rol", "TipoTramite", "Fecha", "Referencia", "Foja",
+    "Link_Descarga", "Tiene_Detalles", "Tiene_Firmantes",
+]
+
+
+def ruta_snapshot(csv_path: str) -> str:
+    return f"{csv_path.rsplit('.', 1)[0]}.jsonl"
+
+
+def _texto(valor) -> str:
+    if valor is None or (isinstance(valor, float) and (math.isnan(valor) or math.isinf(valor))):
+        return ""
+    return str(valor)
+
+
+def normalizar_tramite(tramite: dict) -> dict:
+    """Fila con exactamente COLUMNAS_TRAMITES y todos los valores como texto."""
+    return {c: _texto(tramite.get(c)) for c in COLUMNAS_TRAMITES}
+
+
+def _escribir_jsonl(path: str, filas: list[dict]):
+    with archivo_atomico(path) as f:
+        for fila in filas:
+            f.write(json.dumps(fila, ensure_ascii=False) + "\n")
+
+
+# ============== Historial particionado por día ==============
+def ruta_particion(base_dir: str, fecha: str) -> str:
+    """`<base_dir>/fecha=YYYY-MM-DD` a partir de una fecha dd-mm-yyyy."""
+    iso = datetime.strptime(fecha.strip(), "%d-%m-%Y").strftime("%Y-%m-%d")
+    return os.path.join(base_dir, f"fecha={iso}")
+
+
+def guardar_particionado(base_dir: str, nombre: str, filas: list[dict], campo_fecha: str) -> list[str]:
+    """
+    Escribe `filas` en `<base_dir>/fecha=YYYY-MM-DD/<nombre>.jsonl`, agrupadas
+    por `campo_fecha`. Cada partición se reemplaza completa, así volver a
+    correr un día no duplica filas. Las filas cuya fecha no es dd-mm-yyyy no
+    tienen partición y se informan. Devuelve las particiones escritas.
+    """
+    por_fecha, sin_fecha = {}, []
+    for fila in filas:
+        try:
+            particion = ruta_particion(base_dir, fila.get(campo_fecha) or "")
+        except ValueError:
+            sin_fecha.append(fila.get(campo_fecha) or "")
+            continue
+        por_fecha.setdefault(particion, []).append(fila)
+    for particion, filas_dia in por_fecha.items():
+        _escribir_jsonl(os.path.join(particion, f"{nombre}.jsonl"), filas_dia)
+    if sin_fecha:
+        ejemplos = ", ".join(repr(f) for f in list(dict.fromkeys(sin_fecha))[:3])
+        print(f"⚠️ {len(sin_fecha)} fila(s) de {nombre} sin {campo_fecha} válido quedaron fuera del historial ({ejemplos})")
+    return sorted(por_fecha)
+
+
+def particion_completa(base_dir: str, fecha: str) -> bool:
+    particion = ruta_particion(base_dir, fecha)
+    return all(os.path.exists(os.path.join(particion, f"{n}.jsonl")) for n in ("causas", "tramites"))
+
+
+def guardar_historial(base_dir: str, causas: list[dict], tramites: list[dict]) -> list[str]:
+    """Escribe causas y trámites de varios días directo a sus particiones (backfill)."""
+    filas_causas = [{c: _texto(causa.get(c)) for c in COLUMNAS_CAUSAS} for causa in causas]
+    filas_tramites = [normalizar_tramite(t) for t in tramites]
+    con_causas = guardar_particionado(base_dir, "causas", filas_causas, "fecha_estado_diario")
+    con_tramites = guardar_particionado(base_dir, "tramites", filas_tramites, "Fecha")
+    # Un día con causas pero sin trámites de esa fecha igual queda completo (y sin restos previos)
+    for particion in set(con_causas) - set(con_tramites):
+        _escribir_jsonl(os.path.join(particion, "tramites.jsonl"), [])
+    return sorted(set(con_causas) | set(con_tramites))
+
+
+def guardar_causas_del_dia(csv_path: str, causas: list[dict]) -> int:
+    """CSV del día (se sobrescribe) más su copia en la partición histórica."""
+    filas = [{c: _texto(causa.get(c)) for c in COLUMNAS_CAUSAS} for causa in causas]
+    escribir_csv_atomico(csv_path, COLUMNAS_CAUSAS, filas, encoding="utf-8-sig")
+    guardar_particionado(os.path.dirname(csv_path), "causas", filas, "fecha_estado_diario")
+    return len(filas)
+
+
+def guardar_tramites_del_dia(csv_path: str, tramites: list[dict]) -> int:
+    """
+    Escribe los trámites del día como CSV (para el resumen y uso manual) y
+    como snapshot JSON Lines ya normalizado, ambos de forma atómica. La API
+    carga el snapshot una vez por versión del archivo y lo sirve desde memoria.
+    Los trámites quedan además en la partición histórica de su fecha.
+    """
+    filas = [normalizar_tramite(t) for t in tramites]
+    escribir_csv_atomico(csv_path, COLUMNAS_TRAMITES, filas, encoding="utf-8-sig")
+    _escribir_jsonl(ruta_snapshot(csv_path), filas)
+    guardar_particionado(os.path.dirname(csv_path), "tramites", filas, "Fecha")
+    return len(filas)
@@ -0,0 +1,101 @@
+import os
+import sys
+import shutil
+import tempfile
+import threading
+
+# Raíz del proyecto en el sys.path para importar backend.src...
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../.."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from backend.src.storage_module.atomic_io import CsvAppendJournal, archivo_atomico
+
+CAMPOS = ["a", "b"]
+
+
+def escribir(path: str, texto: str):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write(texto)
+
+
+def leer(path: str) -> str:
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        return f.read()
+
+
+def caso_marcado_sin_incorporar_y_journal_vivo(carpeta):
+    """Corte antes de incorporar: el journal viejo y el vivo llevarían el mismo tamaño de CSV."""
+    csv_path = os.path.join(carpeta, "d.csv")
+    escribir(csv_path, "a,b\r\n1,x\r\n")
+    escribir(f"{csv_path}.journal.{os.path.getsize(csv_path)}", "2,y\r\n")
+    escribir(f"{csv_path}.journal", "3,z\r\n")
+    CsvAppendJournal(csv_path, CAMPOS)
+    assert leer(csv_path) == "a,b\r\n1,x\r\n2,y\r\n3,z\r\n", leer(csv_path)
+    assert os.listdir(carpeta) == ["d.csv"], os.listdir(carpeta)
+
+
+def caso_marcado_ya_incorporado_y_journal_vivo(carpeta):
+    """Corte después de reemplazar el CSV: el journal viejo se borra y el vivo igual se incorpora."""
+    csv_path = os.path.join(carpeta, "d.csv")
+    escribir(csv_path, "a,b\r\n1,x\r\n")
+    tamano_previo = os.path.getsize(csv_path)
+    escribir(csv_path, "a,b\r\n1,x\r\n2,y\r\n")
+    escribir(f"{csv_path}.journal.{tamano_previo}", "2,y\r\n")
+    escribir(f"{csv_path}.journal", "3,z\r\n")
+    CsvAppendJournal(csv_path, CAMPOS)
+    assert leer(csv_path) == "a,b\r\n1,x\r\n2,y\r\n3,z\r\n", leer(csv_path)
+    assert os.listdir(carpeta) == ["d.csv"], os.listdir(carpeta)
+
+
+def caso_campo_multilinea_y_cola_truncada(carpeta):
+    csv_path = os.path.join(carpeta, "d.csv")
+    journal = CsvAppendJournal(csv_path, CAMPOS, compactar_cada=1000)
+    journal.append([{"a": "1", "b": "carátula\nen dos líneas"}, {"a": "2", "b": "simple"}])
+    with open(journal.journal_path, "a", encoding="utf-8", newline="") as f:
+        f.write('3,"cortada\n a mitad')
+    n = journal.compactar()
+    assert n == 2, n
+    assert leer(csv_path) == 'a,b\r\n1,"carátula\nen dos líneas"\r\n2,simple\r\n', leer(csv_path)
+
+
+def caso_hilos_mismo_archivo(carpeta):
+    path = os.path.join(carpeta, "t.txt")
+
+    def escribir_varias(i):
+        for _ in range(50):
+            with archivo_atomico(path) as f:
+                f.write(str(i) * 1000)
+
+    hilos = [threading.Thread(target=escribir_varias, args=(i,)) for i in range(8)]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    contenido = leer(path)
+    assert len(contenido) == 1000 and len(set(contenido)) == 1, contenido[:20]
+    assert os.listdir(carpeta) == ["t.txt"], os.listdir(carpeta)
+
+
+CASOS = [
+    caso_marcado_sin_incorporar_y_journal_vivo,
+    caso_marcado_ya_incorporado_y_journal_vivo,
+    caso_campo_multilinea_y_cola_truncada,
+    caso_hilos_mismo_archivo,
+]
+
+
+if __name__ == "__main__":
+    fallidos = 0
+    for caso in CASOS:
+        carpeta = tempfile.mkdtemp(prefix="probar_journal_")
+        try:
+            caso(carpeta)
+            print(f"✅ {caso.__name__}")
+        except Exception as e:
+            fallidos += 1
+            print(f"❌ {caso.__name__}: {type(e).__name__}: {e}")
+        finally:
+            shutil.rmtree(carpeta, ignore_errors=True)
+    print(f"{'✅' if not fallidos else '❌'} {len(CASOS) - fallidos}/{len(CASOS)} casos del journal de appends")
+    sys.exit(1 if fallidos else 0)